@@ -2,25 +2,36 @@
 Vercel serverless entry point.
 
 Flask is detected automatically by Vercel's Python runtime as a WSGI app.
-The async Riot API calls run inside asyncio.run() so they don't conflict
-with Flask's synchronous request handling.
+The async Riot API calls are submitted to the process-wide RiotClient, whose
+event loop runs in a background thread, so they don't conflict with Flask's
+synchronous request handling and reuse one pooled connection set.
 """
 import sys
 import os
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-import asyncio
+import hmac
+import itertools
+import json
 from datetime import datetime, timezone
 from dotenv import load_dotenv
 
 load_dotenv()
 
-from flask import Flask, jsonify, request, send_from_directory
+from flask import Flask, Response, jsonify, request, send_from_directory, stream_with_context
 
-from backend.riot_api import get_summoner_data_async
+from backend.riot_api import (
+    RETRYABLE_SECTIONS, admit_lookups, admit_match_page, admit_missing, fetch_match_page_async, fetch_missing_async,
+    get_ranks_async, get_summoner_data_async, get_summoners_data_async, loaded_matches, resolve_summoner,
+    stream_summoner_data_async,
+)
+from backend.match_store import get_match_store
+from backend.refresh_worker import get_refresh_worker
+from backend.riot_client import get_client
 from backend.data_dragon import get_champion_map, get_latest_version, get_rune_tree
-from backend.analysis.match_analysis import analyze_match_history
-from backend.analysis.champion_stats import analyze_champion_stats
+from backend.analysis.match_analysis import MatchHistoryAggregator
+from backend.analysis.champion_stats import ChampionStatsAggregator
+from backend.analysis.records import MatchRecord, as_match_record
 from backend.ai_coach import generate_coaching
 from backend.analysis.meta_fetcher import get_full_meta_cache, get_cache_patch
 
@@ -29,8 +40,13 @@ try:
     _META_AVAILABLE = True
 except Exception:
     _META_AVAILABLE = False
+from backend.utils.constants import (
+    ADMIN_TOKEN, MATCH_HISTORY_COUNT, MATCH_PAGE_SIZE, MAX_BATCH_SUMMONERS, MAX_RANK_PUUIDS, MAX_TRACKED_SUMMONERS,
+    REQUEST_DEADLINE,
+)
+from backend.utils.scheduler import Priority, request_priority
 from backend.utils.exceptions import (
-    APIError, AuthError, ConfigError, NetworkError, NotFoundError, RateLimitError,
+    APIError, AuthError, ConfigError, DeadlineExceeded, NetworkError, NotFoundError, RateLimitError,
 )
 
 app = Flask(__name__)
@@ -56,41 +72,100 @@ def _get_rune_tree():
     return _rune_tree
 
 
-@app.route("/api/summoner")
-def summoner():
-    name = request.args.get("name", "").strip()
-    region = request.args.get("region", "NA").strip()
+RANKED_QUEUES = {420, 440}  # solo, flex — filter everything else
 
-    if not name:
-        return jsonify({"error": "name is required"}), 400
-    if "#" not in name:
-        return jsonify({"error": "Use Riot ID format: Name#TAG"}), 400
 
-    try:
-        summoner_data, ranked, mastery, matches = asyncio.run(
-            get_summoner_data_async(name, region)
+class _RankedAnalysis:
+    """
+    match_analysis + champion_stats over ranked games, aggregated while the
+    match details download. Passed to get_summoner_data_async as its
+    analyzers factory.
+    """
+
+    def __init__(self):
+        self.aggregators = None
+
+    def __call__(self, puuid: str):
+        self.aggregators = (
+            MatchHistoryAggregator(puuid, RANKED_QUEUES),
+            ChampionStatsAggregator(puuid, RANKED_QUEUES),
         )
-    except NotFoundError as e:
-        return jsonify({"error": str(e)}), 404
-    except RateLimitError:
+        return self.aggregators
+
+    def add(self, match: dict, index: int) -> None:
+        for aggregator in self.aggregators:
+            aggregator.add(match, index)
+
+    def results(self, puuid: str, matches: list):
+        if self.aggregators is None:  # result didn't come through the fetch path
+            self(puuid)
+            for index, match in enumerate(matches):
+                self.add(match, index)
+        history, champions = self.aggregators
+        return history.result(), champions.result()
+
+
+def _lookup_error_response(exc: Exception):
+    """Map a Riot lookup failure to the (json, status) the frontend expects."""
+    if isinstance(exc, NotFoundError):
+        return jsonify({"error": str(exc)}), 404
+    if isinstance(exc, RateLimitError):
         return jsonify({"error": "Rate limit exceeded — please wait and try again."}), 429
-    except AuthError:
+    if isinstance(exc, AuthError):
         return jsonify({"error": "Server API key is invalid or expired."}), 401
-    except ConfigError as e:
-        return jsonify({"error": str(e)}), 500
-    except NetworkError as e:
-        return jsonify({"error": f"Network error: {e}"}), 502
-    except APIError as e:
-        return jsonify({"error": str(e)}), 500
-    except Exception:
-        app.logger.exception("Unexpected error fetching summoner data")
-        return jsonify({"error": "Something went wrong on our side. Please try again."}), 500
+    if isinstance(exc, ConfigError):
+        return jsonify({"error": str(exc)}), 500
+    if isinstance(exc, DeadlineExceeded):
+        return jsonify({"error": "Riot API is responding too slowly — please try again."}), 504
+    if isinstance(exc, NetworkError):
+        return jsonify({"error": f"Network error: {exc}"}), 502
+    if isinstance(exc, APIError):
+        return jsonify({"error": str(exc)}), 500
+    app.logger.error("Unexpected error fetching summoner data", exc_info=exc)
+    return jsonify({"error": "Something went wrong on our side. Please try again."}), 500
+
+
+def _summoner_args():
+    """
+    (name, region, puuid, error_response) from the query string. A puuid
+    (scoreboard click-through) replaces the Riot ID; name is then optional
+    and only used for display.
+    """
+    name = request.args.get("name", "").strip()
+    region = request.args.get("region", "NA").strip()
+    puuid = request.args.get("puuid", "").strip() or None
+
+    if puuid:
+        return name, region, puuid, None
+    if not name:
+        return name, region, puuid, (jsonify({"error": "name is required"}), 400)
+    if "#" not in name:
+        return name, region, puuid, (jsonify({"error": "Use Riot ID format: Name#TAG"}), 400)
+    return name, region, puuid, None
+
+
+async def _at_priority(priority: Priority, aw):
+    """Await aw with its Riot calls queued at priority."""
+    with request_priority(priority):
+        return await aw
+
+
+def _format_profile(summoner_data: dict, name: str) -> dict:
+    return {
+        "gameName": summoner_data.get("gameName", name.split("#")[0]),
+        "tagLine": summoner_data.get("tagLine", name.partition("#")[2]),
+        "summonerLevel": summoner_data.get("summonerLevel", 0),
+        "profileIconId": summoner_data.get("profileIconId", 0),
+        # Lets the frontend identify the player in scoreboards directly
+        # instead of guessing by display-name matching.
+        "puuid": summoner_data["puuid"],
+        # The platform the lookup ran on, e.g. "EUW1" for region=AUTO.
+        "region": summoner_data.get("region"),
+    }
 
-    champion_map = _get_champion_map() or {}
-    dd_version = get_latest_version()
-    puuid = summoner_data["puuid"]
 
-    # ── Format mastery (resolve champion names server-side) ──────────
+def _format_mastery(mastery: list, champion_map: dict) -> list:
+    """Top 5 masteries with champion names resolved server-side."""
     formatted_mastery = []
     for champ in mastery[:5]:
         champ_id = str(champ["championId"])
@@ -109,84 +184,76 @@ def summoner():
             "championPoints": champ["championPoints"],
             "lastPlayTime": last_played,
         })
+    return formatted_mastery
+
+
+def _format_match(match: MatchRecord, puuid: str, champion_map: dict) -> dict | None:
+    """One match-list row with its 10-player scoreboard; None for non-ranked games."""
+    match = as_match_record(match)
+    if match.queue_id not in RANKED_QUEUES:
+        return None
+    p = match.participant(puuid)
+    if p is None:
+        return None
+
+    player_position = p.team_position
+
+    enemy_carry = None
+    if player_position:
+        enemy_carry = next(
+            (
+                champion_map.get(str(x.champion_id), "Unknown")
+                for x in match.participants
+                if x.team_id != p.team_id and x.team_position == player_position
+            ),
+            None,
+        )
 
-    # ── Format match list ────────────────────────────────────────────
-    RANKED_QUEUES = {420, 440}  # solo, flex — filter everything else
-
-    formatted_matches = []
-    for match in matches:
-        queue_id = match["info"].get("queueId", 0)
-        if queue_id not in RANKED_QUEUES:
-            continue
-        try:
-            p = next(x for x in match["info"]["participants"] if x["puuid"] == puuid)
-        except StopIteration:
-            continue
-
-        champ_id = str(p["championId"])
-        player_position = p.get("teamPosition", "")
-
-        enemy_carry = None
-        if player_position:
-            enemy_carry = next(
-                (
-                    champion_map.get(str(x["championId"]), "Unknown")
-                    for x in match["info"]["participants"]
-                    if x["teamId"] != p["teamId"] and x.get("teamPosition") == player_position
-                ),
-                None,
-            )
-
-        # Build full 10-player scoreboard (no rank — avoids 10 extra API calls on personal key)
-        all_participants = []
-        for part in match["info"]["participants"]:
-            pid = str(part["championId"])
-            all_participants.append({
-                "puuid": part.get("puuid", ""),
-                "riotIdGameName": part.get("riotIdGameName") or part.get("summonerName", ""),
-                "riotIdTagline": part.get("riotIdTagline", ""),
-                "championName": champion_map.get(pid, "Unknown"),
-                "championId": part["championId"],
-                "teamId": part["teamId"],
-                "teamPosition": part.get("teamPosition", ""),
-                "kills": part["kills"],
-                "deaths": part["deaths"],
-                "assists": part["assists"],
-                "damage": part.get("totalDamageDealtToChampions", 0),
-                "gold": part.get("goldEarned", 0),
-                "cs": part.get("totalMinionsKilled", 0) + part.get("neutralMinionsKilled", 0),
-                "items": [part.get(f"item{i}", 0) for i in range(7)],
-                "perks": part.get("perks", {}),
-                "win": part["win"],
-            })
-
-        formatted_matches.append({
-            "matchId": match["metadata"]["matchId"],
-            "queueId": queue_id,
-            "gameEndTimestamp": match["info"].get("gameEndTimestamp"),
-            "champion": champion_map.get(champ_id, "Unknown"),
-            "championId": p["championId"],
-            "win": p["win"],
-            "result": "Victory" if p["win"] else "Defeat",
-            "kills": p["kills"],
-            "deaths": p["deaths"],
-            "assists": p["assists"],
-            "cs": p.get("totalMinionsKilled", 0) + p.get("neutralMinionsKilled", 0),
-            "duration": match["info"]["gameDuration"] // 60,
-            "role": player_position,
-            "items": [p.get(f"item{i}", 0) for i in range(7)],
-            "enemy_carry": enemy_carry,
-            "participants": all_participants,
+    # Build full 10-player scoreboard. Ranks aren't included (10 extra API calls
+    # per match); the frontend asks /api/ranks for them separately.
+    all_participants = []
+    for part in match.participants:
+        all_participants.append({
+            "puuid": part.puuid,
+            "riotIdGameName": part.game_name,
+            "riotIdTagline": part.tag_line,
+            "championName": champion_map.get(str(part.champion_id), "Unknown"),
+            "championId": part.champion_id,
+            "teamId": part.team_id,
+            "teamPosition": part.team_position,
+            "kills": part.kills,
+            "deaths": part.deaths,
+            "assists": part.assists,
+            "damage": part.damage,
+            "gold": part.gold,
+            "cs": part.cs,
+            "items": list(part.items),
+            "perks": part.perks,
+            "win": part.win,
         })
 
-    # ── Run analysis on raw match data (ranked queues only, so the stats
-    #    match what the UI displays even if the fetch filter ever changes) ──
-    ranked_matches = [
-        m for m in matches if m["info"].get("queueId", 0) in RANKED_QUEUES
-    ]
-    match_analysis = analyze_match_history(ranked_matches, puuid) if ranked_matches else {}
-    champ_stats_raw = analyze_champion_stats(ranked_matches, puuid) if ranked_matches else {}
+    return {
+        "matchId": match.match_id,
+        "queueId": match.queue_id,
+        "gameEndTimestamp": match.ended,
+        "champion": champion_map.get(str(p.champion_id), "Unknown"),
+        "championId": p.champion_id,
+        "win": p.win,
+        "result": "Victory" if p.win else "Defeat",
+        "kills": p.kills,
+        "deaths": p.deaths,
+        "assists": p.assists,
+        "cs": p.cs,
+        "duration": match.duration // 60,
+        "role": player_position,
+        "items": list(p.items),
+        "enemy_carry": enemy_carry,
+        "participants": all_participants,
+    }
+
 
+def _serialise_analysis(match_analysis: dict, champ_stats_raw: dict) -> tuple[dict, dict]:
+    """JSON-ready (champion_stats, match_analysis)."""
     # Serialise champion_stats (core_items contains tuples → convert to lists)
     champ_stats = {}
     for champ_name, stats in champ_stats_raw.items():
@@ -203,38 +270,509 @@ def summoner():
         k: v for k, v in match_analysis.items()
         if k not in ("game_durations", "recent_performance")
     }
+    return champ_stats, serialised_analysis
 
-    # Best-effort meta pre-analysis for PreSessionCard (no API cost, uses cache)
-    meta_summary: dict | None = None
-    if _META_AVAILABLE and champ_stats:
-        try:
-            solo = next((q for q in ranked if q.get("queueType") == "RANKED_SOLO_5x5"), None)
-            tier = solo.get("tier", "DEFAULT") if solo else "DEFAULT"
-            meta_summary = _analyze_meta_gaps(champ_stats, serialised_analysis, formatted_matches, tier)
-        except Exception:
-            pass
 
-    return jsonify({
-        "dd_version": dd_version,
-        "summoner": {
-            "gameName": summoner_data.get("gameName", name.split("#")[0]),
-            "tagLine": summoner_data.get("tagLine", ""),
-            "summonerLevel": summoner_data.get("summonerLevel", 0),
-            "profileIconId": summoner_data.get("profileIconId", 0),
-            # Lets the frontend identify the player in scoreboards directly
-            # instead of guessing by display-name matching.
-            "puuid": puuid,
-        },
+def _meta_summary(ranked: list, champ_stats: dict, serialised_analysis: dict, formatted_matches: list):
+    """Best-effort meta pre-analysis for PreSessionCard (no API cost, uses cache)."""
+    if not (_META_AVAILABLE and champ_stats):
+        return None
+    try:
+        solo = next((q for q in ranked if q.get("queueType") == "RANKED_SOLO_5x5"), None)
+        tier = solo.get("tier", "DEFAULT") if solo else "DEFAULT"
+        return _analyze_meta_gaps(champ_stats, serialised_analysis, formatted_matches, tier)
+    except Exception:
+        return None
+
+
+def _shed_over_budget(admission):
+    """
+    A 503 + Retry-After if the Riot budget can't serve a lookup before it'd
+    time out, per admission (admit_lookups / admit_missing / admit_match_page);
+    None to go ahead.
+    """
+    retry_after = get_client().run(admission)
+    if retry_after is None:
+        return None
+    response = jsonify({
+        "error": "Riot API budget is used up right now — please try again shortly.",
+        "retry_after": retry_after,
+    })
+    response.status_code = 503
+    response.headers["Retry-After"] = str(retry_after)
+    return response
+
+
+def _admin_forbidden():
+    """
+    A 403 unless the request carries "Authorization: Bearer <ADMIN_TOKEN>";
+    None to go ahead. Without ADMIN_TOKEN set, admin actions are disabled.
+    """
+    if ADMIN_TOKEN is None:
+        return jsonify({"error": "Admin actions are disabled (ADMIN_TOKEN is not set)."}), 403
+    scheme, _, token = request.headers.get("Authorization", "").partition(" ")
+    if scheme.lower() != "bearer" or not hmac.compare_digest(token.strip().encode(), ADMIN_TOKEN.encode()):
+        return jsonify({"error": "A valid admin token is required."}), 403
+    return None
+
+
+def _resume_refresh_if_tracked(puuid: str) -> None:
+    """A cold instance restarts the refresh worker on the first tracked lookup."""
+    if get_match_store().is_tracked(puuid):
+        get_refresh_worker().ensure_started()
+
+
+def _player_payload(name, summoner_data, ranked, mastery, matches, status, ranked_analysis) -> dict:
+    """The per-player part of a /api/summoner response."""
+    champion_map = _get_champion_map() or {}
+    puuid = summoner_data["puuid"]
+    _resume_refresh_if_tracked(puuid)
+
+    formatted_mastery = _format_mastery(mastery, champion_map)
+    formatted_matches = [
+        row for row in (_format_match(m, puuid, champion_map) for m in matches) if row
+    ]
+
+    # ── Analysis on raw match data (ranked queues only, so the stats
+    #    match what the UI displays even if the fetch filter ever changes).
+    #    Aggregated incrementally while the matches were downloading. ──
+    matches = [as_match_record(m) for m in matches]
+    has_ranked = any(m.queue_id in RANKED_QUEUES for m in matches)
+    match_analysis, champ_stats_raw = ranked_analysis.results(puuid, matches)
+    if not has_ranked:
+        match_analysis = {}
+    champ_stats, serialised_analysis = _serialise_analysis(match_analysis, champ_stats_raw)
+
+    meta_summary = _meta_summary(ranked, champ_stats, serialised_analysis, formatted_matches)
+
+    return {
+        "summoner": _format_profile(summoner_data, name),
         "ranked": ranked,
         "mastery": formatted_mastery,
         "matches": formatted_matches,
         "champion_stats": champ_stats,
         "match_analysis": serialised_analysis,
         "meta": meta_summary,
+        # Which sections made it; anything missing can be filled in with
+        # /api/summoner/missing instead of repeating the whole lookup.
+        "status": status,
+    }
+
+
+@app.route("/api/summoner")
+def summoner():
+    name, region, puuid, error = _summoner_args()
+    if error:
+        return error
+    # Hover prefetches of a scoreboard player queue behind real lookups.
+    priority = Priority.PREFETCH if request.args.get("prefetch") == "1" else Priority.INTERACTIVE
+    shed = _shed_over_budget(admit_lookups([(name, region, puuid)], priority))
+    if shed:
+        return shed
+
+    ranked_analysis = _RankedAnalysis()
+    try:
+        summoner_data, ranked, mastery, matches, status = get_client().run(_at_priority(
+            priority,
+            get_summoner_data_async(
+                name, region, analyzers=ranked_analysis, deadline=REQUEST_DEADLINE, puuid=puuid,
+            ),
+        ))
+    except Exception as exc:
+        return _lookup_error_response(exc)
+
+    return jsonify({
+        "dd_version": get_latest_version(),
+        **_player_payload(name, summoner_data, ranked, mastery, matches, status, ranked_analysis),
         "rune_tree": _get_rune_tree(),
     })
 
 
+@app.route("/api/summoner/batch", methods=["POST"])
+def summoner_batch():
+    """
+    Look up a whole team at once: {"names": ["Name#TAG", ...], "region": "NA"}.
+
+    Matches shared between the players are downloaded once. Returns
+    {"players": [...], "dedup": {...}}, one entry per name in order: the
+    /api/summoner payload for that player, or {"name", "error", "code"} if
+    they couldn't be looked up.
+    """
+    body = request.get_json(silent=True) or {}
+    names = body.get("names")
+    region = str(body.get("region", "NA")).strip()
+    if not isinstance(names, list) or not names:
+        return jsonify({"error": "names must be a non-empty list of Riot IDs"}), 400
+    names = [str(n).strip() for n in names]
+    if len(names) > MAX_BATCH_SUMMONERS:
+        return jsonify({"error": f"At most {MAX_BATCH_SUMMONERS} summoners per batch."}), 400
+    bad = [n for n in names if "#" not in n]
+    if bad:
+        return jsonify({"error": f"Use Riot ID format: Name#TAG ({', '.join(bad)})"}), 400
+    shed = _shed_over_budget(admit_lookups([(n, region, None) for n in names], Priority.INTERACTIVE))
+    if shed:
+        return shed
+
+    analyses = {}
+
+    def _analyzers(puuid):
+        analyses[puuid] = _RankedAnalysis()
+        return analyses[puuid](puuid)
+
+    try:
+        players, totals = get_client().run(
+            get_summoners_data_async(names, region, analyzers=_analyzers, deadline=REQUEST_DEADLINE)
+        )
+    except Exception as exc:
+        return _lookup_error_response(exc)
+
+    results = []
+    for player in players:
+        if "error" in player:
+            response, code = _lookup_error_response(player["error"])
+            results.append({"name": player["name"], **response.get_json(), "code": code})
+            continue
+        puuid = player["summoner"]["puuid"]
+        results.append({"name": player["name"], **_player_payload(
+            player["name"], player["summoner"], player["ranked"], player["mastery"],
+            player["matches"], player["status"], analyses.get(puuid) or _RankedAnalysis(),
+        )})
+
+    return jsonify({
+        "dd_version": get_latest_version(),
+        "players": results,
+        "dedup": {**totals, "shared": totals["listed_matches"] - totals["unique_matches"]},
+        "rune_tree": _get_rune_tree(),
+    })
+
+
+def _format_rank(entries: list) -> dict | None:
+    """A scoreboard badge: solo queue rank, else flex; None for unranked."""
+    by_queue = {q.get("queueType"): q for q in entries}
+    queue = by_queue.get("RANKED_SOLO_5x5") or by_queue.get("RANKED_FLEX_SR")
+    if not queue:
+        return None
+    return {
+        "queueType": queue["queueType"],
+        "tier": queue.get("tier"),
+        "rank": queue.get("rank"),
+        "leaguePoints": queue.get("leaguePoints", 0),
+    }
+
+
+@app.route("/api/ranks", methods=["POST"])
+def scoreboard_ranks():
+    """
+    Ranks for scoreboard participants, loaded after the match list:
+    {"puuids": [...], "region": "NA"}.
+
+    Returns {"ranks": {puuid: badge | null}, "pending": [...], "complete"}.
+    Only a budgeted few uncached players are fetched per call, so the
+    frontend polls with the pending PUUIDs until complete.
+    """
+    body = request.get_json(silent=True) or {}
+    puuids = body.get("puuids")
+    region = str(body.get("region", "NA")).strip()
+    if not isinstance(puuids, list) or not all(isinstance(p, str) and p for p in puuids):
+        return jsonify({"error": "puuids must be a list of PUUIDs"}), 400
+    if len(puuids) > MAX_RANK_PUUIDS:
+        return jsonify({"error": f"At most {MAX_RANK_PUUIDS} PUUIDs per call."}), 400
+
+    try:
+        ranks, pending = get_client().run(get_ranks_async(puuids, region, deadline=REQUEST_DEADLINE))
+    except Exception as exc:
+        return _lookup_error_response(exc)
+
+    return jsonify({
+        "ranks": {puuid: _format_rank(entries) for puuid, entries in ranks.items()},
+        "pending": pending,
+        "complete": not pending,
+    })
+
+
+@app.route("/api/summoner/missing")
+def summoner_missing():
+    """
+    Fetch only what an earlier /api/summoner response's status block
+    reported missing:
+
+        ?puuid=...&region=NA&sections=ranked,mastery&matches=NA1_1,NA1_2
+
+    sections takes the status block's failed_sections, matches its
+    missing_matches (at most MATCH_HISTORY_COUNT; only IDs from the player's
+    stored history are retried). Returns just those sections (formatted as in
+    /api/summoner) and a fresh status block; when match data was requested,
+    "matches" is the player's full list again with champion_stats and
+    match_analysis recomputed, all from stored details except the retried ones.
+    """
+    puuid = request.args.get("puuid", "").strip()
+    region = request.args.get("region", "NA").strip()
+    sections = [s for s in request.args.get("sections", "").split(",") if s]
+    match_ids = [m for m in request.args.get("matches", "").split(",") if m]
+    if not puuid:
+        return jsonify({"error": "puuid is required"}), 400
+    unknown = set(sections) - set(RETRYABLE_SECTIONS)
+    if unknown:
+        return jsonify({"error": f"Unknown sections: {', '.join(sorted(unknown))}"}), 400
+    if len(match_ids) > MATCH_HISTORY_COUNT:
+        return jsonify({"error": f"At most {MATCH_HISTORY_COUNT} matches per call."}), 400
+    shed = _shed_over_budget(admit_missing(puuid, region, sections, match_ids, Priority.INTERACTIVE))
+    if shed:
+        return shed
+
+    try:
+        data, status = get_client().run(
+            fetch_missing_async(puuid, region, sections, match_ids, deadline=REQUEST_DEADLINE)
+        )
+    except Exception as exc:
+        return _lookup_error_response(exc)
+
+    champion_map = _get_champion_map() or {}
+    response = {"status": status}
+    if "ranked" in data:
+        response["ranked"] = data["ranked"]
+    if "mastery" in data:
+        response["mastery"] = _format_mastery(data["mastery"], champion_map)
+    if "matches" in data and (match_ids or "match_ids" in sections):
+        matches = [as_match_record(m) for m in data["matches"]]
+        response["matches"] = [
+            row for row in (_format_match(m, puuid, champion_map) for m in matches) if row
+        ]
+        match_analysis, champ_stats_raw = _RankedAnalysis().results(puuid, matches)
+        if not any(m.queue_id in RANKED_QUEUES for m in matches):
+            match_analysis = {}
+        response["champion_stats"], response["match_analysis"] = _serialise_analysis(
+            match_analysis, champ_stats_raw,
+        )
+    return jsonify(response)
+
+
+@app.route("/api/summoner/stream")
+def summoner_stream():
+    """
+    Progressive variant of /api/summoner, as NDJSON — one {"section", "data"}
+    object per line:
+
+        profile      dd_version, summoner, rune_tree  (right after account lookup)
+        ranked       league entries; sent again with per-queue stats at the end
+        mastery
+        match        one formatted match per line as each download lands
+        status       which sections succeeded / failed, missing match IDs
+        champion_stats, match_analysis, meta          once all matches are in
+        done
+
+    Errors before the first line keep their HTTP status; later failures are
+    sent as a final {"section": "error"} line.
+    """
+    name, region, puuid, error = _summoner_args()
+    if error:
+        return error
+    shed = _shed_over_budget(admit_lookups([(name, region, puuid)], Priority.INTERACTIVE))
+    if shed:
+        return shed
+
+    client = get_client()
+    events = client.iterate(stream_summoner_data_async(name, region, REQUEST_DEADLINE, puuid))
+    try:
+        # Pull the first event before committing to a 200 so lookup
+        # failures (unknown Riot ID, bad key, ...) keep their status code.
+        first = next(events)
+    except StopIteration:
+        return jsonify({"error": "Summoner data not found."}), 404
+    except Exception as exc:
+        return _lookup_error_response(exc)
+
+    def _line(section: str, data) -> str:
+        return json.dumps({"section": section, "data": data}, separators=(",", ":")) + "\n"
+
+    def _generate():
+        champion_map = _get_champion_map() or {}
+        ranked_analysis = _RankedAnalysis()
+        ranked, matches, formatted_matches = [], [], []
+        puuid = None
+        try:
+            for section, payload in itertools.chain([first], events):
+                if section == "summoner":
+                    puuid = payload["puuid"]
+                    ranked_analysis(puuid)
+                    _resume_refresh_if_tracked(puuid)
+                    yield _line("profile", {
+                        "dd_version": get_latest_version(),
+                        "summoner": _format_profile(payload, name),
+                        "rune_tree": _get_rune_tree(),
+                    })
+                elif section == "ranked":
+                    ranked = payload
+                    yield _line("ranked", ranked)
+                elif section == "mastery":
+                    yield _line("mastery", _format_mastery(payload, champion_map))
+                elif section == "match":
+                    index, match = payload
+                    ranked_analysis.add(match, index)
+                    row = _format_match(match, puuid, champion_map)
+                    if row:
+                        yield _line("match", {"index": index, **row})
+                elif section == "status":
+                    yield _line("status", payload)
+                elif section == "matches":
+                    matches = [as_match_record(m) for m in payload]
+        except Exception as exc:
+            response, status = _lookup_error_response(exc)
+            yield _line("error", {**response.get_json(), "status": status})
+            return
+
+        formatted_matches = [
+            row for row in (_format_match(m, puuid, champion_map) for m in matches) if row
+        ]
+        has_ranked = any(m.queue_id in RANKED_QUEUES for m in matches)
+        match_analysis, champ_stats_raw = ranked_analysis.results(puuid, matches)
+        if not has_ranked:
+            match_analysis = {}
+        champ_stats, serialised_analysis = _serialise_analysis(match_analysis, champ_stats_raw)
+        yield _line("champion_stats", champ_stats)
+        yield _line("match_analysis", serialised_analysis)
+        yield _line("meta", _meta_summary(ranked, champ_stats, serialised_analysis, formatted_matches))
+        yield _line("done", None)
+
+    return Response(
+        stream_with_context(_generate()),
+        mimetype="application/x-ndjson",
+        headers={"Cache-Control": "no-store", "X-Accel-Buffering": "no"},
+    )
+
+
+@app.route("/api/matches")
+def match_pages():
+    """
+    Deeper ranked history, one page at a time:
+
+        ?puuid=...&region=NA[&cursor=...][&count=20]
+
+    Returns {"matches", "next_cursor", "missing_matches", "loaded"}. Pass
+    next_cursor back for the next (older) page; it is null once the history
+    runs out. loaded is how many matches have been paged in so far, which
+    /api/matches/analysis can analyse without another Riot call.
+    """
+    puuid = request.args.get("puuid", "").strip()
+    region = request.args.get("region", "NA").strip()
+    cursor = request.args.get("cursor", "").strip() or None
+    if not puuid:
+        return jsonify({"error": "puuid is required"}), 400
+    try:
+        count = int(request.args.get("count", MATCH_PAGE_SIZE))
+    except ValueError:
+        return jsonify({"error": "count must be a number"}), 400
+
+    try:
+        shed = _shed_over_budget(admit_match_page(puuid, region, cursor, count, Priority.INTERACTIVE))
+    except ValueError as exc:
+        return jsonify({"error": str(exc)}), 400
+    if shed:
+        return shed
+
+    try:
+        matches, next_cursor, missing = get_client().run(
+            fetch_match_page_async(puuid, region, cursor, count, deadline=REQUEST_DEADLINE)
+        )
+    except ValueError as exc:
+        return jsonify({"error": str(exc)}), 400
+    except Exception as exc:
+        return _lookup_error_response(exc)
+
+    champion_map = _get_champion_map() or {}
+    pages = get_match_store().get_pages(puuid)
+    return jsonify({
+        "matches": [row for row in (_format_match(m, puuid, champion_map) for m in matches) if row],
+        "next_cursor": next_cursor,
+        "missing_matches": missing,
+        "loaded": len(pages["match_ids"]) if pages else 0,
+    })
+
+
+@app.route("/api/matches/analysis")
+def match_pages_analysis():
+    """
+    match_analysis + champion_stats over a window of the history already
+    paged in through /api/matches (?puuid=...&start=0&stop=100), read from
+    the match store — no Riot calls.
+    """
+    puuid = request.args.get("puuid", "").strip()
+    if not puuid:
+        return jsonify({"error": "puuid is required"}), 400
+    try:
+        start = int(request.args.get("start", 0))
+        stop = int(request.args["stop"]) if request.args.get("stop") else None
+    except ValueError:
+        return jsonify({"error": "start and stop must be numbers"}), 400
+    if start < 0 or (stop is not None and stop < start):
+        return jsonify({"error": "need 0 <= start <= stop"}), 400
+
+    matches = loaded_matches(puuid, start, stop)
+    match_analysis, champ_stats_raw = _RankedAnalysis().results(puuid, matches)
+    if not any(m.queue_id in RANKED_QUEUES for m in matches):
+        match_analysis = {}
+    champ_stats, serialised_analysis = _serialise_analysis(match_analysis, champ_stats_raw)
+    return jsonify({
+        "window": {"start": start, "stop": stop, "matches": len(matches)},
+        "champion_stats": champ_stats,
+        "match_analysis": serialised_analysis,
+    })
+
+
+@app.route("/api/tracked")
+def tracked_list():
+    """Summoners kept warm by the background refresh worker."""
+    return jsonify({
+        "tracked": [
+            {
+                "riotId": entry["riot_id"],
+                "region": entry["region"],
+                "puuid": entry["puuid"],
+                "refreshedAt": entry["refreshed_at"],
+            }
+            for entry in get_match_store().tracked()
+        ],
+    })
+
+
+@app.route("/api/tracked", methods=["POST"])
+def track_summoner():
+    forbidden = _admin_forbidden()
+    if forbidden:
+        return forbidden
+    payload = request.get_json(silent=True) or {}
+    name = str(payload.get("name", "")).strip()
+    region = str(payload.get("region", "NA")).strip().upper()
+    if "#" not in name:
+        return jsonify({"error": "Use Riot ID format: Name#TAG"}), 400
+
+    store = get_match_store()
+    try:
+        # Tracked players are refreshed on their own platform, so AUTO is resolved now.
+        summoner_data = get_client().run(resolve_summoner(name, region))
+    except Exception as exc:
+        return _lookup_error_response(exc)
+
+    puuid = summoner_data["puuid"]
+    if not store.is_tracked(puuid) and len(store.tracked()) >= MAX_TRACKED_SUMMONERS:
+        return jsonify({"error": f"At most {MAX_TRACKED_SUMMONERS} summoners can be tracked."}), 409
+    riot_id = f"{summoner_data['gameName']}#{summoner_data['tagLine']}"
+    region = summoner_data["region"]
+    store.track(puuid, riot_id, region)
+    get_refresh_worker().ensure_started()
+    return jsonify({"riotId": riot_id, "region": region, "puuid": puuid}), 201
+
+
+@app.route("/api/tracked/<puuid>", methods=["DELETE"])
+def untrack_summoner(puuid):
+    forbidden = _admin_forbidden()
+    if forbidden:
+        return forbidden
+    if not get_match_store().untrack(puuid):
+        return jsonify({"error": "Summoner is not tracked."}), 404
+    return "", 204
+
+
 @app.route("/api/coach", methods=["POST"])
 def coach():
     payload = request.get_json(silent=True)
@@ -259,8 +797,7 @@ def match_timeline():
     if not match_id or not puuid:
         return jsonify({"error": "id and puuid required"}), 400
 
-    from backend.utils.constants import MATCH_ROUTING, get_api_key
-    import aiohttp
+    from backend.utils.constants import MATCH_ROUTING, get_api_key, riot_url
     from backend.riot_api import _get
 
     routing = MATCH_ROUTING.get(region.upper(), "americas")
@@ -269,15 +806,14 @@ def match_timeline():
         return jsonify({"error": "API key not configured"}), 500
 
     async def _fetch():
-        async with aiohttp.ClientSession() as session:
-            return await _get(
-                session,
-                f"https://{routing}.api.riotgames.com/lol/match/v5/matches/{match_id}/timeline",
-                {"X-Riot-Token": api_key},
-            )
+        return await _get(
+            get_client().session(),
+            f"{riot_url(routing)}/lol/match/v5/matches/{match_id}/timeline",
+            {"X-Riot-Token": api_key},
+        )
 
     try:
-        timeline = asyncio.run(_fetch())
+        timeline = get_client().run(_fetch())
     except NotFoundError:
         return jsonify({"error": "Timeline not available for this match."}), 404
     except RateLimitError:
@@ -396,6 +932,16 @@ def health():
     return jsonify({"status": "ok"})
 
 
+@app.route("/api/metrics")
+def metrics():
+    """Cache and upstream-client counters for monitoring (no player data)."""
+    return jsonify({
+        "match_store": get_match_store().stats(),
+        **get_client().stats(),
+        "refresh_worker": get_refresh_worker().stats(),
+    })
+
+
 @app.route("/", defaults={"path": ""})
 @app.route("/<path:path>")
 def serve_frontend(path):
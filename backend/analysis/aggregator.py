@@ -0,0 +1,65 @@
+"""
+Base class for incremental, order-preserving match aggregators.
+
+Match details stream in out of order (whichever download finishes first), but
+several outputs depend on match order — streaks, the "recent games" list, and
+tie-breaks between equally played roles or items. An aggregator therefore
+splits the work in two:
+
+- _extract(match) runs as soon as a match arrives and does the expensive
+  part (finding the player among the participants). Returning None skips
+  the match (player absent, wrong queue, ...).
+- _fold(row) accumulates one extracted row. Rows are folded strictly in
+  match-list order: a row is held back only until every earlier index has
+  arrived, so most of the folding also overlaps the network wait.
+
+Calling add() without an index folds immediately, which is how the batch
+analyze_* functions use it. add() takes a MatchRecord (see records.py) or a
+raw match-v5 payload, which is converted first.
+"""
+from typing import Any, Collection, Dict, Optional, Union
+
+from .records import MatchRecord, ParticipantRecord, as_match_record
+
+
+class OrderedAggregator:
+    def __init__(self, puuid: str, queues: Optional[Collection[int]] = None):
+        self.puuid = puuid
+        self.queues = queues
+        self._pending: Dict[int, Any] = {}
+        self._next = 0
+
+    def add(self, match: Union[MatchRecord, Dict], index: Optional[int] = None) -> None:
+        row = self._extract(as_match_record(match))
+        if index is None:
+            if row is not None:
+                self._fold(row)
+            return
+        self._pending[index] = row
+        while self._next in self._pending:
+            row = self._pending.pop(self._next)
+            self._next += 1
+            if row is not None:
+                self._fold(row)
+
+    def _flush(self) -> None:
+        """Fold whatever is still held back (gaps left by failed downloads)."""
+        for index in sorted(self._pending):
+            row = self._pending.pop(index)
+            if row is not None:
+                self._fold(row)
+
+    def _player(self, match: MatchRecord) -> Optional[ParticipantRecord]:
+        """The tracked player's participant entry, or None if absent / filtered out."""
+        if self.queues is not None and match.queue_id not in self.queues:
+            return None
+        return match.participant(self.puuid)
+
+    def _extract(self, match: MatchRecord) -> Any:
+        raise NotImplementedError
+
+    def _fold(self, row: Any) -> None:
+        raise NotImplementedError
+
+    def result(self) -> Any:
+        raise NotImplementedError
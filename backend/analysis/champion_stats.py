@@ -1,19 +1,31 @@
 from typing import Dict, List, Any
 
-def analyze_champion_stats(matches: List[Dict], puuid: str) -> Dict[str, Any]:
-    """Analyze champion performance across matches"""
-    champion_stats = {}
-    
-    for match in matches:
-        player = next((p for p in match['info']['participants'] if p['puuid'] == puuid), None)
+from .aggregator import OrderedAggregator
+from .records import MatchRecord
+
+
+class ChampionStatsAggregator(OrderedAggregator):
+    """Incremental form of analyze_champion_stats — add() matches as they arrive."""
+
+    def __init__(self, puuid: str, queues=None):
+        super().__init__(puuid, queues)
+        self.champion_stats = {}
+
+    def _extract(self, match: MatchRecord):
+        player = self._player(match)
         if player is None:
-            continue
-        champion = player['championName']
+            return None
+        return player, match.duration
+
+    def _fold(self, row) -> None:
+        player, game_duration = row
+        champion_stats = self.champion_stats
+        champion = player.champion_name
         # Riot match-v5 reports "FiddleSticks"; Data Dragon (icons, meta cache)
         # uses "Fiddlesticks" — normalize so downstream lookups work.
         if champion == 'FiddleSticks':
             champion = 'Fiddlesticks'
-        
+
         # Initialize champion stats if not exists
         if champion not in champion_stats:
             champion_stats[champion] = {
@@ -30,48 +42,58 @@ def analyze_champion_stats(matches: List[Dict], puuid: str) -> Dict[str, Any]:
                 'items': {},
                 'total_time': 0
             }
-        
+
         stats = champion_stats[champion]
-        
+
         # Update basic stats
         stats['games'] += 1
-        stats['wins'] += 1 if player['win'] else 0
-        stats['kills'] += player['kills']
-        stats['deaths'] += player['deaths']
-        stats['assists'] += player['assists']
-        stats['cs'] += player['totalMinionsKilled'] + player.get('neutralMinionsKilled', 0)
-        stats['gold'] += player['goldEarned']
-        stats['damage'] += player['totalDamageDealtToChampions']
-        stats['vision'] += player['visionScore']
-        stats['total_time'] += match['info']['gameDuration']
-        
+        stats['wins'] += 1 if player.win else 0
+        stats['kills'] += player.kills
+        stats['deaths'] += player.deaths
+        stats['assists'] += player.assists
+        stats['cs'] += player.cs
+        stats['gold'] += player.gold
+        stats['damage'] += player.damage
+        stats['vision'] += player.vision
+        stats['total_time'] += game_duration
+
         # Track role frequency
-        role = f"{player['teamPosition']}"
+        role = player.team_position
         stats['roles'][role] = stats['roles'].get(role, 0) + 1
-        
-        # Track item builds
-        for i in range(0, 6):
-            item = player.get(f'item{i}')
-            if item and item != 0:
+
+        # Track item builds (slot 6 is the trinket)
+        for item in player.items[:6]:
+            if item:
                 stats['items'][item] = stats['items'].get(item, 0) + 1
-    
-    # Calculate averages and percentages
-    for stats in champion_stats.values():
-        games = stats['games']
-        # A remake can report gameDuration == 0 — clamp to avoid ZeroDivisionError
-        minutes = max(stats['total_time'] / 60, 1)
-        
-        stats['winrate'] = (stats['wins'] / games) * 100
-        stats['kda'] = (stats['kills'] + stats['assists']) / max(1, stats['deaths'])
-        stats['avg_kills'] = stats['kills'] / games
-        stats['avg_deaths'] = stats['deaths'] / games
-        stats['avg_assists'] = stats['assists'] / games
-        stats['cs_per_min'] = stats['cs'] / minutes
-        stats['gold_per_min'] = stats['gold'] / minutes
-        stats['damage_per_min'] = stats['damage'] / minutes
-        stats['vision_per_game'] = stats['vision'] / games
-        
-        stats['main_role'] = max(stats['roles'].items(), key=lambda x: x[1])[0]
-        stats['core_items'] = sorted(stats['items'].items(), key=lambda x: x[1], reverse=True)[:6]
-    
-    return champion_stats
+
+    def result(self) -> Dict[str, Any]:
+        self._flush()
+
+        # Calculate averages and percentages
+        for stats in self.champion_stats.values():
+            games = stats['games']
+            # A remake can report gameDuration == 0 — clamp to avoid ZeroDivisionError
+            minutes = max(stats['total_time'] / 60, 1)
+
+            stats['winrate'] = (stats['wins'] / games) * 100
+            stats['kda'] = (stats['kills'] + stats['assists']) / max(1, stats['deaths'])
+            stats['avg_kills'] = stats['kills'] / games
+            stats['avg_deaths'] = stats['deaths'] / games
+            stats['avg_assists'] = stats['assists'] / games
+            stats['cs_per_min'] = stats['cs'] / minutes
+            stats['gold_per_min'] = stats['gold'] / minutes
+            stats['damage_per_min'] = stats['damage'] / minutes
+            stats['vision_per_game'] = stats['vision'] / games
+
+            stats['main_role'] = max(stats['roles'].items(), key=lambda x: x[1])[0]
+            stats['core_items'] = sorted(stats['items'].items(), key=lambda x: x[1], reverse=True)[:6]
+
+        return self.champion_stats
+
+
+def analyze_champion_stats(matches: List[Dict], puuid: str) -> Dict[str, Any]:
+    """Analyze champion performance across matches"""
+    aggregator = ChampionStatsAggregator(puuid)
+    for match in matches:
+        aggregator.add(match)
+    return aggregator.result()
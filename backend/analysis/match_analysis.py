@@ -1,31 +1,43 @@
 from typing import Dict, List, Any
 
-def analyze_match_history(matches: List[Dict], puuid: str) -> Dict[str, Any]:
-    """Analyze match history for trends and patterns"""
-    match_analysis = {
-        'total_games': 0,
-        'wins': 0,
-        'losses': 0,
-        'roles': {},
-        'game_durations': [],
-        'performance_by_role': {},
-        'recent_performance': []  # Last 5 games
-    }
-    
-    for match in matches:
-        player = next((p for p in match['info']['participants'] if p['puuid'] == puuid), None)
+from .aggregator import OrderedAggregator
+from .records import MatchRecord
+
+
+class MatchHistoryAggregator(OrderedAggregator):
+    """Incremental form of analyze_match_history — add() matches as they arrive."""
+
+    def __init__(self, puuid: str, queues=None):
+        super().__init__(puuid, queues)
+        self.match_analysis = {
+            'total_games': 0,
+            'wins': 0,
+            'losses': 0,
+            'roles': {},
+            'game_durations': [],
+            'performance_by_role': {},
+            'recent_performance': []  # Last 5 games
+        }
+
+    def _extract(self, match: MatchRecord):
+        player = self._player(match)
         if player is None:
-            continue
+            return None
+        return player, match.duration
+
+    def _fold(self, row) -> None:
+        player, game_duration = row
+        match_analysis = self.match_analysis
 
         # Basic match stats
         match_analysis['total_games'] += 1
-        match_analysis['wins'] += 1 if player['win'] else 0
-        match_analysis['losses'] += 1 if not player['win'] else 0
-        
+        match_analysis['wins'] += 1 if player.win else 0
+        match_analysis['losses'] += 1 if not player.win else 0
+
         # Role tracking
-        role = player['teamPosition']
+        role = player.team_position
         match_analysis['roles'][role] = match_analysis['roles'].get(role, 0) + 1
-        
+
         # Track performance by role
         if role not in match_analysis['performance_by_role']:
             match_analysis['performance_by_role'][role] = {
@@ -35,42 +47,54 @@ def analyze_match_history(matches: List[Dict], puuid: str) -> Dict[str, Any]:
                 'deaths': 0,
                 'assists': 0
             }
-        
+
         role_stats = match_analysis['performance_by_role'][role]
         role_stats['games'] += 1
-        role_stats['wins'] += 1 if player['win'] else 0
-        role_stats['kills'] += player['kills']
-        role_stats['deaths'] += player['deaths']
-        role_stats['assists'] += player['assists']
-        
+        role_stats['wins'] += 1 if player.win else 0
+        role_stats['kills'] += player.kills
+        role_stats['deaths'] += player.deaths
+        role_stats['assists'] += player.assists
+
         # Track game duration
-        match_analysis['game_durations'].append(match['info']['gameDuration'])
-        
+        match_analysis['game_durations'].append(game_duration)
+
         # Recent performance
         recent_game = {
-            'champion': player['championName'],
-            'result': 'Victory' if player['win'] else 'Defeat',
-            'kda': f"{player['kills']}/{player['deaths']}/{player['assists']}",
+            'champion': player.champion_name,
+            'result': 'Victory' if player.win else 'Defeat',
+            'kda': f"{player.kills}/{player.deaths}/{player.assists}",
             'role': role,
-            'cs': player['totalMinionsKilled'] + player.get('neutralMinionsKilled', 0)
+            'cs': player.cs
         }
         match_analysis['recent_performance'].append(recent_game)
-    
-    # Calculate averages and percentages
-    if match_analysis['total_games'] > 0:
-        match_analysis['winrate'] = (match_analysis['wins'] / match_analysis['total_games']) * 100
-        match_analysis['avg_game_duration'] = sum(match_analysis['game_durations']) / len(match_analysis['game_durations'])
-        
-        # Calculate role preferences
-        match_analysis['role_preferences'] = {
-            role: (games / match_analysis['total_games'] * 100)
-            for role, games in match_analysis['roles'].items()
-        }
-        
-        # Calculate role performance
-        for role, stats in match_analysis['performance_by_role'].items():
-            if stats['games'] > 0:
-                stats['winrate'] = (stats['wins'] / stats['games']) * 100
-                stats['avg_kda'] = (stats['kills'] + stats['assists']) / max(1, stats['deaths'])
-    
-    return match_analysis
+
+    def result(self) -> Dict[str, Any]:
+        self._flush()
+        match_analysis = self.match_analysis
+
+        # Calculate averages and percentages
+        if match_analysis['total_games'] > 0:
+            match_analysis['winrate'] = (match_analysis['wins'] / match_analysis['total_games']) * 100
+            match_analysis['avg_game_duration'] = sum(match_analysis['game_durations']) / len(match_analysis['game_durations'])
+
+            # Calculate role preferences
+            match_analysis['role_preferences'] = {
+                role: (games / match_analysis['total_games'] * 100)
+                for role, games in match_analysis['roles'].items()
+            }
+
+            # Calculate role performance
+            for role, stats in match_analysis['performance_by_role'].items():
+                if stats['games'] > 0:
+                    stats['winrate'] = (stats['wins'] / stats['games']) * 100
+                    stats['avg_kda'] = (stats['kills'] + stats['assists']) / max(1, stats['deaths'])
+
+        return match_analysis
+
+
+def analyze_match_history(matches: List[Dict], puuid: str) -> Dict[str, Any]:
+    """Analyze match history for trends and patterns"""
+    aggregator = MatchHistoryAggregator(puuid)
+    for match in matches:
+        aggregator.add(match)
+    return aggregator.result()
@@ -0,0 +1,86 @@
+"""
+Compact match records.
+
+A match-v5 payload carries well over 100 fields for each of its 10
+participants, and the app reads about 20 of them. MatchRecord and
+ParticipantRecord keep just those, in __slots__ classes, and are built once
+when a match is decoded (riot_api.stream_match_details). Every downstream
+consumer — the aggregators, the per-queue stats and the /api/summoner
+formatting — reads attributes instead of walking the raw dicts.
+
+The raw payload is still what the MatchStore persists, so adding a field
+here never needs a re-download.
+
+as_match_record() accepts either form, so callers holding a raw payload
+(tests, the batch analyze_* helpers) keep working.
+"""
+from typing import Any, Dict, Optional, Tuple, Union
+
+ITEM_SLOTS = 7
+
+
+class ParticipantRecord:
+    """One player's line in a match."""
+
+    __slots__ = (
+        "puuid", "game_name", "tag_line",
+        "champion_id", "champion_name", "team_id", "team_position", "win",
+        "kills", "deaths", "assists", "minions", "neutral_minions",
+        "gold", "damage", "vision", "items", "perks",
+    )
+
+    def __init__(self, p: Dict[str, Any]):
+        self.puuid: str = p.get("puuid", "")
+        self.game_name: str = p.get("riotIdGameName") or p.get("summonerName", "")
+        self.tag_line: str = p.get("riotIdTagline", "")
+        self.champion_id: int = p.get("championId", 0)
+        self.champion_name: str = p.get("championName", "")
+        self.team_id: int = p.get("teamId", 0)
+        self.team_position: str = p.get("teamPosition", "")
+        self.win: bool = bool(p.get("win", False))
+        self.kills: int = p.get("kills", 0)
+        self.deaths: int = p.get("deaths", 0)
+        self.assists: int = p.get("assists", 0)
+        self.minions: int = p.get("totalMinionsKilled", 0)
+        self.neutral_minions: int = p.get("neutralMinionsKilled", 0)
+        self.gold: int = p.get("goldEarned", 0)
+        self.damage: int = p.get("totalDamageDealtToChampions", 0)
+        self.vision: int = p.get("visionScore", 0)
+        self.items: Tuple[int, ...] = tuple(p.get(f"item{i}", 0) for i in range(ITEM_SLOTS))
+        self.perks: Dict[str, Any] = p.get("perks", {})
+
+    @property
+    def cs(self) -> int:
+        return self.minions + self.neutral_minions
+
+
+class MatchRecord:
+    """The fields of a match-v5 payload the app uses."""
+
+    __slots__ = ("match_id", "queue_id", "duration", "created", "ended", "participants")
+
+    def __init__(self, payload: Dict[str, Any]):
+        info = payload.get("info", {})
+        self.match_id: Optional[str] = payload.get("metadata", {}).get("matchId")
+        self.queue_id: int = info.get("queueId", 0)
+        self.duration: int = info.get("gameDuration", 0)
+        self.created: Optional[int] = info.get("gameCreation")
+        self.ended: Optional[int] = info.get("gameEndTimestamp")
+        self.participants: Tuple[ParticipantRecord, ...] = tuple(
+            ParticipantRecord(p) for p in info.get("participants", ())
+        )
+
+    def participant(self, puuid: str) -> Optional[ParticipantRecord]:
+        return next((p for p in self.participants if p.puuid == puuid), None)
+
+    @property
+    def timestamp(self) -> int:
+        """End time (ms), falling back to creation time; 0 if unknown."""
+        return self.ended or self.created or 0
+
+    def __repr__(self) -> str:
+        return f"MatchRecord({self.match_id!r}, queue={self.queue_id})"
+
+
+def as_match_record(match: Union[MatchRecord, Dict[str, Any]]) -> MatchRecord:
+    return match if isinstance(match, MatchRecord) else MatchRecord(match)
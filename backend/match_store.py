@@ -0,0 +1,303 @@
+"""
+Persistent match-detail store.
+
+A finished match-v5 payload never changes, so once it has been downloaded
+there is no reason to ask Riot for it again. The store keeps the raw payload
+(zlib-compressed JSON) in a small SQLite file keyed by matchId, together with
+the routing region it came from.
+
+- get() / put() are thread-safe; a single process-wide instance is shared
+  through get_match_store(). On the Riot client's event loop use
+  get_async() / put_async(), which run them in a worker thread so a file
+  locked by another process (waited on for at most MATCH_STORE_TIMEOUT)
+  never stalls every in-flight request.
+- The table is capped at max_entries rows; the least recently read matches
+  are evicted first.
+- Hit/miss/eviction counters are kept for monitoring (see stats()).
+
+It also remembers, per PUUID, the ranked match IDs last seen for that player
+and the end timestamp of the newest one, so the next lookup only has to ask
+match-v5 for games played since then (see riot_api._sync_match_ids), and
+the deeper history paged in through /api/matches (see
+riot_api.fetch_match_page_async). Those per-PUUID rows are dropped once
+they go history_ttl seconds without a lookup, unless the player is tracked.
+
+Finally it holds the tracked-summoner registry: the players whose data the
+refresh worker keeps warm in the background (see refresh_worker.py).
+"""
+import asyncio
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+import zlib
+from typing import Any, Dict, List, Optional
+
+from .utils.constants import (
+    MATCH_HISTORY_RETENTION,
+    MATCH_STORE_MAX_ENTRIES,
+    MATCH_STORE_PATH,
+    MATCH_STORE_TIMEOUT,
+)
+
+logger = logging.getLogger(__name__)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS matches (
+    match_id    TEXT PRIMARY KEY,
+    region      TEXT NOT NULL,
+    payload     BLOB NOT NULL,
+    fetched_at  REAL NOT NULL,
+    accessed_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS matches_accessed_at ON matches (accessed_at);
+CREATE TABLE IF NOT EXISTS match_history (
+    puuid           TEXT PRIMARY KEY,
+    region          TEXT NOT NULL,
+    match_ids       TEXT NOT NULL,
+    newest_match_id TEXT,
+    newest_ts       INTEGER,
+    synced_at       REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS match_pages (
+    puuid     TEXT PRIMARY KEY,
+    region    TEXT NOT NULL,
+    match_ids TEXT NOT NULL,
+    end_time  INTEGER NOT NULL,
+    loaded_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS tracked_summoners (
+    puuid        TEXT PRIMARY KEY,
+    riot_id      TEXT NOT NULL,
+    region       TEXT NOT NULL,
+    added_at     REAL NOT NULL,
+    refreshed_at REAL
+);
+"""
+
+
+class MatchStore:
+    """SQLite-backed, size-capped store of raw match-v5 payloads."""
+
+    def __init__(
+        self,
+        path: str = MATCH_STORE_PATH,
+        max_entries: int = MATCH_STORE_MAX_ENTRIES,
+        timeout: float = MATCH_STORE_TIMEOUT,
+        history_ttl: float = MATCH_HISTORY_RETENTION,
+    ):
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.path = path
+        self.max_entries = max_entries
+        self.history_ttl = history_ttl
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, timeout=timeout, check_same_thread=False, isolation_level=None)
+        self._conn.executescript(_SCHEMA)
+        self._count = self._conn.execute("SELECT COUNT(*) FROM matches").fetchone()[0]
+
+    def get(self, match_id: str) -> Optional[Dict[str, Any]]:
+        """Return the stored payload for match_id, or None on a miss."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT payload FROM matches WHERE match_id = ?", (match_id,)
+            ).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._conn.execute(
+                "UPDATE matches SET accessed_at = ? WHERE match_id = ?",
+                (time.time(), match_id),
+            )
+        return json.loads(zlib.decompress(row[0]))
+
+    def put(self, match_id: str, region: str, payload: Dict[str, Any]) -> None:
+        """Store a payload, evicting the least recently read rows past the cap."""
+        blob = zlib.compress(json.dumps(payload, separators=(",", ":")).encode())
+        now = time.time()
+        with self._lock:
+            cur = self._conn.execute(
+                "INSERT OR IGNORE INTO matches (match_id, region, payload, fetched_at, accessed_at)"
+                " VALUES (?, ?, ?, ?, ?)",
+                (match_id, region, blob, now, now),
+            )
+            self._count += cur.rowcount
+            overflow = self._count - self.max_entries
+            if overflow > 0:
+                self._conn.execute(
+                    "DELETE FROM matches WHERE match_id IN ("
+                    " SELECT match_id FROM matches ORDER BY accessed_at ASC LIMIT ?)",
+                    (overflow,),
+                )
+                self._count -= overflow
+                self.evictions += overflow
+
+    async def get_async(self, match_id: str) -> Optional[Dict[str, Any]]:
+        """get() off the event loop; a store that stays locked is a miss."""
+        try:
+            return await asyncio.to_thread(self.get, match_id)
+        except sqlite3.OperationalError as exc:
+            logger.warning("Match store read of %s failed: %s", match_id, exc)
+            return None
+
+    async def put_async(self, match_id: str, region: str, payload: Dict[str, Any]) -> None:
+        """put() off the event loop; a store that stays locked just skips the write."""
+        try:
+            await asyncio.to_thread(self.put, match_id, region, payload)
+        except sqlite3.OperationalError as exc:
+            logger.warning("Match store write of %s failed: %s", match_id, exc)
+
+    def _forget_stale_history(self) -> None:
+        """Drop per-PUUID rows of untracked players not looked up within history_ttl. Caller holds _lock."""
+        cutoff = time.time() - self.history_ttl
+        for table, column in (("match_history", "synced_at"), ("match_pages", "loaded_at")):
+            self._conn.execute(
+                f"DELETE FROM {table} WHERE {column} < ?"
+                " AND puuid NOT IN (SELECT puuid FROM tracked_summoners)",
+                (cutoff,),
+            )
+
+    def get_history(self, puuid: str) -> Optional[Dict[str, Any]]:
+        """Sync state for a PUUID: match_ids (newest first), newest_match_id, newest_ts (ms)."""
+        with self._lock:
+            self._forget_stale_history()
+            row = self._conn.execute(
+                "SELECT region, match_ids, newest_match_id, newest_ts, synced_at"
+                " FROM match_history WHERE puuid = ?", (puuid,)
+            ).fetchone()
+        if row is None:
+            return None
+        return {
+            "region": row[0],
+            "match_ids": json.loads(row[1]),
+            "newest_match_id": row[2],
+            "newest_ts": row[3],
+            "synced_at": row[4],
+        }
+
+    def put_history(
+        self,
+        puuid: str,
+        region: str,
+        match_ids: List[str],
+        newest_ts: Optional[int],
+    ) -> None:
+        with self._lock:
+            self._forget_stale_history()
+            self._conn.execute(
+                "INSERT OR REPLACE INTO match_history"
+                " (puuid, region, match_ids, newest_match_id, newest_ts, synced_at)"
+                " VALUES (?, ?, ?, ?, ?, ?)",
+                (puuid, region, json.dumps(match_ids), match_ids[0] if match_ids else None,
+                 newest_ts, time.time()),
+            )
+
+    def get_pages(self, puuid: str) -> Optional[Dict[str, Any]]:
+        """
+        Deep history paged in so far: match_ids (newest first) listed up to
+        end_time (epoch seconds, the pin every page of it shares).
+        """
+        with self._lock:
+            self._forget_stale_history()
+            row = self._conn.execute(
+                "SELECT region, match_ids, end_time, loaded_at FROM match_pages WHERE puuid = ?", (puuid,)
+            ).fetchone()
+        if row is None:
+            return None
+        return {"region": row[0], "match_ids": json.loads(row[1]), "end_time": row[2], "loaded_at": row[3]}
+
+    def put_pages(self, puuid: str, region: str, match_ids: List[str], end_time: int) -> None:
+        with self._lock:
+            self._forget_stale_history()
+            self._conn.execute(
+                "INSERT OR REPLACE INTO match_pages (puuid, region, match_ids, end_time, loaded_at)"
+                " VALUES (?, ?, ?, ?, ?)",
+                (puuid, region, json.dumps(match_ids), end_time, time.time()),
+            )
+
+    def track(self, puuid: str, riot_id: str, region: str) -> None:
+        """Add (or re-label) a tracked summoner; keeps its refresh state."""
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO tracked_summoners (puuid, riot_id, region, added_at) VALUES (?, ?, ?, ?)"
+                " ON CONFLICT (puuid) DO UPDATE SET riot_id = excluded.riot_id, region = excluded.region",
+                (puuid, riot_id, region, time.time()),
+            )
+
+    def untrack(self, puuid: str) -> bool:
+        with self._lock:
+            cur = self._conn.execute("DELETE FROM tracked_summoners WHERE puuid = ?", (puuid,))
+        return cur.rowcount > 0
+
+    def is_tracked(self, puuid: str) -> bool:
+        with self._lock:
+            return self._conn.execute(
+                "SELECT 1 FROM tracked_summoners WHERE puuid = ?", (puuid,)
+            ).fetchone() is not None
+
+    def tracked(self) -> List[Dict[str, Any]]:
+        """Tracked summoners, least recently refreshed first."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT puuid, riot_id, region, added_at, refreshed_at FROM tracked_summoners"
+                " ORDER BY COALESCE(refreshed_at, 0) ASC, added_at ASC"
+            ).fetchall()
+        return [
+            {"puuid": r[0], "riot_id": r[1], "region": r[2], "added_at": r[3], "refreshed_at": r[4]}
+            for r in rows
+        ]
+
+    def mark_refreshed(self, puuid: str, when: Optional[float] = None) -> None:
+        with self._lock:
+            self._conn.execute(
+                "UPDATE tracked_summoners SET refreshed_at = ? WHERE puuid = ?",
+                (time.time() if when is None else when, puuid),
+            )
+
+    def __contains__(self, match_id: str) -> bool:
+        with self._lock:
+            return self._conn.execute(
+                "SELECT 1 FROM matches WHERE match_id = ?", (match_id,)
+            ).fetchone() is not None
+
+    def __len__(self) -> int:
+        return self._count
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "entries": self._count,
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+            "evictions": self.evictions,
+        }
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+_store: Optional[MatchStore] = None
+_store_lock = threading.Lock()
+
+
+def get_match_store() -> MatchStore:
+    """Process-wide store; falls back to an in-memory DB if the file can't be opened."""
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                try:
+                    _store = MatchStore()
+                except (OSError, sqlite3.Error) as exc:
+                    logger.warning("Match store unavailable at %s (%s); using memory", MATCH_STORE_PATH, exc)
+                    _store = MatchStore(":memory:")
+    return _store
@@ -0,0 +1,171 @@
+"""
+Background refresh of tracked summoners.
+
+Users check the same handful of accounts many times a day. Those PUUIDs are
+kept in the MatchStore's tracked-summoner registry, and RefreshWorker re-syncs
+each of them every TRACKED_REFRESH_INTERVAL seconds (riot_api.refresh_summoner):
+new matches, ranked entries and mastery. An interactive lookup of a tracked
+player then finds everything warm and only pays for the account lookup, if
+that.
+
+The worker runs as a task on the RiotClient loop, at BATCH priority, and
+holds itself to TRACKED_BUDGET_SHARE of each host's application rate limit
+(the longest window Riot reports, learnt from headers) with its own token
+buckets — on top of the scheduler, which already lets it use only leftover
+budget.
+
+It is started on demand (ensure_started) when a summoner is tracked or a
+tracked player is looked up, so a cold instance picks the work back up.
+"""
+import asyncio
+import logging
+import threading
+import time
+from typing import Dict, Optional, Tuple
+
+from .match_store import get_match_store
+from .riot_api import refresh_summoner
+from .riot_client import RiotClient, get_client
+from .utils.constants import TRACKED_BUDGET_SHARE, TRACKED_REFRESH_INTERVAL
+from .utils.rate_limiter import TokenBucket
+
+logger = logging.getLogger(__name__)
+
+# Longest the worker sleeps between registry scans, so newly tracked players
+# are picked up promptly.
+MAX_IDLE = 30
+
+
+class RefreshWorker:
+    """Periodically refreshes every tracked summoner within a budget share."""
+
+    def __init__(
+        self,
+        interval: float = TRACKED_REFRESH_INTERVAL,
+        budget_share: float = TRACKED_BUDGET_SHARE,
+        client: Optional[RiotClient] = None,
+    ):
+        self.interval = interval
+        self.budget_share = budget_share
+        self._client = client
+        self._future = None
+        self._start_lock = threading.Lock()
+        self._budgets: Dict[str, Tuple[Tuple[int, int], TokenBucket]] = {}
+        self.refreshes = 0
+        self.failures = 0
+        self.matches_downloaded = 0
+        self.budget_wait = 0.0
+        self.last_run: Optional[float] = None
+
+    @property
+    def client(self) -> RiotClient:
+        return self._client or get_client()
+
+    # ── Lifecycle ───────────────────────────────────────────────────────
+
+    @property
+    def running(self) -> bool:
+        return self._future is not None and not self._future.done()
+
+    def ensure_started(self) -> None:
+        """Start the worker on the client loop unless it is already running. Thread-safe."""
+        with self._start_lock:
+            if not self.running:
+                self._future = asyncio.run_coroutine_threadsafe(self._run(), self.client.loop)
+
+    def stop(self) -> None:
+        with self._start_lock:
+            if self._future is not None:
+                self._future.cancel()
+                self._future = None
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await self.refresh_due()
+            except Exception:
+                logger.exception("Tracked-summoner refresh pass failed")
+            await asyncio.sleep(self._idle_for())
+
+    def _idle_for(self) -> float:
+        tracked = get_match_store().tracked()
+        if not tracked:
+            return MAX_IDLE
+        oldest = tracked[0]["refreshed_at"] or 0
+        return max(1.0, min(MAX_IDLE, oldest + self.interval - time.time()))
+
+    # ── Refreshing ──────────────────────────────────────────────────────
+
+    async def refresh_due(self) -> int:
+        """Refresh every tracked summoner not refreshed within interval. Returns how many were."""
+        store = get_match_store()
+        refreshed = 0
+        self.last_run = time.time()
+        for entry in store.tracked():
+            if entry["refreshed_at"] and time.time() - entry["refreshed_at"] < self.interval:
+                break  # least recently refreshed first: the rest are fresher
+            try:
+                self.matches_downloaded += await refresh_summoner(
+                    entry["puuid"], entry["region"], spend=self._spend,
+                )
+            except Exception as exc:
+                self.failures += 1
+                logger.warning("Refresh of %s failed: %s", entry["riot_id"], exc)
+                # Don't retry a failing player on every pass.
+                store.mark_refreshed(entry["puuid"])
+                continue
+            store.mark_refreshed(entry["puuid"])
+            self.refreshes += 1
+            refreshed += 1
+        return refreshed
+
+    def _bucket(self, host: str) -> TokenBucket:
+        limits = self.client.limiter.app_limits(host)
+        count, window = limits[-1] if limits else (100, 120)
+        key = (count, window)
+        current = self._budgets.get(host)
+        if current is None or current[0] != key:
+            bucket = TokenBucket(max(1, int(count * self.budget_share)), window)
+            if current is not None:
+                bucket.tokens = min(bucket.tokens, current[1].tokens)
+            self._budgets[host] = (key, bucket)
+            return bucket
+        return current[1]
+
+    async def _spend(self, host: str, n: int) -> None:
+        """Wait until the worker's share of host's budget covers n requests, then take them."""
+        bucket = self._bucket(host)
+        while True:
+            wait = bucket.time_until(time.monotonic(), n)
+            if wait <= 0:
+                break
+            self.budget_wait += wait
+            await asyncio.sleep(wait)
+        bucket.take(n)
+
+    def stats(self) -> Dict:
+        return {
+            "running": self.running,
+            "tracked": len(get_match_store().tracked()),
+            "interval": self.interval,
+            "budget_share": self.budget_share,
+            "refreshes": self.refreshes,
+            "failures": self.failures,
+            "matches_downloaded": self.matches_downloaded,
+            "budget_wait": round(self.budget_wait, 3),
+            "budget": {
+                host: {"capacity": bucket.capacity, "window": bucket.window, "tokens": round(bucket.tokens, 2)}
+                for host, (_, bucket) in self._budgets.items()
+            },
+        }
+
+
+_worker: Optional[RefreshWorker] = None
+
+
+def get_refresh_worker() -> RefreshWorker:
+    """Process-wide RefreshWorker (not started until ensure_started())."""
+    global _worker
+    if _worker is None:
+        _worker = RefreshWorker()
+    return _worker
@@ -4,245 +4,1455 @@ Async Riot API client.
 Key design decisions vs the old desktop client:
 - get_summoner_data_async() fetches match details ONCE (fixes double-fetch bug).
 - _compute_streak() returns the current consecutive run, not the historical max.
-- All network calls run inside a single aiohttp.ClientSession per invocation.
-- Concurrent requests are capped by an asyncio.Semaphore (CONCURRENCY_LIMIT=5).
+- All network calls share the process-wide pooled session owned by
+  RiotClient (backend/riot_client.py); callers submit the coroutines with
+  get_client().run() so they execute on the client's event loop.
+- Concurrent requests per routing host are capped by an adaptive (AIMD)
+  limit that grows while Riot answers quickly and backs off on 429s, 5xx
+  responses, connection errors and rising latency.
+- Every request draws from the client's header-driven RateLimiter; a 429
+  pauses all queued requests for that scope together. Requests queue for it
+  by priority class (interactive > prefetch > batch, set with
+  request_priority()), so background work only uses leftover budget.
+- A per-host circuit breaker fails requests fast while a Riot host is
+  erroring, instead of burning every retry on it.
+- Slow interactive match-detail / timeline requests are hedged with a
+  duplicate once they pass the endpoint's recent p95 latency, budget
+  permitting (utils/hedging.py).
+- A lookup runs under one deadline (utils/deadline.py); timeouts, budget
+  waits and retries shrink to the time left instead of the platform
+  killing the call.
+- Only the account + summoner are required. Ranked, mastery, the match
+  list and each match detail degrade on failure, and the lookup's status
+  block says which; fetch_missing_async() retries just those pieces.
+- Match IDs are synced incrementally: only games played since the newest
+  match we already know about are listed, then merged with stored history.
+- Older history is paged in on request (fetch_match_page_async) behind an
+  opaque cursor; loaded_matches() reads any loaded window back offline.
+- Riot ID → account (PUUID) and the summoner-v4 record are TTL-cached, so a
+  warm lookup starts the ranked/mastery/match-ID fan-out immediately.
+- A lookup by PUUID (scoreboard click-through) skips account-v1 entirely.
+- region=AUTO finds the player's platform itself (account-v1's active shard,
+  or a race of summoner-v4 across platforms) and caches it per PUUID.
+- get_summoners_data_async() looks up a team at once, downloading each
+  match the players share only once.
+- Scoreboard ranks are opt-in (get_ranks_async): cached per PUUID and
+  fetched a budgeted handful at a time, at prefetch priority.
+- Concurrent identical work is coalesced (single-flight): the same URL is
+  only in flight once, and so is a full lookup of the same Riot ID + region.
+- Match-detail GETs are served from the persistent MatchStore when possible;
+  a finished match is only ever downloaded once.
+- Match details are streamed (stream_match_details), decoded once into
+  compact MatchRecords (analysis/records.py) and fed to incremental
+  aggregators as they land, so analysis overlaps the remaining downloads.
+- Lookups are admitted up front (admit_lookups, admit_missing): their Riot cost is
+  estimated from what is already cached, and one the rate budget can't
+  serve in time is refused with a retry-after instead of started.
+- Tracked summoners are re-synced in the background (refresh_summoner, run
+  by backend/refresh_worker.py); their lookups start from the warm copies.
 """
 import asyncio
+import base64
+import json
+import re
+import time
 from collections import defaultdict
-from datetime import datetime, timezone
-from typing import Dict, List, Any, Optional, Tuple
+from typing import AsyncIterator, Awaitable, Callable, Dict, Iterable, List, Any, Optional, Tuple, Union
+from urllib.parse import urlsplit
 
 import aiohttp
 
+from .analysis.aggregator import OrderedAggregator
+from .analysis.records import MatchRecord, ParticipantRecord
+from .match_store import get_match_store
+from .riot_client import get_client
+
 from .utils.constants import (
-    REGION_ROUTING, MATCH_ROUTING,
-    REQUEST_TIMEOUT, RETRY_ATTEMPTS, RETRY_BACKOFF, get_api_key,
+    REGION_ROUTING, MATCH_ROUTING, MATCH_HISTORY_COUNT, PLATFORM_HOSTS, AUTO_REGION, ACCOUNT_ROUTING,
+    REQUEST_TIMEOUT, RETRY_ATTEMPTS, RETRY_BACKOFF, get_api_key, riot_host, riot_path, riot_url,
+    ACCOUNT_CACHE_TTL, SUMMONER_CACHE_TTL, TRACKED_REFRESH_INTERVAL, RANK_CACHE_TTL, RANK_ENRICH_BUDGET,
+    MATCH_PAGE_SIZE, MAX_MATCH_PAGE_SIZE,
 )
 from .utils.exceptions import (
-    APIError, AuthError, ConfigError, NetworkError, NotFoundError, RateLimitError,
+    APIError, AuthError, ConfigError, DeadlineExceeded, NetworkError, NotFoundError, RateLimitError,
 )
-from .utils.rate_limiter import make_semaphore
+from .utils.deadline import Deadline, current_deadline, request_deadline, within
+from .utils.hedging import HEDGED_METHODS
+from .utils.rate_limiter import method_key
+from .utils.scheduler import Priority, current_priority, request_flight, request_priority
+from .utils.ttl_cache import TTLCache
 
 
 # ---------------------------------------------------------------------------
 # Low-level async helpers
 # ---------------------------------------------------------------------------
 
+# /lol/match/v5/matches/{matchId} — but not /ids or /timeline
+_MATCH_DETAIL_PATH = re.compile(r"/lol/match/v5/matches/([A-Za-z0-9]+_\d+)$")
+
+
+def _match_id_from_url(url: str) -> Optional[str]:
+    """Return the matchId if url is a match-detail endpoint, else None."""
+    m = _MATCH_DETAIL_PATH.search(urlsplit(url).path)
+    return m.group(1) if m else None
+
+
 async def _get(
     session: aiohttp.ClientSession,
     url: str,
     headers: Dict[str, str],
     params: Dict[str, Any] = None,
-    semaphore: asyncio.Semaphore = None,
 ) -> Optional[Any]:
-    """Single GET with exponential backoff on 429 and transient server errors."""
-    async def _do():
+    """
+    Single GET with exponential backoff on 429 and transient server errors.
+
+    Match-detail URLs are looked up in the persistent MatchStore first and
+    written back to it after a successful download. Each attempt waits for
+    its priority class's turn (see utils/scheduler.py), then for rate-limit
+    budget on the URL's host and endpoint, then for a slot under the host's
+    adaptive concurrency limit, before going out. While the host's circuit
+    breaker is open, attempts fail fast with NetworkError instead.
+    Interactive match-detail and timeline requests that run slower than
+    usual are hedged with a duplicate request (see utils/hedging.py).
+    With a cassette on the client, each exchange is recorded to it or
+    replayed from it instead of the network (see utils/cassette.py).
+
+    Under a request deadline (utils/deadline.py) the budget wait, the
+    request timeout and every retry are fitted into the time left; when it
+    runs out the call raises DeadlineExceeded rather than waiting longer.
+    Concurrent calls for the same URL + params share one upstream request, so
+    callers must treat the returned payload as read-only.
+    """
+    match_id = _match_id_from_url(url)
+    if match_id:
+        stored = await get_match_store().get_async(match_id)
+        if stored is not None:
+            return stored
+
+    host = riot_host(url)
+    # Relative to the host's base, so a prefixed RIOT_API_BASE keys the same endpoints.
+    method = method_key(riot_path(url))
+    client = get_client()
+    limiter = client.limiter
+    key = (url, tuple(sorted((params or {}).items())))
+    # The caller's class, or better if its lookup was joined by a better one.
+    priority = client.scheduler.effective_priority()
+
+    deadline = current_deadline()
+    cassette = client.cassette
+    # Interactive match-detail / timeline calls may be hedged (utils/hedging.py).
+    hedge = method in HEDGED_METHODS and priority == Priority.INTERACTIVE
+
+    async def _exchange() -> Tuple[int, Any, Optional[Any]]:
+        """One request: budget, a concurrency slot, then (status, headers, payload)."""
+        await within(client.scheduler.acquire(host, method, priority, key), deadline)
+        # Shrink the timeout to the time left; a timeout that only the
+        # deadline caused says nothing about the host.
+        timeout = REQUEST_TIMEOUT
+        if deadline is not None and deadline.remaining() < REQUEST_TIMEOUT:
+            timeout = deadline.remaining()
+        async with client.concurrency.slot(host) as slot:
+            try:
+                if cassette is not None and cassette.replaying:
+                    status, resp_headers, payload = await asyncio.wait_for(
+                        cassette.replay(url, params), timeout,
+                    )
+                else:
+                    started = time.monotonic()
+                    async with session.get(
+                        url, headers=headers, params=params,
+                        timeout=aiohttp.ClientTimeout(total=timeout),
+                    ) as resp:
+                        status, resp_headers = resp.status, resp.headers
+                        payload = await resp.json() if status == 200 else None
+                    if cassette is not None:
+                        cassette.record(url, params, status, resp_headers, payload, time.monotonic() - started)
+                limiter.update(host, method, resp_headers)
+                if status == 429 or status >= 500:
+                    slot.overloaded()
+                return status, resp_headers, payload
+            except asyncio.TimeoutError:
+                if timeout < REQUEST_TIMEOUT:
+                    raise DeadlineExceeded("Request deadline exceeded.") from None
+                raise
+
+    async def _fetch():
         for attempt in range(RETRY_ATTEMPTS):
+            backoff = RETRY_BACKOFF * (2 ** attempt)
             try:
-                async with session.get(
-                    url, headers=headers, params=params,
-                    timeout=aiohttp.ClientTimeout(total=REQUEST_TIMEOUT),
-                ) as resp:
-                    if resp.status == 200:
-                        return await resp.json()
-                    if resp.status == 404:
-                        raise NotFoundError("Resource not found.", resp.status)
-                    if resp.status in (401, 403):
-                        raise AuthError("API key invalid or unauthorized.", resp.status)
-                    if resp.status == 429:
+                if deadline is not None:
+                    deadline.check()
+                # Fails fast with NetworkError while the host's breaker is open.
+                with client.breakers.call(host) as call:
+                    if hedge:
+                        status, resp_headers, payload = await client.hedger.run(
+                            host, method, _exchange, deadline,
+                        )
+                    else:
+                        status, resp_headers, payload = await _exchange()
+                    if status == 200:
+                        call.success()
+                        if match_id and payload:
+                            await get_match_store().put_async(match_id, host, payload)
+                        return payload
+                    if status == 404:
+                        call.success()
+                        raise NotFoundError("Resource not found.", status)
+                    if status in (401, 403):
+                        raise AuthError("API key invalid or unauthorized.", status)
+                    if status == 429:
+                        # Pauses every queued request for this scope; the
+                        # next acquire() waits out Retry-After with them.
+                        pause = limiter.on_rate_limited(host, method, resp_headers)
                         if attempt < RETRY_ATTEMPTS - 1:
-                            wait = int(resp.headers.get("Retry-After", 1))
-                            await asyncio.sleep(min(wait, 10))
+                            if deadline is not None and not deadline.allows(pause):
+                                raise DeadlineExceeded("Retry-After outlasts the request deadline.")
                             continue
-                        raise RateLimitError("Rate limit exceeded.", resp.status)
-                    if resp.status >= 500:
-                        if attempt < RETRY_ATTEMPTS - 1:
-                            await asyncio.sleep(RETRY_BACKOFF * (2 ** attempt))
-                            continue
-                        raise APIError(f"Riot server error ({resp.status}).", resp.status)
-                    return None
-            except (NotFoundError, AuthError, RateLimitError, APIError):
+                        raise RateLimitError("Rate limit exceeded.", status)
+                    if status < 500:
+                        call.success()
+                        return None
+                    call.failure()
+                    if attempt == RETRY_ATTEMPTS - 1 or (
+                        deadline is not None and not deadline.allows(backoff)
+                    ):
+                        raise APIError(f"Riot server error ({status}).", status)
+                # 5xx: back off outside the concurrency slot
+                await asyncio.sleep(backoff)
+            except (NotFoundError, AuthError, RateLimitError, APIError, NetworkError):
                 raise
-            except aiohttp.ClientError as exc:
-                if attempt < RETRY_ATTEMPTS - 1:
-                    await asyncio.sleep(RETRY_BACKOFF * (2 ** attempt))
+            except (aiohttp.ClientError, asyncio.TimeoutError) as exc:
+                # Connection errors and full REQUEST_TIMEOUT timeouts are
+                # transient: retry, then give up as a NetworkError.
+                if attempt < RETRY_ATTEMPTS - 1 and (deadline is None or deadline.allows(backoff)):
+                    await asyncio.sleep(backoff)
                     continue
-                raise NetworkError(str(exc)) from exc
+                raise NetworkError(str(exc) or "Riot request timed out.") from exc
         return None
 
-    if semaphore:
-        async with semaphore:
-            return await _do()
-    return await _do()
+    # A higher-priority caller joining a queued background fetch lifts it.
+    client.scheduler.promote(key, priority)
+    return await within(client.request_flights.do(key, _fetch), deadline)
 
 
 # ---------------------------------------------------------------------------
-# Streak helper (Bug fix #2)
+# Per-queue stats + streak (Bug fix #2)
 # ---------------------------------------------------------------------------
 
-def _compute_streak(match_details: List[Dict], puuid: str) -> int:
+class _QueueStatsAggregator(OrderedAggregator):
     """
-    Return the player's current consecutive win/loss streak.
+    Streak, most-played role and average KDA over one queue's games.
 
-    Positive = wins, negative = losses.
-    Riot returns matches newest-first, so we walk forward and stop
-    the moment the result flips.
+    The streak is the player's CURRENT consecutive win/loss run.
+    Positive = wins, negative = losses. Riot returns matches newest-first,
+    so we walk forward and stop counting the moment the result flips.
     """
-    streak = 0
+
+    def __init__(self, puuid: str, queue_id: Optional[int] = None):
+        super().__init__(puuid, None if queue_id is None else {queue_id})
+        self.streak = 0
+        self._streak_open = True
+        self.roles: Dict[str, int] = defaultdict(int)
+        self.kda_totals = {"kills": 0, "deaths": 0, "assists": 0}
+        self.games_counted = 0
+
+    def _extract(self, match: MatchRecord) -> Optional[ParticipantRecord]:
+        return self._player(match)
+
+    def _fold(self, p: ParticipantRecord) -> None:
+        won = p.win
+        if self._streak_open:
+            if self.streak == 0:
+                self.streak = 1 if won else -1
+            elif (won and self.streak > 0) or (not won and self.streak < 0):
+                self.streak += 1 if won else -1
+            else:
+                self._streak_open = False
+        self.roles[p.team_position] += 1
+        self.kda_totals["kills"] += p.kills
+        self.kda_totals["deaths"] += p.deaths
+        self.kda_totals["assists"] += p.assists
+        self.games_counted += 1
+
+    def result(self) -> Dict:
+        self._flush()
+        games = self.games_counted
+        return {
+            "streak": self.streak,
+            "mostPlayedRole": max(self.roles, key=self.roles.get) if self.roles else "Unknown",
+            "avgKDA": {k: self.kda_totals[k] / games if games else 0 for k in self.kda_totals},
+            "recentGames": games,
+        }
+
+
+def _compute_streak(match_details: List[MatchRecord], puuid: str) -> int:
+    """Return the player's current consecutive win/loss streak (see _QueueStatsAggregator)."""
+    aggregator = _QueueStatsAggregator(puuid)
     for match in match_details:
-        p = next(
-            (x for x in match["info"]["participants"] if x["puuid"] == puuid),
-            None,
-        )
-        if not p:
-            continue
-        won = p["win"]
-        if streak == 0:
-            streak = 1 if won else -1
-        elif (won and streak > 0) or (not won and streak < 0):
-            streak += 1 if won else -1
-        else:
-            break
-    return streak
+        aggregator.add(match)
+    return aggregator.result()["streak"]
 
 
 # ---------------------------------------------------------------------------
-# Core async data-fetch (Bug fix #1: single match-detail pass)
+# Incremental match-ID sync
 # ---------------------------------------------------------------------------
 
-async def _fetch_summoner(
+async def _sync_match_ids(
+    session: aiohttp.ClientSession,
+    routing: str,
+    puuid: str,
+    headers: Dict[str, str],
+) -> List[str]:
+    """
+    Return the newest MATCH_HISTORY_COUNT ranked match IDs for puuid.
+
+    If we've synced this player before, match-v5 is only asked for games that
+    started after the newest one we know (startTime), and the answer is merged
+    in front of the stored list. Details for the known IDs then come straight
+    from the MatchStore, so a returning player costs one detail fetch per new
+    game.
+    """
+    history = get_match_store().get_history(puuid)
+    # type=ranked → solo/duo + flex only, so analytics are never
+    # polluted by ARAM/normal games the UI doesn't display.
+    params = {"count": MATCH_HISTORY_COUNT, "type": "ranked"}
+    if history and history["newest_ts"]:
+        params["startTime"] = history["newest_ts"] // 1000
+
+    new_ids = await _get(
+        session,
+        f"{riot_url(routing)}/lol/match/v5/matches/by-puuid/{puuid}/ids",
+        headers,
+        params=params,
+    ) or []
+    if not history or len(new_ids) >= MATCH_HISTORY_COUNT:
+        return new_ids[:MATCH_HISTORY_COUNT]
+
+    seen = set(new_ids)
+    merged = new_ids + [mid for mid in history["match_ids"] if mid not in seen]
+    return merged[:MATCH_HISTORY_COUNT]
+
+
+def _record_match_history(
+    puuid: str, routing: str, match_ids: List[str], match_details: List[MatchRecord],
+) -> None:
+    """Remember match_ids and the newest end timestamp among the fetched details."""
+    newest_ts = max((m.timestamp for m in match_details), default=0)
+    get_match_store().put_history(puuid, routing, match_ids, newest_ts or None)
+
+
+# ---------------------------------------------------------------------------
+# Streaming match-detail fetch
+# ---------------------------------------------------------------------------
+
+async def stream_match_details(
+    session: aiohttp.ClientSession,
+    routing: str,
+    match_ids: List[str],
+    headers: Dict[str, str],
+) -> AsyncIterator[Tuple[int, MatchRecord]]:
+    """
+    Yield (index, match) for each match detail as soon as it arrives,
+    decoded into a MatchRecord.
+
+    index is the match's position in match_ids (newest first), so consumers
+    can restore order. Failed downloads are skipped, as with the old
+    gather(return_exceptions=True). Downloads still pending when the consumer
+    stops iterating are cancelled.
+    """
+    pending = {
+        asyncio.ensure_future(_get(
+            session,
+            f"{riot_url(routing)}/lol/match/v5/matches/{mid}",
+            headers,
+        )): index
+        for index, mid in enumerate(match_ids)
+    }
+    try:
+        while pending:
+            done, _ = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                index = pending.pop(task)
+                if task.cancelled() or task.exception() is not None:
+                    continue
+                payload = task.result()
+                if isinstance(payload, dict):
+                    yield index, MatchRecord(payload)
+    finally:
+        for task in pending:
+            task.cancel()
+
+
+# ---------------------------------------------------------------------------
+# Account / summoner resolution (TTL-cached)
+# ---------------------------------------------------------------------------
+
+# Riot ID → account-v1 record. PUUIDs never change and Riot IDs rarely do.
+_account_cache = TTLCache(ACCOUNT_CACHE_TTL)
+# (platform_url, puuid) → summoner-v4 record; only level/icon go stale.
+_summoner_cache = TTLCache(SUMMONER_CACHE_TTL)
+# Tracked summoners' ranked / mastery / match IDs, kept fresh by the refresh
+# worker: ("ranked" | "mastery", platform_url, puuid) and ("match_ids",
+# routing, puuid). Only refresh_summoner() writes here, so untracked players
+# always get live data; entries outlive one missed refresh.
+_warm_cache = TTLCache(2 * TRACKED_REFRESH_INTERVAL)
+# PUUID → platform region ("EUW1", ...) found for an AUTO lookup. Players
+# rarely transfer, so later lookups go straight to it.
+_platform_cache = TTLCache(ACCOUNT_CACHE_TTL)
+
+
+async def _resolve_account(
     game_name: str,
     tag_line: str,
-    region: str,
-    api_key: str,
+    routing: str,
     session: aiohttp.ClientSession,
+    headers: Dict[str, str],
 ) -> Dict:
-    """Resolve Riot ID → account → summoner, merging gameName/tagLine in."""
-    routing = MATCH_ROUTING.get(region.upper(), "americas")
-    platform_url = REGION_ROUTING.get(region.upper())
+    """Riot ID → account-v1 record (puuid, gameName, tagLine). Riot IDs are case-insensitive."""
+    key = (game_name.lower(), tag_line.lower())
+    account = _account_cache.get(key)
+    if account is None:
+        account = await _get(
+            session,
+            f"{riot_url(routing)}/riot/account/v1/accounts"
+            f"/by-riot-id/{game_name}/{tag_line}",
+            headers,
+        )
+        if not account:
+            raise NotFoundError("Account not found.")
+        _account_cache.set(key, account)
+    return account
+
+
+def _warm_or_fetch(key: Tuple, fetch: Callable[[], Awaitable[Any]]) -> "asyncio.Future":
+    """A future for fetch(), or one already holding the refresh worker's warm copy of key."""
+    warm = _warm_cache.get(key)
+    if warm is None:
+        return asyncio.ensure_future(fetch())
+    done = asyncio.get_running_loop().create_future()
+    done.set_result(warm)
+    return done
+
+
+async def _resolve_platform(
+    puuid: str,
+    session: aiohttp.ClientSession,
+    headers: Dict[str, str],
+) -> str:
+    """
+    The platform region ("EUW1", ...) puuid plays League on, for AUTO lookups.
+
+    Asks account-v1 for the player's active LoL shard first. If that doesn't
+    answer, summoner-v4 is raced across every platform and the first one
+    that knows the PUUID wins; the other requests are cancelled. Either way
+    the answer is cached, and the winning summoner record too.
+    """
+    region = _platform_cache.get(puuid)
+    if region is not None:
+        return region
+    try:
+        shard = await _get(
+            session,
+            f"{riot_url(ACCOUNT_ROUTING)}/riot/account/v1/region/by-game/lol/by-puuid/{puuid}",
+            headers,
+        )
+    except (APIError, NetworkError):
+        shard = None
+    region = str((shard or {}).get("region", "")).upper()
+    if region not in REGION_ROUTING:
+        region = await _race_platforms(puuid, session, headers)
+    _platform_cache.set(puuid, region)
+    return region
+
+
+async def _race_platforms(
+    puuid: str,
+    session: aiohttp.ClientSession,
+    headers: Dict[str, str],
+) -> str:
+    """Ask every platform's summoner-v4 for puuid at once; the first hit wins."""
+    pending = {
+        asyncio.ensure_future(_get(
+            session, f"{riot_url(host)}/lol/summoner/v4/summoners/by-puuid/{puuid}", headers,
+        )): host
+        for host in sorted(set(PLATFORM_HOSTS.values()))
+    }
+    try:
+        while pending:
+            done, _ = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                host = pending.pop(task)
+                if task.cancelled() or task.exception() is not None or not task.result():
+                    continue
+                _summoner_cache.set((riot_url(host), puuid), task.result())
+                return host.upper()
+    finally:
+        for task in pending:
+            task.cancel()
+    raise NotFoundError("Summoner not found on any platform.")
+
+
+def _riot_headers() -> Dict[str, str]:
+    """Auth headers for Riot calls; ConfigError when RIOT_API_KEY isn't set."""
+    api_key = get_api_key()
+    if not api_key:
+        raise ConfigError("RIOT_API_KEY environment variable is not set.")
+    return {"X-Riot-Token": api_key}
+
+
+async def _region_hosts(
+    region: str,
+    session: aiohttp.ClientSession,
+    headers: Dict[str, str],
+    puuid: Optional[str] = None,
+    riot_id: Optional[Tuple[str, str]] = None,
+) -> Tuple[str, str, str]:
+    """
+    (platform region, platform URL, match routing host) for region. AUTO is
+    resolved to the player's platform, found from puuid or else from their
+    (game_name, tag_line). APIError for an unsupported region.
+    """
+    region_upper = region.upper()
+    if region_upper == AUTO_REGION:
+        if puuid is None:
+            puuid = (await _resolve_account(*riot_id, ACCOUNT_ROUTING, session, headers))["puuid"]
+        region_upper = await _resolve_platform(puuid, session, headers)
+    platform_url = REGION_ROUTING.get(region_upper)
     if not platform_url:
         raise APIError(f"Unsupported region: {region}")
+    return region_upper, platform_url, MATCH_ROUTING.get(region_upper, "americas")
 
-    headers = {"X-Riot-Token": api_key}
 
-    account = await _get(
-        session,
-        f"https://{routing}.api.riotgames.com/riot/account/v1/accounts"
-        f"/by-riot-id/{game_name}/{tag_line}",
-        headers,
-    )
-    if not account:
-        raise NotFoundError("Account not found.")
+def _ranked_url(platform_url: str, puuid: str) -> str:
+    return f"{platform_url}/lol/league/v4/entries/by-puuid/{puuid}"
 
-    summoner = await _get(
-        session,
-        f"{platform_url}/lol/summoner/v4/summoners/by-puuid/{account['puuid']}",
-        headers,
-    )
-    if not summoner:
-        raise NotFoundError("Summoner data not found.")
 
+def _mastery_url(platform_url: str, puuid: str) -> str:
+    return f"{platform_url}/lol/champion-mastery/v4/champion-masteries/by-puuid/{puuid}"
+
+
+async def _fetch_summoner(
+    game_name: str,
+    tag_line: str,
+    region: str,
+    session: aiohttp.ClientSession,
+    headers: Dict[str, str],
+) -> Dict:
+    """Resolve Riot ID → account → summoner, merging gameName/tagLine in."""
+    routing = MATCH_ROUTING.get(region.upper(), "americas")
+    if region.upper() not in REGION_ROUTING:
+        raise APIError(f"Unsupported region: {region}")
+
+    account = await _resolve_account(game_name, tag_line, routing, session, headers)
+    summoner = await _fetch_summoner_by_puuid(account["puuid"], region, session, headers)
     summoner["gameName"] = account.get("gameName", game_name)
     summoner["tagLine"] = account.get("tagLine", tag_line)
     return summoner
 
 
+async def resolve_summoner(summoner_name: str, region: str) -> Dict:
+    """
+    Riot ID ("Name#TAG") → summoner-v4 record with gameName, tagLine and
+    "region" set. For AUTO, "region" is the player's resolved platform.
+    """
+    headers = _riot_headers()
+    game_name, _, tag_line = summoner_name.partition("#")
+    session = get_client().session()
+    region_upper, _, _ = await _region_hosts(region, session, headers, riot_id=(game_name, tag_line))
+    return await _fetch_summoner(game_name, tag_line, region_upper, session, headers)
+
+
+async def _fetch_summoner_by_puuid(
+    puuid: str,
+    region: str,
+    session: aiohttp.ClientSession,
+    headers: Dict[str, str],
+) -> Dict:
+    """PUUID → summoner-v4 record (cached), with "region" set. No account-v1 call."""
+    platform_url = REGION_ROUTING[region.upper()]
+    key = (platform_url, puuid)
+    summoner = _summoner_cache.get(key)
+    if summoner is None:
+        summoner = await _get(
+            session,
+            f"{platform_url}/lol/summoner/v4/summoners/by-puuid/{puuid}",
+            headers,
+        )
+        if not summoner:
+            raise NotFoundError("Summoner data not found.")
+        _summoner_cache.set(key, summoner)
+
+    # Copy — the payload may be shared with a concurrent caller.
+    return {**summoner, "region": region.upper()}
+
+
+# ---------------------------------------------------------------------------
+# Core async data-fetch (Bug fix #1: single match-detail pass)
+# ---------------------------------------------------------------------------
+
+# Builds the caller's aggregators once the PUUID is known; each gets
+# add(match, index) for every match detail as it arrives.
+AnalyzerFactory = Callable[[str], Iterable[OrderedAggregator]]
+
+
 async def get_summoner_data_async(
     summoner_name: str,
     region: str,
-) -> Tuple[Dict, List, List, List]:
+    analyzers: Optional[AnalyzerFactory] = None,
+    deadline: Union[Deadline, float, None] = None,
+    puuid: Optional[str] = None,
+) -> Tuple[Dict, List, List, List, Dict]:
     """
     Fetch everything needed for the stats page in one optimised async pass.
 
-    Returns: (summoner, ranked_data, mastery_data, match_details)
+    Returns: (summoner, ranked_data, mastery_data, match_details, status),
+    the match details as MatchRecords, newest first, and status the lookup's
+    status block (see stream_summoner_data_async).
+
+    Built on stream_summoner_data_async, so concurrent lookups of the same
+    Riot ID share one upstream fetch. analyzers, if given, is called with
+    the PUUID and its aggregators are fed while the match details stream in.
+    puuid looks the player up by PUUID instead (see stream_summoner_data_async).
+    """
+    summoner, ranked_data, mastery_data, match_details, status = None, [], [], [], {}
+    aggregators: List[OrderedAggregator] = []
+    async for section, payload in stream_summoner_data_async(summoner_name, region, deadline, puuid):
+        if section == "summoner":
+            summoner = payload
+            aggregators = list(analyzers(summoner["puuid"])) if analyzers else []
+        elif section == "ranked":
+            ranked_data = payload
+        elif section == "mastery":
+            mastery_data = payload
+        elif section == "match":
+            index, match = payload
+            for aggregator in aggregators:
+                aggregator.add(match, index)
+        elif section == "status":
+            status = payload
+        elif section == "matches":
+            match_details = payload
+    return summoner, ranked_data, mastery_data, match_details, status
+
+
+async def stream_summoner_data_async(
+    summoner_name: str,
+    region: str,
+    deadline: Union[Deadline, float, None] = None,
+    puuid: Optional[str] = None,
+) -> AsyncIterator[Tuple[str, Any]]:
+    """
+    Yield the stats-page data section by section as it becomes available:
+
+        ("summoner", dict)                  as soon as the account + summoner resolve
+        ("ranked",   list)                  league entries, before per-queue stats
+        ("mastery",  list)
+        ("match",    (index, MatchRecord))  each match detail as it lands
+        ("ranked",   list)                  again, with per-queue stats merged in
+        ("status",   dict)                  what succeeded, failed or is missing
+        ("matches",  [MatchRecord])         every fetched match, newest first
+
+    region may be AUTO_REGION: the player's platform is then found from the
+    Riot ID (see _resolve_platform) and reported as the summoner's "region".
+
+    Given a puuid (a scoreboard click-through), summoner_name is ignored and
+    the lookup goes straight to summoner-v4, skipping account-v1. Its
+    summoner record then has no gameName / tagLine.
+
+    Only the account and summoner are required; ranked, mastery and the
+    match list degrade to empty when their call fails, and failed match
+    downloads are skipped. The status block says which:
+
+        {"complete": bool,
+         "sections": {"ranked": "ok" | "failed" | "timed_out", "mastery": ...,
+                      "match_ids": ..., "matches": "ok" | "partial"},
+         "failed_sections": [...],    # pass these and missing_matches to
+         "missing_matches": [...]}    # fetch_missing_async to fill the gaps
+
+    deadline (a Deadline or seconds from now) bounds the whole lookup. If it
+    runs out before the summoner resolves, DeadlineExceeded is raised;
+    after that, outstanding sections come back "timed_out".
+
+    Concurrent lookups of the same Riot ID (case-insensitive) or PUUID on the
+    same platform subscribe to one in-flight fetch, which runs under the first
+    caller's deadline; late joiners get the events so far replayed. A joiner
+    with a better priority (a click after a hover prefetch) lifts the fetch's
+    remaining calls to its own class. Payloads are shared and must not be
+    mutated.
+    """
+    key = _lookup_key(summoner_name, region, puuid)
+    flight = ("lookup", key)
+    scheduler = get_client().scheduler
+    scheduler.lift(flight, current_priority())
+
+    async def _events() -> AsyncIterator[Tuple[str, Any]]:
+        try:
+            async for event in _summoner_events(summoner_name, region, puuid):
+                yield event
+        finally:
+            scheduler.land(flight)
+
+    # The producer task inherits the deadline and flight from this context.
+    with request_deadline(deadline), request_flight(flight):
+        stream = get_client().summoner_flights.stream(key, _events)
+    async for event in stream:
+        yield event
+
+
+def _lookup_key(summoner_name: str, region: str, puuid: Optional[str]) -> Tuple[str, str]:
+    """Single-flight key of a lookup: the PUUID or lower-cased Riot ID, and the platform."""
+    platform = REGION_ROUTING.get(region.upper(), region.upper())
+    return puuid or summoner_name.strip().lower(), platform
+
+
+async def _summoner_events(
+    summoner_name: str,
+    region: str,
+    puuid: Optional[str] = None,
+) -> AsyncIterator[Tuple[str, Any]]:
+    """
+    The uncoalesced lookup behind stream_summoner_data_async.
 
     Match details are fetched ONCE and reused for both analytics and display.
     """
-    api_key = get_api_key()
-    if not api_key:
-        raise ConfigError("RIOT_API_KEY environment variable is not set.")
+    headers = _riot_headers()
 
-    if "#" not in summoner_name:
+    if puuid is None and "#" not in summoner_name:
         raise APIError("Riot ID tag required — format: Name#TAG")
 
-    game_name, tag_line = summoner_name.split("#", 1)
+    session = get_client().session()
+
+    # ── Step 1: resolve Riot ID → PUUID (cached), unless we were given
+    #    the PUUID; AUTO also finds the player's platform (cached too) ──
+    riot_id = tuple(summoner_name.split("#", 1)) if puuid is None else None
+    region_upper, platform_url, routing = await _region_hosts(region, session, headers, puuid, riot_id)
+
+    if puuid is None:
+        game_name, tag_line = riot_id
+        account = await _resolve_account(game_name, tag_line, routing, session, headers)
+        puuid = account["puuid"]
+        summoner = _fetch_summoner(game_name, tag_line, region_upper, session, headers)
+    else:
+        summoner = _fetch_summoner_by_puuid(puuid, region_upper, session, headers)
+
+    # ── Step 2: summoner + ranked + mastery + match IDs (concurrent),
+    #    each section emitted as soon as it's in ──────────────────────
+    #    Tracked players are served from the refresh worker's warm copies.
+    summoner_task = asyncio.ensure_future(summoner)
+    ranked_task = _warm_or_fetch(("ranked", platform_url, puuid), lambda: _get(
+        session, _ranked_url(platform_url, puuid), headers))
+    mastery_task = _warm_or_fetch(("mastery", platform_url, puuid), lambda: _get(
+        session, _mastery_url(platform_url, puuid), headers))
+    ids_task = _warm_or_fetch(("match_ids", routing, puuid), lambda: _sync_match_ids(
+        session, routing, puuid, headers))
+    sections: Dict[str, str] = {}
+    try:
+        yield "summoner", await summoner_task
+        # Entries get per-queue stats merged in below; copy them first since
+        # the list may be shared with a concurrent request for the same URL.
+        ranked_data = [dict(q) for q in await _section(ranked_task, "ranked", sections) or []]
+        yield "ranked", [dict(q) for q in ranked_data]
+        yield "mastery", await _section(mastery_task, "mastery", sections) or []
+        match_ids = await _section(ids_task, "match_ids", sections) or []
+    finally:
+        for task in (summoner_task, ranked_task, mastery_task, ids_task):
+            if not task.done():
+                task.cancel()
+            elif not task.cancelled():
+                task.exception()
+
+    # ── Step 3: match details — ONE streamed fetch, concurrency-capped ──
+    # Each ranked entry gets stats from ITS queue's games only, so the solo
+    # and flex cards don't show each other's numbers.
+    queue_stats = _queue_stats_for(puuid, ranked_data)
+    arrived: Dict[int, MatchRecord] = {}
+    if match_ids:
+        async for index, match in stream_match_details(session, routing, match_ids, headers):
+            arrived[index] = match
+            for aggregator in queue_stats.values():
+                aggregator.add(match, index)
+            yield "match", (index, match)
+    match_details = [arrived[i] for i in sorted(arrived)]
+    if match_ids:
+        _record_match_history(puuid, routing, match_ids, match_details)
+    missing = [mid for i, mid in enumerate(match_ids) if i not in arrived]
+
+    # ── Step 4: per-queue analytics, already aggregated ─────────────
+    _merge_queue_stats(ranked_data, queue_stats)
+    yield "ranked", ranked_data
+    yield "status", _status_block(sections, missing)
+    yield "matches", match_details
+
+
+# ---------------------------------------------------------------------------
+# Admission control
+# ---------------------------------------------------------------------------
+
+def estimate_lookup_cost(
+    summoner_name: str,
+    region: str,
+    puuid: Optional[str] = None,
+) -> Dict[str, int]:
+    """
+    Riot requests a lookup (see _summoner_events) is expected to make per
+    host, given what is cached right now.
+
+    The account, summoner, ranked, mastery and match-ID calls cost nothing
+    when warm, and only match details missing from the MatchStore are
+    counted (a full page when the player's history is unknown). A lookup
+    that would join one already in flight costs nothing at all. For AUTO
+    lookups whose platform isn't known yet only the account-v1 calls can be
+    counted.
+    """
+    if _lookup_key(summoner_name, region, puuid) in get_client().summoner_flights:
+        return {}
+    costs: Dict[str, int] = defaultdict(int)
     region_upper = region.upper()
-    platform_url = REGION_ROUTING.get(region_upper)
+    if puuid is None:
+        game_name, _, tag_line = summoner_name.partition("#")
+        account = _account_cache.peek((game_name.lower(), tag_line.lower()))
+        if account is not None:
+            puuid = account["puuid"]
+        elif region_upper == AUTO_REGION:
+            costs[ACCOUNT_ROUTING] += 1
+        else:
+            costs[MATCH_ROUTING.get(region_upper, "americas")] += 1
+    if region_upper == AUTO_REGION:
+        region_upper = _platform_cache.peek(puuid) if puuid else None
+        if region_upper is None:
+            costs[ACCOUNT_ROUTING] += 1  # the active-shard lookup
+            return dict(costs)
+    platform = PLATFORM_HOSTS.get(region_upper)
+    if platform is None:
+        return dict(costs)
+    platform_url = REGION_ROUTING[region_upper]
     routing = MATCH_ROUTING.get(region_upper, "americas")
-    headers = {"X-Riot-Token": api_key}
-
-    async with aiohttp.ClientSession() as session:
-        # ── Step 1: resolve summoner ────────────────────────────────
-        summoner = await _fetch_summoner(game_name, tag_line, region, api_key, session)
-        puuid = summoner["puuid"]
-
-        # ── Step 2: ranked + mastery + match IDs (concurrent) ───────
-        ranked_data, mastery_data, match_ids = await asyncio.gather(
-            _get(session, f"{platform_url}/lol/league/v4/entries/by-puuid/{puuid}", headers),
-            _get(session, f"{platform_url}/lol/champion-mastery/v4/champion-masteries/by-puuid/{puuid}", headers),
-            _get(
-                session,
-                f"https://{routing}.api.riotgames.com/lol/match/v5/matches/by-puuid/{puuid}/ids",
-                headers,
-                # type=ranked → solo/duo + flex only, so analytics are never
-                # polluted by ARAM/normal games the UI doesn't display.
-                params={"count": 20, "type": "ranked"},
-            ),
-        )
 
-        ranked_data = ranked_data or []
-        mastery_data = mastery_data or []
-        match_ids = match_ids or []
-
-        # ── Step 3: match details — ONE fetch, semaphore-capped ─────
-        sem = make_semaphore()
-        match_details = []
-        if match_ids:
-            results = await asyncio.gather(*[
-                _get(
-                    session,
-                    f"https://{routing}.api.riotgames.com/lol/match/v5/matches/{mid}",
-                    headers,
-                    semaphore=sem,
-                )
-                for mid in match_ids[:20]
-            ], return_exceptions=True)
-            match_details = [m for m in results if isinstance(m, dict)]
-
-    # ── Step 4: compute analytics from the same match_details ───────
-    def _queue_stats(details: List[Dict]) -> Dict:
-        streak = _compute_streak(details, puuid)
-        roles: Dict[str, int] = defaultdict(int)
-        kda_totals = {"kills": 0, "deaths": 0, "assists": 0}
-        games_counted = 0
-        for match in details:
-            p = next((x for x in match["info"]["participants"] if x["puuid"] == puuid), None)
-            if not p:
-                continue
-            roles[p["teamPosition"]] += 1
-            kda_totals["kills"] += p["kills"]
-            kda_totals["deaths"] += p["deaths"]
-            kda_totals["assists"] += p["assists"]
-            games_counted += 1
+    if puuid is None or (platform_url, puuid) not in _summoner_cache:
+        costs[platform] += 1
+    for section in ("ranked", "mastery"):
+        if puuid is None or (section, platform_url, puuid) not in _warm_cache:
+            costs[platform] += 1
+
+    match_ids = _warm_cache.peek(("match_ids", routing, puuid)) if puuid else None
+    if match_ids is None:
+        costs[routing] += 1
+        history = get_match_store().get_history(puuid) if puuid else None
+        match_ids = history["match_ids"] if history else None
+    if match_ids is None:
+        costs[routing] += MATCH_HISTORY_COUNT
+    else:
+        store = get_match_store()
+        costs[routing] += sum(1 for mid in match_ids[:MATCH_HISTORY_COUNT] if mid not in store)
+    return {host: n for host, n in costs.items() if n}
+
+
+def estimate_missing_cost(
+    puuid: str,
+    region: str,
+    sections: Iterable[str] = (),
+    match_ids: Iterable[str] = (),
+) -> Dict[str, int]:
+    """Riot requests a fetch_missing_async call is expected to make per host."""
+    costs: Dict[str, int] = defaultdict(int)
+    sections = set(sections)
+    region_upper = region.upper()
+    if region_upper == AUTO_REGION:
+        region_upper = _platform_cache.peek(puuid)
+        if region_upper is None:
+            costs[ACCOUNT_ROUTING] += 1  # the active-shard lookup
+            return dict(costs)
+    platform = PLATFORM_HOSTS.get(region_upper)
+    if platform is None:
+        return dict(costs)
+    routing = MATCH_ROUTING.get(region_upper, "americas")
+    costs[platform] += len(sections & {"ranked", "mastery"})
+    history = get_match_store().get_history(puuid)
+    history_ids = history["match_ids"] if history else []
+    if "match_ids" in sections:
+        costs[routing] += 1
+        store = get_match_store()
+        costs[routing] += sum(1 for mid in history_ids if mid not in store) if history else MATCH_HISTORY_COUNT
+    else:
+        costs[routing] += len(_retryable_match_ids(history_ids, match_ids))
+    return {host: n for host, n in costs.items() if n}
+
+
+async def admit_missing(
+    puuid: str,
+    region: str,
+    sections: Iterable[str] = (),
+    match_ids: Iterable[str] = (),
+    priority: Optional[Priority] = None,
+) -> Optional[int]:
+    """admit_lookups for a fetch_missing_async call."""
+    return get_client().admission.admit(estimate_missing_cost(puuid, region, sections, match_ids), priority)
+
+
+def estimate_page_cost(
+    puuid: str,
+    region: str,
+    cursor: Optional[str] = None,
+    count: int = MATCH_PAGE_SIZE,
+) -> Dict[str, int]:
+    """
+    Riot requests a fetch_match_page_async call is expected to make per
+    host: the match-ID listing plus the page's details missing from the
+    MatchStore. IDs not known yet (from an earlier pass over the same
+    pages, or the player's stored history for a first page) count as
+    missing. Raises ValueError for a cursor fetch_match_page_async rejects.
+    """
+    start, end_time = _decode_cursor(cursor) if cursor else (0, None)
+    count = max(1, min(count, MAX_MATCH_PAGE_SIZE))
+    region_upper = region.upper()
+    if region_upper == AUTO_REGION:
+        region_upper = _platform_cache.peek(puuid)
+        if region_upper is None:
+            return {ACCOUNT_ROUTING: 1}  # the active-shard lookup
+    if region_upper not in REGION_ROUTING:
+        return {}
+    routing = MATCH_ROUTING.get(region_upper, "americas")
+
+    store = get_match_store()
+    pages = store.get_pages(puuid)
+    if pages and pages["end_time"] == end_time:
+        known = pages["match_ids"][start:start + count]
+    elif start == 0:
+        history = store.get_history(puuid)
+        known = history["match_ids"][:count] if history else []
+    else:
+        known = []
+    return {routing: 1 + count - len(known) + sum(1 for mid in known if mid not in store)}
+
+
+async def admit_match_page(
+    puuid: str,
+    region: str,
+    cursor: Optional[str] = None,
+    count: int = MATCH_PAGE_SIZE,
+    priority: Optional[Priority] = None,
+) -> Optional[int]:
+    """admit_lookups for a fetch_match_page_async call."""
+    return get_client().admission.admit(estimate_page_cost(puuid, region, cursor, count), priority)
+
+
+async def admit_lookups(
+    lookups: Iterable[Tuple[str, str, Optional[str]]],
+    priority: Optional[Priority] = None,
+) -> Optional[int]:
+    """
+    Ask the client's AdmissionControl whether (summoner_name, region, puuid)
+    lookups, together, can start now. None if so, else the seconds until
+    they would be admitted, for a Retry-After.
+    """
+    costs: Dict[str, int] = defaultdict(int)
+    for summoner_name, region, puuid in lookups:
+        for host, n in estimate_lookup_cost(summoner_name, region, puuid).items():
+            costs[host] += n
+    return get_client().admission.admit(costs, priority)
+
+
+# ---------------------------------------------------------------------------
+# Per-section status and retrying only what's missing
+# ---------------------------------------------------------------------------
+
+# Outcome of each section in a lookup's status block.
+SECTION_OK = "ok"
+SECTION_FAILED = "failed"
+SECTION_TIMED_OUT = "timed_out"
+SECTION_PARTIAL = "partial"
+
+# Sections fetch_missing_async() can retry (match details go by ID).
+RETRYABLE_SECTIONS = ("ranked", "mastery", "match_ids")
+
+_QUEUE_TYPE_TO_ID = {"RANKED_SOLO_5x5": 420, "RANKED_FLEX_SR": 440}
+
+
+async def _section(aw: Awaitable[Any], name: str, sections: Dict[str, str]) -> Optional[Any]:
+    """
+    Await one optional section, recording its outcome in sections. A failed
+    section yields None instead of failing the whole lookup; a None result
+    (a non-200 answer) counts as failed too.
+    """
+    try:
+        result = await aw
+    except DeadlineExceeded:
+        sections[name] = SECTION_TIMED_OUT
+        return None
+    except (APIError, NetworkError):
+        sections[name] = SECTION_FAILED
+        return None
+    sections[name] = SECTION_FAILED if result is None else SECTION_OK
+    return result
+
+
+def _status_block(sections: Dict[str, str], missing_matches: List[str]) -> Dict:
+    """
+    The status block sent with a lookup: each section's outcome, the match
+    details that didn't arrive, and what to pass back to fetch_missing_async.
+    """
+    sections = dict(sections)
+    if missing_matches:
+        sections["matches"] = SECTION_PARTIAL
+    elif sections.get("match_ids") == SECTION_OK:
+        sections["matches"] = SECTION_OK
+    failed = [name for name in RETRYABLE_SECTIONS if sections.get(name, SECTION_OK) != SECTION_OK]
+    return {
+        "complete": not failed and not missing_matches,
+        "sections": sections,
+        "failed_sections": failed,
+        "missing_matches": missing_matches,
+    }
+
+
+def _queue_stats_for(puuid: str, ranked_data: List[Dict]) -> Dict[Optional[int], _QueueStatsAggregator]:
+    queue_stats: Dict[Optional[int], _QueueStatsAggregator] = {}
+    for queue in ranked_data:
+        queue_id = _QUEUE_TYPE_TO_ID.get(queue.get("queueType"))
+        if queue_id not in queue_stats:
+            queue_stats[queue_id] = _QueueStatsAggregator(puuid, queue_id)
+    return queue_stats
+
+
+def _merge_queue_stats(ranked_data: List[Dict], queue_stats: Dict[Optional[int], _QueueStatsAggregator]) -> None:
+    for queue in ranked_data:
+        queue_id = _QUEUE_TYPE_TO_ID.get(queue.get("queueType"))
+        queue.update(queue_stats[queue_id].result())
+
+
+async def fetch_missing_async(
+    puuid: str,
+    region: str,
+    sections: Iterable[str] = (),
+    match_ids: Iterable[str] = (),
+    deadline: Union[Deadline, float, None] = None,
+) -> Tuple[Dict[str, Any], Dict]:
+    """
+    Retry just the pieces an earlier lookup's status block reported missing,
+    without redoing the rest of its fan-out.
+
+    sections names any of RETRYABLE_SECTIONS ("match_ids" re-syncs the match
+    list); match_ids lists match details to download again. Only IDs from
+    the player's own history whose details aren't in the MatchStore are
+    retried, at most MATCH_HISTORY_COUNT of them; the rest are ignored.
+
+    Returns (data, status). data holds each requested section and, when match
+    data or ranked stats were asked for, "matches": the player's history as
+    MatchRecords, newest first, with the recovered details filled in. Ranked
+    entries come back with per-queue stats over those matches. status is a
+    status block for this call, in the same form as a lookup's.
+    """
+    with request_deadline(deadline):
+        return await _fetch_missing(puuid, region, set(sections), list(match_ids))
+
+
+def _retryable_match_ids(history_ids: List[str], match_ids: Iterable[str]) -> List[str]:
+    """The match_ids worth retrying: in history_ids, not stored yet, at most MATCH_HISTORY_COUNT."""
+    known = set(history_ids)
+    store = get_match_store()
+    retryable = [mid for mid in dict.fromkeys(match_ids) if mid in known and mid not in store]
+    return retryable[:MATCH_HISTORY_COUNT]
+
+
+async def _fetch_missing(
+    puuid: str, region: str, sections: set, match_ids: List[str],
+) -> Tuple[Dict[str, Any], Dict]:
+    headers = _riot_headers()
+    session = get_client().session()
+    _, platform_url, routing = await _region_hosts(region, session, headers, puuid)
+
+    fetchers = {
+        "ranked": lambda: _get(session, _ranked_url(platform_url, puuid), headers),
+        "mastery": lambda: _get(session, _mastery_url(platform_url, puuid), headers),
+        "match_ids": lambda: _sync_match_ids(session, routing, puuid, headers),
+    }
+    names = [name for name in RETRYABLE_SECTIONS if name in sections]
+    statuses: Dict[str, str] = {}
+    results = await asyncio.gather(*(_section(fetchers[name](), name, statuses) for name in names))
+    data: Dict[str, Any] = {name: result for name, result in zip(names, results) if result is not None}
+
+    missing: List[str] = []
+    synced_ids = data.pop("match_ids", None)
+    if synced_ids is not None or match_ids or "ranked" in data:
+        history = get_match_store().get_history(puuid)
+        ids = synced_ids if synced_ids is not None else (history["match_ids"] if history else [])
+        # Only the requested details go upstream (after a re-sync, any not
+        # stored yet); the rest of the history is read back from the store.
+        wanted = ids if synced_ids is not None else _retryable_match_ids(ids, match_ids)
+        position = {mid: index for index, mid in enumerate(ids)}
+        fetching = set(wanted)
+        store = get_match_store()
+        arrived: Dict[int, MatchRecord] = {}
+        for index, mid in enumerate(ids):
+            payload = None if mid in fetching else store.get(mid)
+            if payload is not None:
+                arrived[index] = MatchRecord(payload)
+        if wanted:
+            async for index, match in stream_match_details(session, routing, wanted, headers):
+                arrived[position[wanted[index]]] = match
+            missing = [mid for mid in wanted if position[mid] not in arrived]
+        data["matches"] = [arrived[i] for i in sorted(arrived)]
+        if synced_ids:
+            _record_match_history(puuid, routing, synced_ids, data["matches"])
+
+    if "ranked" in data:
+        data["ranked"] = [dict(q) for q in data["ranked"]]
+        queue_stats = _queue_stats_for(puuid, data["ranked"])
+        for index, match in enumerate(data["matches"]):
+            for aggregator in queue_stats.values():
+                aggregator.add(match, index)
+        _merge_queue_stats(data["ranked"], queue_stats)
+    return data, _status_block(statuses, missing)
+
+
+# ---------------------------------------------------------------------------
+# Deep match history (cursor pages)
+# ---------------------------------------------------------------------------
+
+def _encode_cursor(start: int, end_time: int) -> str:
+    raw = json.dumps({"s": start, "e": end_time}, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def _decode_cursor(cursor: str) -> Tuple[int, int]:
+    """(start, end_time) from a cursor; ValueError if it isn't one of ours."""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        fields = json.loads(raw)
+        start, end_time = int(fields["s"]), int(fields["e"])
+    except (ValueError, TypeError, KeyError) as exc:
+        raise ValueError("Invalid cursor.") from exc
+    if start < 0 or end_time <= 0:
+        raise ValueError("Invalid cursor.")
+    return start, end_time
+
+
+async def fetch_match_page_async(
+    puuid: str,
+    region: str,
+    cursor: Optional[str] = None,
+    count: int = MATCH_PAGE_SIZE,
+    deadline: Union[Deadline, float, None] = None,
+) -> Tuple[List[MatchRecord], Optional[str], List[str]]:
+    """
+    One page of a player's ranked history beyond the stats page's
+    MATCH_HISTORY_COUNT games, for season-level trends.
+
+    Without a cursor this starts from the newest game and pins the history
+    at the current time, so later pages don't shift as new games are
+    played; pass the returned cursor back for the next, older page. Details
+    are fetched only for the page asked for and land in the MatchStore,
+    which also records the IDs paged in so far (see loaded_matches).
+
+    Returns (matches, next_cursor, missing): the page's MatchRecords, newest
+    first; an opaque cursor, or None once the history is exhausted; and the
+    page's match IDs whose details didn't arrive. Raises ValueError for a
+    cursor this function didn't produce.
+    """
+    start, end_time = _decode_cursor(cursor) if cursor else (0, int(time.time()))
+    count = max(1, min(count, MAX_MATCH_PAGE_SIZE))
+    with request_deadline(deadline):
+        return await _fetch_match_page(puuid, region, start, end_time, count)
+
+
+async def _fetch_match_page(
+    puuid: str, region: str, start: int, end_time: int, count: int,
+) -> Tuple[List[MatchRecord], Optional[str], List[str]]:
+    headers = _riot_headers()
+    session = get_client().session()
+    _, _, routing = await _region_hosts(region, session, headers, puuid)
+
+    match_ids = await _get(
+        session,
+        f"{riot_url(routing)}/lol/match/v5/matches/by-puuid/{puuid}/ids",
+        headers,
+        params={"start": start, "count": count, "endTime": end_time, "type": "ranked"},
+    ) or []
+    arrived: Dict[int, MatchRecord] = {}
+    async for index, match in stream_match_details(session, routing, match_ids, headers):
+        arrived[index] = match
+
+    # Extend the stored window when this page continues it; a new first
+    # page (new pin) starts it over.
+    store = get_match_store()
+    pages = store.get_pages(puuid)
+    if start == 0 or (pages and pages["end_time"] == end_time and len(pages["match_ids"]) >= start):
+        loaded = pages["match_ids"][:start] if start else []
+        store.put_pages(puuid, routing, loaded + match_ids, end_time)
+
+    next_cursor = _encode_cursor(start + len(match_ids), end_time) if len(match_ids) == count else None
+    missing = [mid for i, mid in enumerate(match_ids) if i not in arrived]
+    return [arrived[i] for i in sorted(arrived)], next_cursor, missing
+
+
+def loaded_matches(puuid: str, start: int = 0, stop: Optional[int] = None) -> List[MatchRecord]:
+    """
+    The [start:stop] window of the deep history paged in so far, newest
+    first, read from the MatchStore without any Riot call. Details that
+    were never fetched (or have been evicted) are left out.
+    """
+    pages = get_match_store().get_pages(puuid)
+    if not pages:
+        return []
+    store = get_match_store()
+    records = []
+    for mid in pages["match_ids"][start:stop]:
+        payload = store.get(mid)
+        if payload is not None:
+            records.append(MatchRecord(payload))
+    return records
+
+
+# ---------------------------------------------------------------------------
+# Batch lookup (team / clash scouting)
+# ---------------------------------------------------------------------------
+
+class _Scout:
+    """One player's part of a batch lookup."""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.summoner: Optional[Dict] = None
+        self.ranked: List[Dict] = []
+        self.mastery: List = []
+        self.routing = ""
+        self.match_ids: List[str] = []
+        self.position: Dict[str, int] = {}
+        self.sections: Dict[str, str] = {}
+        self.aggregators: List[OrderedAggregator] = []
+        self.queue_stats: Dict[Optional[int], _QueueStatsAggregator] = {}
+        self.arrived: Dict[int, MatchRecord] = {}
+        self.error: Optional[Exception] = None
+
+    def add(self, match: MatchRecord) -> None:
+        index = self.position[match.match_id]
+        self.arrived[index] = match
+        for aggregator in (*self.aggregators, *self.queue_stats.values()):
+            aggregator.add(match, index)
+
+    def result(self) -> Dict[str, Any]:
+        if self.error is not None:
+            return {"name": self.name, "error": self.error}
+        match_details = [self.arrived[i] for i in sorted(self.arrived)]
+        missing = [mid for i, mid in enumerate(self.match_ids) if i not in self.arrived]
+        _merge_queue_stats(self.ranked, self.queue_stats)
         return {
-            "streak": streak,
-            "mostPlayedRole": max(roles, key=roles.get) if roles else "Unknown",
-            "avgKDA": {k: kda_totals[k] / games_counted if games_counted else 0 for k in kda_totals},
-            "recentGames": games_counted,
+            "name": self.name,
+            "summoner": self.summoner,
+            "ranked": self.ranked,
+            "mastery": self.mastery,
+            "matches": match_details,
+            "status": _status_block(self.sections, missing),
         }
 
-    # Each ranked entry gets stats from ITS queue's games only, so the solo
-    # and flex cards don't show each other's numbers.
-    QUEUE_TYPE_TO_ID = {"RANKED_SOLO_5x5": 420, "RANKED_FLEX_SR": 440}
-    stats_cache: Dict[Optional[int], Dict] = {}
-    for queue in ranked_data:
-        queue_id = QUEUE_TYPE_TO_ID.get(queue.get("queueType"))
-        if queue_id not in stats_cache:
-            details = (
-                [m for m in match_details if m["info"].get("queueId") == queue_id]
-                if queue_id is not None else match_details
-            )
-            stats_cache[queue_id] = _queue_stats(details)
-        queue.update(stats_cache[queue_id])
-
-    return summoner, ranked_data, mastery_data, match_details
+
+async def get_summoners_data_async(
+    summoner_names: List[str],
+    region: str,
+    analyzers: Optional[AnalyzerFactory] = None,
+    deadline: Union[Deadline, float, None] = None,
+) -> Tuple[List[Dict[str, Any]], Dict[str, int]]:
+    """
+    Look up several players at once, e.g. a clash team.
+
+    Every player's account, summoner, ranked, mastery and match list are
+    resolved concurrently. Their match IDs are then merged and each unique
+    match is downloaded once, however many of the players were in it, and
+    fed to every player it belongs to: analyzers(puuid) as in
+    get_summoner_data_async, plus the per-queue ranked stats.
+
+    Returns (players, totals). players has one dict per name, in order:
+    {"name", "summoner", "ranked", "mastery", "matches", "status"}, or
+    {"name", "error"} for a player who couldn't be resolved; the rest of the
+    batch still goes through. totals counts the match IDs listed across
+    players and the unique matches fetched for them.
+    """
+    with request_deadline(deadline):
+        return await _scout_all(summoner_names, region, analyzers)
+
+
+async def _scout_all(
+    summoner_names: List[str],
+    region: str,
+    analyzers: Optional[AnalyzerFactory],
+) -> Tuple[List[Dict[str, Any]], Dict[str, int]]:
+    headers = _riot_headers()
+    session = get_client().session()
+    scouts = [_Scout(name) for name in summoner_names]
+
+    async def _resolve(scout: _Scout) -> None:
+        if "#" not in scout.name:
+            raise APIError("Riot ID tag required — format: Name#TAG")
+        game_name, tag_line = scout.name.split("#", 1)
+        region_upper, platform_url, scout.routing = await _region_hosts(
+            region, session, headers, riot_id=(game_name, tag_line),
+        )
+        puuid = (await _resolve_account(game_name, tag_line, scout.routing, session, headers))["puuid"]
+        summoner, ranked, mastery, match_ids = await asyncio.gather(
+            _fetch_summoner(game_name, tag_line, region_upper, session, headers),
+            _section(_warm_or_fetch(("ranked", platform_url, puuid), lambda: _get(
+                session, _ranked_url(platform_url, puuid), headers,
+            )), "ranked", scout.sections),
+            _section(_warm_or_fetch(("mastery", platform_url, puuid), lambda: _get(
+                session, _mastery_url(platform_url, puuid), headers,
+            )), "mastery", scout.sections),
+            _section(_warm_or_fetch(("match_ids", scout.routing, puuid), lambda: _sync_match_ids(
+                session, scout.routing, puuid, headers,
+            )), "match_ids", scout.sections),
+        )
+        scout.summoner = summoner
+        scout.ranked = [dict(q) for q in ranked or []]
+        scout.mastery = mastery or []
+        scout.match_ids = match_ids or []
+        scout.position = {mid: i for i, mid in enumerate(scout.match_ids)}
+        scout.aggregators = list(analyzers(puuid)) if analyzers else []
+        scout.queue_stats = _queue_stats_for(puuid, scout.ranked)
+
+    outcomes = await asyncio.gather(*(_resolve(scout) for scout in scouts), return_exceptions=True)
+    for scout, outcome in zip(scouts, outcomes):
+        # A cancelled player (CancelledError is a BaseException) fails alone too.
+        if isinstance(outcome, BaseException):
+            scout.error = outcome
+    found = [scout for scout in scouts if scout.error is None]
+
+    # Each unique match once, per routing host (AUTO can span several).
+    by_routing: Dict[str, Dict[str, List[_Scout]]] = defaultdict(dict)
+    for scout in found:
+        for mid in scout.match_ids:
+            by_routing[scout.routing].setdefault(mid, []).append(scout)
+
+    async def _download(routing: str, owners: Dict[str, List[_Scout]]) -> None:
+        async for _, match in stream_match_details(session, routing, list(owners), headers):
+            for scout in owners[match.match_id]:
+                scout.add(match)
+
+    await asyncio.gather(*(_download(routing, owners) for routing, owners in by_routing.items()))
+
+    players = []
+    for scout in scouts:
+        result = scout.result()
+        if scout.error is None and scout.match_ids:
+            _record_match_history(scout.summoner["puuid"], scout.routing, scout.match_ids, result["matches"])
+        players.append(result)
+    totals = {
+        "listed_matches": sum(len(scout.match_ids) for scout in found),
+        "unique_matches": sum(len(owners) for owners in by_routing.values()),
+    }
+    return players, totals
+
+
+# ---------------------------------------------------------------------------
+# Scoreboard ranks (opt-in, budgeted)
+# ---------------------------------------------------------------------------
+
+# (platform_url, puuid) → league-v4 entries of a scoreboard participant;
+# [] for unranked players, so they aren't asked for again either.
+_rank_cache = TTLCache(RANK_CACHE_TTL)
+
+
+async def get_ranks_async(
+    puuids: Iterable[str],
+    region: str,
+    budget: int = RANK_ENRICH_BUDGET,
+    deadline: Union[Deadline, float, None] = None,
+) -> Tuple[Dict[str, List[Dict]], List[str]]:
+    """
+    League entries for the players on a lookup's scoreboards.
+
+    Every player in every match would be up to 10 × MATCH_HISTORY_COUNT
+    league-v4 calls, so this is a separate, pollable step: puuids are
+    de-duplicated, answered from the rank cache (or a tracked player's warm
+    copy) where possible, and at most budget of the rest are fetched, at
+    PREFETCH priority so they never hold up an interactive lookup.
+
+    With region AUTO the platform is the one the players' matches were
+    played on: the first PUUID whose platform is already known answers for
+    all of them, else it's resolved for the first PUUID.
+
+    Returns (ranks, pending): ranks maps PUUID → league entries ([] =
+    unranked); pending lists the PUUIDs not loaded yet (over budget, failed
+    or out of time), for the caller to ask for again.
+    """
+    puuids = list(dict.fromkeys(puuids))
+    if not puuids:
+        return {}, []
+    headers = _riot_headers()
+    session = get_client().session()
+    known = next((puuid for puuid in puuids if _platform_cache.peek(puuid)), puuids[0])
+    with request_deadline(deadline), request_priority(Priority.PREFETCH):
+        _, platform_url, _ = await _region_hosts(region, session, headers, known)
+
+    ranks: Dict[str, List[Dict]] = {}
+    wanted: List[str] = []
+    for puuid in puuids:
+        cached = _rank_cache.get((platform_url, puuid))
+        if cached is None:
+            cached = _warm_cache.get(("ranked", platform_url, puuid))
+        if cached is None:
+            wanted.append(puuid)
+        else:
+            ranks[puuid] = cached
+
+    async def _fetch(puuid: str) -> None:
+        entries = await _get(session, _ranked_url(platform_url, puuid), headers)
+        if entries is not None:
+            _rank_cache.set((platform_url, puuid), entries)
+            ranks[puuid] = entries
+
+    with request_deadline(deadline), request_priority(Priority.PREFETCH):
+        outcomes = await asyncio.gather(
+            *(_fetch(puuid) for puuid in wanted[:max(0, budget)]), return_exceptions=True,
+        )
+    for outcome in outcomes:
+        # Failed fetches just stay pending; anything else is a bug.
+        if isinstance(outcome, BaseException) and not isinstance(outcome, (APIError, NetworkError)):
+            raise outcome
+    return ranks, [puuid for puuid in wanted if puuid not in ranks]
+
+
+# ---------------------------------------------------------------------------
+# Background refresh of tracked summoners
+# ---------------------------------------------------------------------------
+
+# Spends n requests of a host's background budget before they go out.
+BudgetSpender = Callable[[str, int], Awaitable[None]]
+
+
+async def refresh_summoner(puuid: str, region: str, spend: Optional[BudgetSpender] = None) -> int:
+    """
+    Re-sync a tracked player's summoner record, ranked entries, mastery and
+    match history at BATCH priority, and keep them warm for interactive
+    lookups. New match details are downloaded into the MatchStore.
+
+    spend(host, n), if given, is awaited before each group of requests so
+    the caller can hold the refresh to its share of the rate budget.
+    Returns the number of match details downloaded.
+    """
+    headers = _riot_headers()
+    session = get_client().session()
+
+    with request_priority(Priority.BATCH):
+        _, platform_url, routing = await _region_hosts(region, session, headers, puuid)
+        if spend:
+            await spend(riot_host(platform_url), 3)
+            await spend(routing, 1)
+        summoner, ranked, mastery, match_ids = await asyncio.gather(
+            _get(session, f"{platform_url}/lol/summoner/v4/summoners/by-puuid/{puuid}", headers),
+            _get(session, _ranked_url(platform_url, puuid), headers),
+            _get(session, _mastery_url(platform_url, puuid), headers),
+            _sync_match_ids(session, routing, puuid, headers),
+        )
+        store = get_match_store()
+        missing = [mid for mid in match_ids if mid not in store]
+        if spend and missing:
+            await spend(routing, len(missing))
+        match_details = [m async for _, m in stream_match_details(session, routing, match_ids, headers)]
+    if match_ids:
+        _record_match_history(puuid, routing, match_ids, match_details)
+
+    if summoner:
+        _summoner_cache.set((platform_url, puuid), summoner)
+    _warm_cache.set(("ranked", platform_url, puuid), ranked or [])
+    _warm_cache.set(("mastery", platform_url, puuid), mastery or [])
+    _warm_cache.set(("match_ids", routing, puuid), match_ids)
+    return len(missing)
@@ -0,0 +1,182 @@
+"""
+Process-wide Riot HTTP client.
+
+Flask handles requests synchronously, and each lookup used to run under its
+own asyncio.run() with its own aiohttp.ClientSession — a fresh TCP + TLS
+handshake to *.api.riotgames.com on every request. RiotClient instead owns a
+single event loop running in a daemon thread and one ClientSession bound to
+that loop, so pooled keep-alive connections are reused across requests.
+
+    client = get_client()
+    summoner, ranked, mastery, matches, status = client.run(get_summoner_data_async(name, region))
+
+Coroutines that touch the shared session must run on the client's loop, i.e.
+be submitted through run(). The client is closed on interpreter exit.
+
+The client also carries the per-process upstream policy state shared by every
+call path: the header-driven RateLimiter consulted by _get (behind the
+PriorityScheduler that lets interactive lookups go before background work),
+the per-host AIMD concurrency limits (utils/concurrency.py), the per-host
+circuit breakers, the hedging latency tracker (utils/hedging.py), and the
+single-flight groups that coalesce concurrent identical requests and lookups.
+With RATE_LIMIT_STORE set the limiter draws from a budget shared with the
+other instances (utils/shared_budget.py), and AdmissionControl
+(utils/admission.py) turns lookups away up front when it can't serve them
+in time. With RIOT_CASSETTE set it also holds the cassette that _get
+records its traffic to or replays it from (utils/cassette.py).
+"""
+import asyncio
+import atexit
+import threading
+from typing import Any, AsyncIterator, Awaitable, Iterator, Optional
+
+import aiohttp
+
+from .utils.constants import (
+    DNS_CACHE_TTL, KEEPALIVE_TIMEOUT, POOL_LIMIT, POOL_LIMIT_PER_HOST,
+    RATE_LIMIT_STORE, RIOT_CASSETTE, RIOT_CASSETTE_MODE, RIOT_CASSETTE_SPEED,
+)
+from .utils.admission import AdmissionControl
+from .utils.cassette import Cassette
+from .utils.circuit_breaker import CircuitBreakers
+from .utils.concurrency import AdaptiveConcurrency
+from .utils.hedging import Hedger
+from .utils.rate_limiter import RateLimiter
+from .utils.scheduler import PriorityScheduler
+from .utils.shared_budget import budget_store_from_url
+from .utils.single_flight import SingleFlight
+
+
+class RiotClient:
+    """Owns the event loop thread and pooled ClientSession used for every Riot call."""
+
+    def __init__(
+        self,
+        limit: int = POOL_LIMIT,
+        limit_per_host: int = POOL_LIMIT_PER_HOST,
+        dns_ttl: int = DNS_CACHE_TTL,
+        keepalive_timeout: float = KEEPALIVE_TIMEOUT,
+        limiter: Optional[RateLimiter] = None,
+        concurrency: Optional[AdaptiveConcurrency] = None,
+        cassette: Optional[Cassette] = None,
+    ):
+        self.limiter = limiter or RateLimiter(shared=budget_store_from_url(RATE_LIMIT_STORE))
+        self.scheduler = PriorityScheduler(self.limiter)
+        self.admission = AdmissionControl(self.scheduler)
+        self.concurrency = concurrency or AdaptiveConcurrency()
+        self.breakers = CircuitBreakers()
+        self.hedger = Hedger(self.limiter)
+        self.request_flights = SingleFlight()
+        self.summoner_flights = SingleFlight()
+        if cassette is None and RIOT_CASSETTE:
+            cassette = Cassette(RIOT_CASSETTE, RIOT_CASSETTE_MODE, RIOT_CASSETTE_SPEED)
+        self.cassette = cassette
+        self.limit = limit
+        self.limit_per_host = limit_per_host
+        self.dns_ttl = dns_ttl
+        self.keepalive_timeout = keepalive_timeout
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._lock = threading.Lock()
+
+    # ── Event loop ──────────────────────────────────────────────────────
+
+    @property
+    def loop(self) -> asyncio.AbstractEventLoop:
+        with self._lock:
+            if self._loop is None or self._loop.is_closed():
+                self._loop = asyncio.new_event_loop()
+                self._thread = threading.Thread(
+                    target=self._loop.run_forever, name="riot-client", daemon=True,
+                )
+                self._thread.start()
+            return self._loop
+
+    def run(self, coro: Awaitable[Any], timeout: Optional[float] = None) -> Any:
+        """Run coro on the client loop and block the calling thread for its result."""
+        loop = self.loop
+        if threading.current_thread() is self._thread:
+            raise RuntimeError("RiotClient.run() called from the client loop; await instead.")
+        return asyncio.run_coroutine_threadsafe(coro, loop).result(timeout)
+
+    def iterate(self, agen: AsyncIterator[Any], timeout: Optional[float] = None) -> Iterator[Any]:
+        """Drive an async generator on the client loop from a synchronous caller."""
+        loop = self.loop
+        try:
+            while True:
+                try:
+                    item = asyncio.run_coroutine_threadsafe(agen.__anext__(), loop).result(timeout)
+                except StopAsyncIteration:
+                    return
+                yield item
+        finally:
+            asyncio.run_coroutine_threadsafe(agen.aclose(), loop).result(timeout)
+
+    # ── Session ─────────────────────────────────────────────────────────
+
+    def session(self) -> aiohttp.ClientSession:
+        """Return the pooled session, creating it on first use. Client loop only."""
+        if asyncio.get_running_loop() is not self._loop:
+            raise RuntimeError("The Riot session is bound to the client loop; use RiotClient.run().")
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(
+                limit=self.limit,
+                limit_per_host=self.limit_per_host,
+                ttl_dns_cache=self.dns_ttl,
+                keepalive_timeout=self.keepalive_timeout,
+            )
+            self._session = aiohttp.ClientSession(connector=connector)
+        return self._session
+
+    def stats(self) -> dict:
+        """Upstream policy counters for monitoring."""
+        stats = {
+            "rate_limiter": self.limiter.stats(),
+            "scheduler": self.scheduler.stats(),
+            "admission": self.admission.stats(),
+            "concurrency": self.concurrency.stats(),
+            "circuit_breakers": self.breakers.stats(),
+            "hedging": self.hedger.stats(),
+            "single_flight": {
+                "requests": self.request_flights.stats(),
+                "summoners": self.summoner_flights.stats(),
+            },
+        }
+        if self.cassette is not None:
+            stats["cassette"] = self.cassette.stats()
+        return stats
+
+    # ── Shutdown ────────────────────────────────────────────────────────
+
+    def close(self, timeout: float = 5) -> None:
+        """Close the session and stop the loop thread. Safe to call more than once."""
+        with self._lock:
+            loop, thread, session = self._loop, self._thread, self._session
+            self._loop = self._thread = self._session = None
+        if loop is None or loop.is_closed():
+            return
+        if session is not None and not session.closed:
+            try:
+                asyncio.run_coroutine_threadsafe(session.close(), loop).result(timeout)
+            except Exception:
+                pass
+        loop.call_soon_threadsafe(loop.stop)
+        if thread is not None:
+            thread.join(timeout)
+        loop.close()
+
+
+_client: Optional[RiotClient] = None
+_client_lock = threading.Lock()
+
+
+def get_client() -> RiotClient:
+    """Process-wide RiotClient, reused across warm invocations."""
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _client = RiotClient()
+                atexit.register(_client.close)
+    return _client
@@ -0,0 +1,66 @@
+"""
+Admission control for lookups.
+
+When the rate budget is spent, a lookup that starts anyway only queues in
+the scheduler, sleeps in RateLimiter.acquire() and then ends as a 429 or a
+deadline timeout, holding a worker the whole time. AdmissionControl decides
+before it starts instead. Given what the lookup will cost on each Riot host
+(riot_api.estimate_lookup_cost; warm caches cost nothing), it asks the
+limiter how long the application budget needs to serve that many requests
+on top of the ones already queued for the host. If that is longer than
+max_wait, the lookup is refused with the time until it would fit, which the
+API sends back as 503 + Retry-After.
+
+Like the limiter it reads, it must be used from the client's event loop.
+"""
+import math
+from typing import Dict, Mapping, Optional
+
+from .constants import ADMISSION_MAX_WAIT
+from .scheduler import RESERVE, Priority, PriorityScheduler, current_priority
+
+
+class AdmissionControl:
+    """Admits or refuses lookups by their estimated cost per host."""
+
+    def __init__(self, scheduler: PriorityScheduler, max_wait: float = ADMISSION_MAX_WAIT):
+        self.scheduler = scheduler
+        self.limiter = scheduler.limiter
+        self.max_wait = max_wait
+        self.admitted = 0
+        self.rejected = 0
+        self.free = 0
+
+    def expected_wait(self, costs: Mapping[str, int], priority: Optional[Priority] = None) -> float:
+        """
+        Seconds of budget wait for requests costing costs[host] each, behind
+        what is already queued; lower classes also leave their RESERVE free.
+        """
+        priority = current_priority() if priority is None else Priority(priority)
+        wait = 0.0
+        for host, n in costs.items():
+            if n > 0:
+                queued = self.scheduler.queued(host)
+                wait = max(wait, self.limiter.time_to_serve(host, n + queued + RESERVE[priority]))
+        return wait
+
+    def admit(self, costs: Mapping[str, int], priority: Optional[Priority] = None) -> Optional[int]:
+        """None if the lookup may start, else whole seconds until it would be admitted (Retry-After)."""
+        if not any(n > 0 for n in costs.values()):
+            self.free += 1
+            self.admitted += 1
+            return None
+        wait = self.expected_wait(costs, priority)
+        if wait <= self.max_wait:
+            self.admitted += 1
+            return None
+        self.rejected += 1
+        return max(1, math.ceil(wait - self.max_wait))
+
+    def stats(self) -> Dict[str, float]:
+        return {
+            "max_wait": self.max_wait,
+            "admitted": self.admitted,
+            "free": self.free,
+            "rejected": self.rejected,
+        }
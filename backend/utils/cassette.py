@@ -0,0 +1,146 @@
+"""
+Record / replay of Riot API traffic ("cassettes").
+
+A latency problem seen in production, or the effect of a change to the
+fetch / analysis pipeline, is hard to measure against the live API: it needs
+a key, and the answers and their timings change from run to run. A cassette
+captures every exchange _get makes — URL, status, rate-limit headers, JSON
+body and how long it took — to a JSON Lines file, and can serve them back
+later with no network at all:
+
+    RIOT_CASSETTE=/tmp/lookup.jsonl RIOT_CASSETTE_MODE=record   # capture
+    RIOT_CASSETTE=/tmp/lookup.jsonl RIOT_CASSETTE_MODE=replay   # serve back
+
+In replay, speed scales the recorded timings: 1.0 waits as long as the
+original request took, 0 answers as fast as possible. Only the HTTP exchange
+is replaced; the scheduler, rate limiter, concurrency limits and retries
+still run, so replays measure the real pipeline.
+
+Requests are matched on host, path and query, ignoring the base URL, so a
+cassette recorded against the live API replays against any RIOT_API_BASE.
+Repeated requests are answered in recorded order, the last answer repeating
+once they run out. Request headers (the API key) are never written.
+"""
+import asyncio
+import json
+import threading
+import time
+from collections import defaultdict
+from typing import Any, Dict, List, Mapping, Optional, Tuple
+
+from multidict import CIMultiDict, CIMultiDictProxy
+
+from .constants import riot_host, riot_url
+from .exceptions import NetworkError
+
+RECORD = "record"
+REPLAY = "replay"
+
+# Response headers worth keeping: what the rate limiter and retries read.
+RECORDED_HEADERS = (
+    "X-App-Rate-Limit", "X-App-Rate-Limit-Count",
+    "X-Method-Rate-Limit", "X-Method-Rate-Limit-Count",
+    "X-Rate-Limit-Type", "Retry-After",
+)
+
+_Key = Tuple[str, str, Tuple[Tuple[str, str], ...]]
+
+
+def _key(url: str, params: Optional[Mapping[str, Any]]) -> _Key:
+    """(host, path, query) with the base URL stripped, so cassettes are portable."""
+    host = riot_host(url)
+    base = riot_url(host)
+    path = url[len(base):] if url.startswith(base) else url
+    query = tuple(sorted((str(k), str(v)) for k, v in (params or {}).items()))
+    return host, path, query
+
+
+class Cassette:
+    """One recording, being written (RECORD) or served back (REPLAY)."""
+
+    def __init__(self, path: str, mode: str, speed: float = 1.0):
+        if mode not in (RECORD, REPLAY):
+            raise ValueError(f"Cassette mode must be {RECORD!r} or {REPLAY!r}, not {mode!r}")
+        self.path = path
+        self.mode = mode
+        self.speed = speed
+        self.recorded = 0
+        self.replayed = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._started = time.monotonic()
+        self._tapes: Dict[_Key, List[Dict[str, Any]]] = defaultdict(list)
+        self._played: Dict[_Key, int] = defaultdict(int)
+        if mode == REPLAY:
+            with open(path, encoding="utf-8") as fh:
+                for line in fh:
+                    if line.strip():
+                        entry = json.loads(line)
+                        self._tapes[(entry["host"], entry["path"], tuple(map(tuple, entry["query"])))].append(entry)
+
+    @property
+    def replaying(self) -> bool:
+        return self.mode == REPLAY
+
+    def record(
+        self,
+        url: str,
+        params: Optional[Mapping[str, Any]],
+        status: int,
+        headers: Mapping[str, str],
+        payload: Any,
+        elapsed: float,
+    ) -> None:
+        """Append one exchange to the cassette file."""
+        host, path, query = _key(url, params)
+        entry = {
+            "host": host,
+            "path": path,
+            "query": query,
+            "status": status,
+            "headers": {name: headers[name] for name in RECORDED_HEADERS if name in headers},
+            "body": payload,
+            "elapsed": round(elapsed, 4),
+            "at": round(time.monotonic() - self._started, 4),
+        }
+        line = json.dumps(entry, separators=(",", ":")) + "\n"
+        with self._lock:
+            with open(self.path, "a", encoding="utf-8") as fh:
+                fh.write(line)
+            self.recorded += 1
+
+    async def replay(
+        self, url: str, params: Optional[Mapping[str, Any]],
+    ) -> Tuple[int, CIMultiDictProxy, Any]:
+        """
+        (status, headers, payload) recorded for this request, after its
+        recorded latency × speed. Raises NetworkError if it was never recorded.
+        """
+        key = _key(url, params)
+        tape = self._tapes.get(key)
+        if not tape:
+            self.misses += 1
+            raise NetworkError(f"Request not in cassette {self.path}: {key[0]}{key[1]}")
+        with self._lock:
+            index = min(self._played[key], len(tape) - 1)
+            self._played[key] += 1
+        entry = tape[index]
+        if self.speed > 0:
+            await asyncio.sleep(entry["elapsed"] * self.speed)
+        self.replayed += 1
+        return entry["status"], CIMultiDictProxy(CIMultiDict(entry["headers"])), entry["body"]
+
+    def rewind(self) -> None:
+        """Serve every request's recorded answers from the first again."""
+        with self._lock:
+            self._played.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "path": self.path,
+            "mode": self.mode,
+            "speed": self.speed,
+            "recorded": self.recorded,
+            "replayed": self.replayed,
+            "misses": self.misses,
+        }
@@ -0,0 +1,191 @@
+"""
+Per-host circuit breakers for Riot calls.
+
+When a host (europe, na1, ...) degrades, retrying every request
+RETRY_ATTEMPTS times with backoff makes each lookup burn seconds before it
+fails anyway. A CircuitBreaker tracks the outcome of recent calls to its host:
+
+- closed     calls go through. Once at least min_requests calls in the last
+             window seconds have failed at error_rate or worse, it opens.
+- open       calls fail immediately with NetworkError, without queueing for
+             budget or a connection. After open_seconds it turns half-open;
+             open_seconds doubles on each consecutive re-open (up to
+             MAX_OPEN_SECONDS) so a host that stays down is probed less.
+- half_open  up to `trials` trial calls go through, the rest still fail
+             fast. That many successes close the breaker; any failure
+             re-opens it.
+
+Only 5xx responses and connection errors / timeouts count as failures; 429s,
+404s and auth errors say nothing about the host's health.
+"""
+import asyncio
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Deque, Dict, Iterator, Optional, Tuple
+
+import aiohttp
+
+from .constants import (
+    BREAKER_ERROR_RATE, BREAKER_MIN_REQUESTS, BREAKER_OPEN_SECONDS, BREAKER_TRIALS, BREAKER_WINDOW,
+)
+from .exceptions import NetworkError
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+MAX_OPEN_SECONDS = 120.0
+
+
+class CircuitBreaker:
+    """Closed / open / half-open state for one host, driven by a rolling error rate."""
+
+    def __init__(
+        self,
+        error_rate: float = BREAKER_ERROR_RATE,
+        min_requests: int = BREAKER_MIN_REQUESTS,
+        window: float = BREAKER_WINDOW,
+        open_seconds: float = BREAKER_OPEN_SECONDS,
+        trials: int = BREAKER_TRIALS,
+    ):
+        self.error_rate = error_rate
+        self.min_requests = min_requests
+        self.window = window
+        self.open_seconds = open_seconds
+        self.trials = trials
+        self.state = CLOSED
+        self.opened = 0
+        self.rejected = 0
+        self._outcomes: Deque[Tuple[float, bool]] = deque()
+        self._open_until = 0.0
+        self._reopen_delay = open_seconds
+        self._trials_in_flight = 0
+        self._trial_successes = 0
+
+    def allow(self) -> bool:
+        """Whether a call may go out now; counts it as a trial when half-open."""
+        now = time.monotonic()
+        if self.state == OPEN and now >= self._open_until:
+            self.state = HALF_OPEN
+            self._trials_in_flight = self._trial_successes = 0
+        if self.state == CLOSED:
+            return True
+        if self.state == HALF_OPEN and self._trials_in_flight < self.trials:
+            self._trials_in_flight += 1
+            return True
+        self.rejected += 1
+        return False
+
+    def record(self, ok: Optional[bool], trial: bool = False) -> None:
+        """Feed back one call's outcome: True / False, or None if it says nothing about the host."""
+        now = time.monotonic()
+        if trial:
+            self._trials_in_flight = max(0, self._trials_in_flight - 1)
+        if ok is None:
+            return
+        if self.state == HALF_OPEN:
+            if not ok:
+                self._open(now)
+            else:
+                self._trial_successes += 1
+                if self._trial_successes >= self.trials:
+                    self._close()
+            return
+        if self.state == OPEN:
+            return  # late result from before the breaker opened
+        self._outcomes.append((now, ok))
+        self._prune(now)
+        total = len(self._outcomes)
+        failures = sum(1 for _, good in self._outcomes if not good)
+        if total >= self.min_requests and failures / total >= self.error_rate:
+            self._open(now)
+
+    def _open(self, now: float) -> None:
+        if self.state == HALF_OPEN:
+            self._reopen_delay = min(MAX_OPEN_SECONDS, self._reopen_delay * 2)
+        else:
+            self._reopen_delay = self.open_seconds
+        self.state = OPEN
+        self.opened += 1
+        self._open_until = now + self._reopen_delay
+        self._outcomes.clear()
+
+    def _close(self) -> None:
+        self.state = CLOSED
+        self._reopen_delay = self.open_seconds
+        self._outcomes.clear()
+
+    def _prune(self, now: float) -> None:
+        while self._outcomes and now - self._outcomes[0][0] > self.window:
+            self._outcomes.popleft()
+
+    def stats(self) -> Dict:
+        now = time.monotonic()
+        self._prune(now)
+        total = len(self._outcomes)
+        failures = sum(1 for _, good in self._outcomes if not good)
+        return {
+            "state": self.state,
+            "requests": total,
+            "error_rate": round(failures / total, 3) if total else 0.0,
+            "opened": self.opened,
+            "rejected": self.rejected,
+            "retry_in": round(max(0.0, self._open_until - now), 2) if self.state == OPEN else 0.0,
+        }
+
+
+class _Call:
+    """Outcome of one guarded call; success() / failure() once the response is known."""
+
+    __slots__ = ("ok",)
+
+    def __init__(self):
+        self.ok: Optional[bool] = None
+
+    def success(self) -> None:
+        self.ok = True
+
+    def failure(self) -> None:
+        self.ok = False
+
+
+class CircuitBreakers:
+    """One CircuitBreaker per routing / platform host, created on first use."""
+
+    def __init__(self, **settings):
+        self.settings = settings
+        self._hosts: Dict[str, CircuitBreaker] = {}
+
+    def host(self, host: str) -> CircuitBreaker:
+        breaker = self._hosts.get(host)
+        if breaker is None:
+            breaker = self._hosts[host] = CircuitBreaker(**self.settings)
+        return breaker
+
+    @contextmanager
+    def call(self, host: str) -> Iterator[_Call]:
+        """
+        Guard one call to host. Raises NetworkError right away while the
+        breaker is open. Connection errors and timeouts escaping the block
+        count as failures; otherwise the block reports via success()/failure().
+        """
+        breaker = self.host(host)
+        if not breaker.allow():
+            raise NetworkError(f"Riot host {host} is unavailable (circuit open); try again shortly.")
+        trial = breaker.state == HALF_OPEN
+        call = _Call()
+        try:
+            yield call
+        except (aiohttp.ClientError, asyncio.TimeoutError):
+            breaker.record(False, trial)
+            raise
+        except BaseException:
+            breaker.record(call.ok, trial)
+            raise
+        else:
+            breaker.record(call.ok, trial)
+
+    def stats(self) -> Dict[str, Dict]:
+        """State and recent error rate per host, for monitoring."""
+        return {host: breaker.stats() for host, breaker in self._hosts.items()}
@@ -0,0 +1,194 @@
+"""
+Adaptive (AIMD) concurrency limits for upstream Riot calls.
+
+A fixed cap of in-flight requests is either too low while Riot is healthy or
+too high during an incident. AdaptiveLimit instead treats the limit like a
+TCP congestion window, one per routing host (americas, europe, na1, ...):
+
+- additive increase: every successful response adds 1/limit, i.e. roughly
+  +1 per round of requests, but only while the limit is actually being used
+  (at least half of it in flight) so an idle host doesn't inflate its cap.
+- multiplicative decrease: a 429, a 5xx or a connection error/timeout
+  multiplies the limit by DROP_BACKOFF; a smoothed latency rising past
+  LATENCY_TOLERANCE x the no-load baseline multiplies it by LATENCY_BACKOFF.
+  At most one decrease is applied per smoothed round-trip, so one burst of
+  failures from the same window doesn't collapse the limit to the floor.
+
+The baseline is the lowest latency seen, drifting slowly upwards so a
+permanent shift (e.g. a slower region) is eventually accepted as normal.
+
+Like RateLimiter, all state is touched from the client's event loop without
+awaiting between check and update, so no lock is needed.
+"""
+import asyncio
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Deque, Dict, Optional
+
+import aiohttp
+
+from .constants import POOL_LIMIT_PER_HOST
+
+# Starting in-flight limit per host (the old fixed semaphore size).
+INITIAL_CONCURRENCY = 5
+MIN_CONCURRENCY = 1
+# No point going past the connector's per-host connection pool.
+MAX_CONCURRENCY = POOL_LIMIT_PER_HOST
+
+DROP_BACKOFF = 0.5
+LATENCY_BACKOFF = 0.9
+LATENCY_TOLERANCE = 2.0
+# EWMA weight of each new latency sample, and how fast the baseline drifts up.
+LATENCY_SMOOTHING = 0.2
+BASELINE_DRIFT = 0.01
+
+
+class AdaptiveLimit:
+    """AIMD in-flight limit for one host, with a FIFO queue of waiters."""
+
+    def __init__(
+        self,
+        initial: float = INITIAL_CONCURRENCY,
+        min_limit: int = MIN_CONCURRENCY,
+        max_limit: int = MAX_CONCURRENCY,
+    ):
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.limit = float(min(max(initial, min_limit), max_limit))
+        self.in_flight = 0
+        self.latency: Optional[float] = None
+        self.baseline: Optional[float] = None
+        self.increases = 0
+        self.decreases = 0
+        self._last_decrease = 0.0
+        self._waiters: Deque[asyncio.Future] = deque()
+
+    @property
+    def capacity(self) -> int:
+        return max(self.min_limit, int(self.limit))
+
+    async def acquire(self) -> None:
+        if self.in_flight < self.capacity and not self._waiters:
+            self.in_flight += 1
+            return
+        fut = asyncio.get_running_loop().create_future()
+        self._waiters.append(fut)
+        try:
+            await fut
+        except asyncio.CancelledError:
+            if fut.done() and not fut.cancelled():
+                self.release()  # granted a slot just as we were cancelled
+            else:
+                self._waiters.remove(fut)
+            raise
+
+    def release(self, latency: Optional[float] = None, dropped: bool = False) -> None:
+        """Free a slot and feed the outcome back: a latency sample, a drop, or neither."""
+        utilised = self.in_flight * 2 >= self.capacity
+        self.in_flight -= 1
+        now = time.monotonic()
+        if dropped:
+            self._decrease(now, DROP_BACKOFF)
+        elif latency is not None:
+            self._sample(latency)
+            if self.latency > self.baseline * LATENCY_TOLERANCE:
+                self._decrease(now, LATENCY_BACKOFF)
+            elif utilised and self.limit < self.max_limit:
+                self.limit = min(self.max_limit, self.limit + 1 / self.limit)
+                self.increases += 1
+        self._wake()
+
+    def _sample(self, latency: float) -> None:
+        if self.latency is None:
+            self.latency = self.baseline = latency
+            return
+        self.latency += (latency - self.latency) * LATENCY_SMOOTHING
+        if latency < self.baseline:
+            self.baseline = latency
+        else:
+            self.baseline += (latency - self.baseline) * BASELINE_DRIFT
+
+    def _decrease(self, now: float, factor: float) -> None:
+        if now - self._last_decrease < (self.latency or 0.0):
+            return
+        self._last_decrease = now
+        self.limit = max(float(self.min_limit), self.limit * factor)
+        self.decreases += 1
+
+    def _wake(self) -> None:
+        while self._waiters and self.in_flight < self.capacity:
+            fut = self._waiters.popleft()
+            if not fut.done():
+                self.in_flight += 1
+                fut.set_result(None)
+
+    def stats(self) -> Dict:
+        return {
+            "limit": round(self.limit, 2),
+            "in_flight": self.in_flight,
+            "queued": len(self._waiters),
+            "latency_ms": round(self.latency * 1000, 1) if self.latency is not None else None,
+            "baseline_ms": round(self.baseline * 1000, 1) if self.baseline is not None else None,
+            "increases": self.increases,
+            "decreases": self.decreases,
+        }
+
+
+class _Slot:
+    """Handle for one admitted request; mark it overloaded on a 429 / 5xx."""
+
+    __slots__ = ("dropped",)
+
+    def __init__(self):
+        self.dropped = False
+
+    def overloaded(self) -> None:
+        self.dropped = True
+
+
+class AdaptiveConcurrency:
+    """One AdaptiveLimit per routing host, created on first use."""
+
+    def __init__(self, initial: float = INITIAL_CONCURRENCY, max_limit: int = MAX_CONCURRENCY):
+        self.initial = initial
+        self.max_limit = max_limit
+        self._hosts: Dict[str, AdaptiveLimit] = {}
+
+    def host(self, host: str) -> AdaptiveLimit:
+        limit = self._hosts.get(host)
+        if limit is None:
+            limit = self._hosts[host] = AdaptiveLimit(self.initial, max_limit=self.max_limit)
+        return limit
+
+    @asynccontextmanager
+    async def slot(self, host: str) -> AsyncIterator[_Slot]:
+        """
+        Hold one in-flight slot on host for the duration of the block.
+
+        Leaving normally records the elapsed time as a latency sample, unless
+        the slot was marked overloaded(). Connection errors and timeouts count
+        as drops; any other exception (404, cancellation, ...) says nothing
+        about upstream load and releases without feedback.
+        """
+        limit = self.host(host)
+        await limit.acquire()
+        slot = _Slot()
+        started = time.monotonic()
+        try:
+            yield slot
+        except (aiohttp.ClientError, asyncio.TimeoutError):
+            limit.release(dropped=True)
+            raise
+        except BaseException:
+            limit.release(dropped=slot.dropped)
+            raise
+        else:
+            if slot.dropped:
+                limit.release(dropped=True)
+            else:
+                limit.release(time.monotonic() - started)
+
+    def stats(self) -> Dict[str, Dict]:
+        """Current limit, load and latency per host, for monitoring."""
+        return {host: limit.stats() for host, limit in self._hosts.items()}
@@ -1,5 +1,6 @@
 import os
 from typing import Optional
+from urllib.parse import urlsplit
 
 QUEUE_NAMES = {
     "RANKED_SOLO_5x5": "Ranked Solo/Duo",
@@ -7,30 +8,29 @@ QUEUE_NAMES = {
     "RANKED_TFT": "Ranked TFT",
 }
 
-# Platform base URLs (for league/mastery/summoner endpoints)
-REGION_ROUTING = {
-    'BR': 'https://br1.api.riotgames.com',
-    'BR1': 'https://br1.api.riotgames.com',
-    'EUNE': 'https://eun1.api.riotgames.com',
-    'EUN1': 'https://eun1.api.riotgames.com',
-    'EUW': 'https://euw1.api.riotgames.com',
-    'EUW1': 'https://euw1.api.riotgames.com',
-    'JP': 'https://jp1.api.riotgames.com',
-    'JP1': 'https://jp1.api.riotgames.com',
-    'KR': 'https://kr.api.riotgames.com',
-    'LA1': 'https://la1.api.riotgames.com',
-    'LA2': 'https://la2.api.riotgames.com',
-    'LAN': 'https://la1.api.riotgames.com',
-    'LAS': 'https://la2.api.riotgames.com',
-    'NA': 'https://na1.api.riotgames.com',
-    'NA1': 'https://na1.api.riotgames.com',
-    'OC1': 'https://oc1.api.riotgames.com',
-    'OCE': 'https://oc1.api.riotgames.com',
-    'TR': 'https://tr1.api.riotgames.com',
-    'TR1': 'https://tr1.api.riotgames.com',
-    'RU': 'https://ru.api.riotgames.com',
+# Base URL template for every Riot API host ("na1", "americas", ...). Point it
+# elsewhere — e.g. "http://127.0.0.1:8123/{host}" for the mock server in
+# tests/mock_riot.py — with the RIOT_API_BASE env var or set_riot_api_base().
+RIOT_API_BASE = os.getenv("RIOT_API_BASE", "https://{host}.api.riotgames.com")
+
+# Platform host per region alias (for league/mastery/summoner endpoints)
+PLATFORM_HOSTS = {
+    'BR': 'br1', 'BR1': 'br1',
+    'EUNE': 'eun1', 'EUN1': 'eun1',
+    'EUW': 'euw1', 'EUW1': 'euw1',
+    'JP': 'jp1', 'JP1': 'jp1',
+    'KR': 'kr',
+    'LA1': 'la1', 'LAN': 'la1',
+    'LA2': 'la2', 'LAS': 'la2',
+    'NA': 'na1', 'NA1': 'na1',
+    'OC1': 'oc1', 'OCE': 'oc1',
+    'TR': 'tr1', 'TR1': 'tr1',
+    'RU': 'ru',
 }
 
+# Platform base URLs, e.g. 'NA' → 'https://na1.api.riotgames.com'
+REGION_ROUTING = {}
+
 # Continental routing for account/match v5 endpoints
 MATCH_ROUTING = {
     'NA': 'americas', 'NA1': 'americas',
@@ -46,10 +46,142 @@ MATCH_ROUTING = {
     'RU': 'europe',
 }
 
+# Region value for "find the player's platform for me" (see
+# riot_api._resolve_platform). account-v1 is global, so AUTO lookups resolve
+# the Riot ID on ACCOUNT_ROUTING.
+AUTO_REGION = "AUTO"
+ACCOUNT_ROUTING = "americas"
+
+# Ranked games shown on the stats page and fed to the analyzers
+MATCH_HISTORY_COUNT = 20
+# Deeper history is paged in on request through /api/matches; match-v5
+# lists at most 100 IDs per call.
+MATCH_PAGE_SIZE = 20
+MAX_MATCH_PAGE_SIZE = 100
+
+# TTLs (seconds) for Riot ID → PUUID and summoner-v4 (level / icon) records
+ACCOUNT_CACHE_TTL = 24 * 3600
+SUMMONER_CACHE_TTL = 300
+
+# Scoreboard ranks (riot_api.get_ranks_async): how long a participant's league
+# entries are reused, how many uncached ones one /api/ranks call may fetch,
+# and how many PUUIDs it accepts (every player on a full match history).
+RANK_CACHE_TTL = int(os.getenv("RANK_CACHE_TTL", "1800"))
+RANK_ENRICH_BUDGET = int(os.getenv("RANK_ENRICH_BUDGET", "10"))
+MAX_RANK_PUUIDS = 10 * MATCH_HISTORY_COUNT
+
 REQUEST_TIMEOUT = 10
 RETRY_ATTEMPTS = 3
 RETRY_BACKOFF = 0.5
 
+# Time budget (seconds) for one /api/summoner lookup, end to end. Stays under
+# vercel.json's maxDuration (30s) so a slow Riot gives a partial response
+# instead of the platform killing the function (see backend/utils/deadline.py).
+REQUEST_DEADLINE = float(os.getenv("REQUEST_DEADLINE", "25"))
+
+# Admission control (see backend/utils/admission.py): the longest a lookup may
+# expect to wait for rate-limit budget before it is refused up front with 503
+# + Retry-After instead of being started. "inf" turns it off.
+ADMISSION_MAX_WAIT = float(os.getenv("ADMISSION_MAX_WAIT", "10"))
+
+# Shared connection pool for all Riot calls (see backend/riot_client.py)
+POOL_LIMIT = 100
+POOL_LIMIT_PER_HOST = 20
+DNS_CACHE_TTL = 300
+KEEPALIVE_TIMEOUT = 60
+
+# Per-host circuit breaker (see backend/utils/circuit_breaker.py): open once
+# at least BREAKER_MIN_REQUESTS calls in the last BREAKER_WINDOW seconds
+# failed at BREAKER_ERROR_RATE or worse, fail fast for BREAKER_OPEN_SECONDS
+# (doubling on each re-open), then let BREAKER_TRIALS trial requests decide.
+BREAKER_ERROR_RATE = float(os.getenv("BREAKER_ERROR_RATE", "0.5"))
+BREAKER_MIN_REQUESTS = int(os.getenv("BREAKER_MIN_REQUESTS", "10"))
+BREAKER_WINDOW = float(os.getenv("BREAKER_WINDOW", "30"))
+BREAKER_OPEN_SECONDS = float(os.getenv("BREAKER_OPEN_SECONDS", "15"))
+BREAKER_TRIALS = int(os.getenv("BREAKER_TRIALS", "3"))
+
+# Hedged requests (see backend/utils/hedging.py): an interactive match-detail
+# or timeline request still unanswered after the HEDGE_PERCENTILE latency of
+# recent ones gets a duplicate, once HEDGE_MIN_SAMPLES latencies are known and
+# while more than HEDGE_BUDGET_RESERVE rate-limit tokens are spare.
+# HEDGE_PERCENTILE=0 turns hedging off.
+HEDGE_PERCENTILE = float(os.getenv("HEDGE_PERCENTILE", "0.95"))
+HEDGE_MIN_SAMPLES = int(os.getenv("HEDGE_MIN_SAMPLES", "20"))
+HEDGE_BUDGET_RESERVE = int(os.getenv("HEDGE_BUDGET_RESERVE", "10"))
+
+# Rate-limit budget shared by every instance (see backend/utils/shared_budget.py):
+# redis://... or sqlite:///path, unset = per-instance limits only. While the
+# store is unreachable each instance keeps to SHARED_BUDGET_FALLBACK_SHARE of
+# the application limits and retries the store every SHARED_BUDGET_RETRY s.
+RATE_LIMIT_STORE = os.getenv("RATE_LIMIT_STORE") or None
+SHARED_BUDGET_FALLBACK_SHARE = float(os.getenv("SHARED_BUDGET_FALLBACK_SHARE", "0.25"))
+SHARED_BUDGET_RETRY = float(os.getenv("SHARED_BUDGET_RETRY", "30"))
+
+# Record / replay of Riot traffic (see backend/utils/cassette.py): the
+# cassette file, "record" or "replay", and the replay speed (1 = recorded
+# timings, 0 = as fast as possible). Unset = live traffic only.
+RIOT_CASSETTE = os.getenv("RIOT_CASSETTE") or None
+RIOT_CASSETTE_MODE = os.getenv("RIOT_CASSETTE_MODE", "replay")
+RIOT_CASSETTE_SPEED = float(os.getenv("RIOT_CASSETTE_SPEED", "1"))
+
+# Persistent match-detail store. Finished match-v5 payloads never change, so
+# they are kept on disk (Vercel only allows writes under /tmp) and reused
+# across lookups instead of being re-downloaded every time.
+CACHE_DIR = os.path.join(os.environ.get("TMPDIR", "/tmp"), "cleverpachonc_cache")
+MATCH_STORE_PATH = os.getenv("MATCH_STORE_PATH", os.path.join(CACHE_DIR, "matches.sqlite3"))
+MATCH_STORE_MAX_ENTRIES = int(os.getenv("MATCH_STORE_MAX_ENTRIES", "5000"))
+# How long (seconds) a looked-up player's PUUID and match-ID lists are kept
+# after their last lookup; tracked summoners keep theirs until untracked.
+MATCH_HISTORY_RETENTION = int(os.getenv("MATCH_HISTORY_RETENTION", "86400"))
+# Longest (seconds) a store read or write waits for another process's lock.
+MATCH_STORE_TIMEOUT = float(os.getenv("MATCH_STORE_TIMEOUT", "1"))
+
+# Tracked summoners (see backend/refresh_worker.py): how often their data is
+# re-synced in the background, the share of each host's application rate
+# budget the worker may use, and how many players can be tracked at once.
+TRACKED_REFRESH_INTERVAL = int(os.getenv("TRACKED_REFRESH_INTERVAL", "300"))
+TRACKED_BUDGET_SHARE = float(os.getenv("TRACKED_BUDGET_SHARE", "0.25"))
+MAX_TRACKED_SUMMONERS = int(os.getenv("MAX_TRACKED_SUMMONERS", "50"))
+# Bearer token required to track / untrack summoners. Unset = tracking is
+# read-only (nobody can add or remove players).
+ADMIN_TOKEN = os.getenv("ADMIN_TOKEN") or None
+
+# Most players one /api/summoner/batch call may look up (a clash team is 5).
+MAX_BATCH_SUMMONERS = int(os.getenv("MAX_BATCH_SUMMONERS", "10"))
+
 
 def get_api_key() -> Optional[str]:
     return os.getenv('RIOT_API_KEY')
+
+
+def riot_url(host: str) -> str:
+    """Base URL of a routing or platform host, e.g. riot_url("americas")."""
+    return RIOT_API_BASE.format(host=host)
+
+
+def set_riot_api_base(template: str) -> None:
+    """Re-point every Riot base URL at template (must contain "{host}")."""
+    global RIOT_API_BASE
+    if "{host}" not in template:
+        raise ValueError("Riot API base template must contain {host}")
+    RIOT_API_BASE = template.rstrip("/")
+    REGION_ROUTING.clear()
+    REGION_ROUTING.update({region: riot_url(host) for region, host in PLATFORM_HOSTS.items()})
+
+
+def riot_host(url: str) -> str:
+    """Short routing/platform host name of a Riot URL, e.g. "americas" or "na1"."""
+    prefix, _, _ = RIOT_API_BASE.partition("{host}")
+    if "/" in prefix.split("://", 1)[-1] and url.startswith(prefix):
+        # Host carried in the path (mock server): first segment after the prefix
+        return url[len(prefix):].split("/", 1)[0]
+    return (urlsplit(url).hostname or "").split(".")[0]
+
+
+def riot_path(url: str) -> str:
+    """Endpoint path of a Riot URL, without its host's base, e.g. "/lol/match/v5/matches/NA1_1"."""
+    base = riot_url(riot_host(url))
+    return urlsplit(url[len(base):] if url.startswith(base) else url).path
+
+
+set_riot_api_base(RIOT_API_BASE)
@@ -0,0 +1,93 @@
+"""
+Per-request deadlines for Riot calls.
+
+vercel.json caps api/index.py at maxDuration seconds, but a single _get can
+spend REQUEST_TIMEOUT × RETRY_ATTEMPTS plus rate-limit waits on its own, so
+an unbounded lookup risks being killed by the platform with nothing sent.
+A lookup instead runs under one Deadline, and every call below it fits its
+waits, timeouts and retries into the time that is left:
+
+    with request_deadline(REQUEST_DEADLINE):
+        ...
+
+Like the priority class (utils/scheduler.py) the deadline is carried by a
+context variable, so the tasks a lookup fans out share it. Nesting keeps
+whichever deadline is sooner. Work cut short raises DeadlineExceeded, which
+callers can catch to return whatever did arrive.
+"""
+import asyncio
+import contextvars
+import time
+from contextlib import contextmanager
+from typing import Awaitable, Iterator, Optional, TypeVar, Union
+
+from .exceptions import DeadlineExceeded
+
+T = TypeVar("T")
+
+# A request attempt with less time than this left isn't worth sending.
+MIN_ATTEMPT_SECONDS = 0.5
+
+
+class Deadline:
+    """A point in time (monotonic) by which a request must be done."""
+
+    __slots__ = ("expires",)
+
+    def __init__(self, seconds: float):
+        self.expires = time.monotonic() + seconds
+
+    def remaining(self) -> float:
+        return max(0.0, self.expires - time.monotonic())
+
+    def expired(self) -> bool:
+        return self.remaining() <= 0
+
+    def allows(self, seconds: float) -> bool:
+        """Whether seconds of waiting still leave room for one more attempt."""
+        return self.remaining() - seconds >= MIN_ATTEMPT_SECONDS
+
+    def check(self) -> None:
+        """Raise DeadlineExceeded if too little time is left to start another attempt."""
+        if not self.allows(0):
+            raise DeadlineExceeded("Request deadline exceeded.")
+
+    def __repr__(self) -> str:
+        return f"Deadline(remaining={self.remaining():.2f}s)"
+
+
+_deadline: contextvars.ContextVar = contextvars.ContextVar("riot_deadline", default=None)
+
+
+def current_deadline() -> Optional[Deadline]:
+    return _deadline.get()
+
+
+@contextmanager
+def request_deadline(deadline: Union[Deadline, float, None]) -> Iterator[Optional[Deadline]]:
+    """
+    Run the enclosed Riot calls (and tasks they spawn) under deadline, given
+    as a Deadline or in seconds from now. None leaves the current one as is.
+    """
+    if deadline is not None and not isinstance(deadline, Deadline):
+        deadline = Deadline(deadline)
+    outer = _deadline.get()
+    if deadline is None or (outer is not None and outer.expires <= deadline.expires):
+        deadline = outer
+    token = _deadline.set(deadline)
+    try:
+        yield deadline
+    finally:
+        _deadline.reset(token)
+
+
+async def within(aw: Awaitable[T], deadline: Optional[Deadline]) -> T:
+    """Await aw, giving up with DeadlineExceeded once deadline passes (no-op for None)."""
+    if deadline is None:
+        return await aw
+    try:
+        return await asyncio.wait_for(aw, deadline.remaining())
+    except asyncio.TimeoutError:
+        if not deadline.expired():
+            raise  # a timeout from inside aw, not ours
+        raise DeadlineExceeded("Request deadline exceeded.") from None
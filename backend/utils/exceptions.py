@@ -26,3 +26,7 @@ class NetworkError(CleverPachoncError):
 
 class ConfigError(CleverPachoncError):
     pass
+
+
+class DeadlineExceeded(NetworkError):
+    """The request's time budget ran out before Riot answered (see utils/deadline.py)."""
@@ -0,0 +1,129 @@
+"""
+Hedged requests for match-v5 detail and timeline calls.
+
+A stats page waits for all MATCH_HISTORY_COUNT match details, so its tail
+latency is set by the slowest one. Hedger.run() sends a request and, if it
+hasn't answered once the HEDGE_PERCENTILE latency of recent requests to the
+same host + endpoint has passed, sends a duplicate; whichever answers first
+is used and the other is cancelled.
+
+Hedges go through the same scheduler / rate limiter / concurrency path as
+any request, so they spend real budget. A hedge is only sent while:
+
+- at least HEDGE_MIN_SAMPLES latencies are known for the endpoint,
+- the host + endpoint have more than HEDGE_BUDGET_RESERVE tokens to spare,
+- and the request deadline (if any) leaves room for another attempt.
+
+HEDGE_PERCENTILE=0 turns hedging off.
+"""
+import asyncio
+import time
+from collections import deque
+from typing import Any, Awaitable, Callable, Deque, Dict, Optional, Tuple, TypeVar
+
+from .constants import HEDGE_BUDGET_RESERVE, HEDGE_MIN_SAMPLES, HEDGE_PERCENTILE
+from .deadline import Deadline
+from .rate_limiter import RateLimiter
+
+T = TypeVar("T")
+
+# Endpoints (method keys, see rate_limiter.method_key) worth hedging.
+HEDGED_METHODS = frozenset({
+    "/lol/match/v5/matches/{matchId}",
+    "/lol/match/v5/matches/{matchId}/timeline",
+})
+
+# Recent latencies kept per host + endpoint.
+LATENCY_WINDOW = 200
+
+
+class Hedger:
+    """Per host + endpoint latency percentiles, and the hedged send built on them."""
+
+    def __init__(
+        self,
+        limiter: RateLimiter,
+        percentile: float = HEDGE_PERCENTILE,
+        min_samples: int = HEDGE_MIN_SAMPLES,
+        budget_reserve: int = HEDGE_BUDGET_RESERVE,
+        window: int = LATENCY_WINDOW,
+    ):
+        self.limiter = limiter
+        self.percentile = percentile
+        self.min_samples = min_samples
+        self.budget_reserve = budget_reserve
+        self.window = window
+        self._latency: Dict[Tuple[str, str], Deque[float]] = {}
+        self._stats = {"requests": 0, "hedged": 0, "hedge_wins": 0, "skipped_budget": 0}
+
+    def threshold(self, host: str, method: str) -> Optional[float]:
+        """Seconds after which a request to host + method gets a hedge; None = never."""
+        samples = self._latency.get((host, method))
+        if self.percentile <= 0 or samples is None or len(samples) < self.min_samples:
+            return None
+        ordered = sorted(samples)
+        return ordered[min(len(ordered) - 1, int(len(ordered) * self.percentile))]
+
+    def record(self, host: str, method: str, latency: float) -> None:
+        samples = self._latency.get((host, method))
+        if samples is None:
+            samples = self._latency[(host, method)] = deque(maxlen=self.window)
+        samples.append(latency)
+
+    def _can_hedge(self, host: str, method: str, deadline: Optional[Deadline]) -> bool:
+        if deadline is not None and not deadline.allows(0):
+            return False
+        if self.limiter.time_until(host, method, self.budget_reserve + 1) > 0:
+            self._stats["skipped_budget"] += 1
+            return False
+        return True
+
+    async def run(
+        self,
+        host: str,
+        method: str,
+        send: Callable[[], Awaitable[T]],
+        deadline: Optional[Deadline] = None,
+    ) -> T:
+        """
+        Await send(), racing a second send() against it if the first is slow.
+        Returns the first result; only if both raise does the primary's error.
+        """
+        self._stats["requests"] += 1
+        started = time.monotonic()
+        primary = asyncio.ensure_future(send())
+        tasks = {primary}
+        try:
+            delay = self.threshold(host, method)
+            if delay is not None:
+                done, _ = await asyncio.wait(tasks, timeout=delay)
+                if not done and self._can_hedge(host, method, deadline):
+                    tasks.add(asyncio.ensure_future(send()))
+                    self._stats["hedged"] += 1
+            while True:
+                done, _ = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    tasks.discard(task)
+                    if task.exception() is None:
+                        if task is not primary:
+                            self._stats["hedge_wins"] += 1
+                        self.record(host, method, time.monotonic() - started)
+                        return task.result()
+                if not tasks:
+                    return primary.result()  # both failed: raise the primary's error
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    def stats(self) -> Dict[str, Any]:
+        """How often hedges were sent and won, plus the current thresholds."""
+        s = self._stats
+        return {
+            **s,
+            "win_rate": round(s["hedge_wins"] / s["hedged"], 3) if s["hedged"] else 0.0,
+            "thresholds": {
+                f"{host} {method}": round(threshold, 4)
+                for (host, method) in self._latency
+                if (threshold := self.threshold(host, method)) is not None
+            },
+        }
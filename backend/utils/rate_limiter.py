@@ -1,10 +1,406 @@
+"""
+Riot API rate limiting.
+
+Riot enforces two layers of limits, each a list of "count:seconds" windows:
+
+- application limits, per routing host   (X-App-Rate-Limit / X-App-Rate-Limit-Count)
+- method limits, per host + endpoint     (X-Method-Rate-Limit / X-Method-Rate-Limit-Count)
+
+RateLimiter keeps one token bucket per window and learns the real limits from
+the response headers, starting from the development-key defaults. The *-Count
+headers are used to resync the buckets with Riot's view of usage.
+
+A 429 pauses the whole scope it applies to (the host for application limits,
+the endpoint for method/service limits) until Retry-After has passed, and
+drains its buckets, so every waiting request resumes together at the refill
+rate instead of each task sleeping and retrying on its own.
+
+All state is touched from one event loop without awaiting between check and
+take, so no lock is needed.
+
+Riot counts usage per API key, across every instance. Given a shared
+BudgetStore (utils/shared_budget.py, RATE_LIMIT_STORE), a request admitted
+by the local buckets must also get a slot in the shared log before it goes
+out, and 429 pauses are shared too. Its local tokens are taken before the
+reservation is awaited and given back if the store refuses it, so other
+tasks checking meanwhile never overdraw the buckets. While the store is unreachable the
+limiter falls back to a conservative share (SHARED_BUDGET_FALLBACK_SHARE) of
+the application limits, and tries the store again after
+SHARED_BUDGET_RETRY seconds.
+"""
 import asyncio
+import logging
+import re
+import time
+from typing import Dict, List, Mapping, Optional, Set, Tuple
+
+from .constants import SHARED_BUDGET_FALLBACK_SHARE, SHARED_BUDGET_RETRY
+from .exceptions import RateLimitError
+from .shared_budget import BudgetStore, Scope
+
+logger = logging.getLogger(__name__)
+
+# Development-key application limits, used until a response teaches us better.
+DEFAULT_APP_LIMITS = "20:1,100:120"
+
+# Longest a request may queue for budget before giving up with RateLimitError.
+MAX_RATE_LIMIT_WAIT = 10
+
+_METHOD_PATTERNS = [
+    (re.compile(r"/by-riot-id/[^/]+/[^/]+$"), "/by-riot-id/{gameName}/{tagLine}"),
+    (re.compile(r"/by-puuid/[^/]+"), "/by-puuid/{puuid}"),
+    (re.compile(r"/matches/[A-Za-z0-9]+_\d+"), "/matches/{matchId}"),
+]
+
+
+def method_key(path: str) -> str:
+    """Collapse an endpoint path to its method template (IDs replaced by placeholders)."""
+    for pattern, repl in _METHOD_PATTERNS:
+        path = pattern.sub(repl, path)
+    return path
+
+
+def parse_limits(header: Optional[str]) -> List[Tuple[int, int]]:
+    """Parse "20:1,100:120" into [(20, 1), (100, 120)]; bad input → []."""
+    pairs = []
+    for part in (header or "").split(","):
+        try:
+            count, seconds = part.strip().split(":")
+            pairs.append((int(count), int(seconds)))
+        except ValueError:
+            continue
+    return pairs
+
+
+class TokenBucket:
+    """capacity tokens refilled evenly over window seconds."""
+
+    __slots__ = ("capacity", "window", "tokens", "updated")
+
+    def __init__(self, capacity: int, window: int):
+        self.capacity = capacity
+        self.window = window
+        self.tokens = float(capacity)
+        self.updated = time.monotonic()
+
+    def _refill(self, now: float) -> None:
+        rate = self.capacity / self.window
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * rate)
+        self.updated = now
+
+    def time_until(self, now: float, n: int = 1) -> float:
+        """Seconds until n tokens (at most a full bucket) are available; 0 if available now."""
+        self._refill(now)
+        n = min(n, self.capacity)
+        if self.tokens >= n:
+            return 0.0
+        return (n - self.tokens) * self.window / self.capacity
+
+    def time_to_serve(self, now: float, n: int) -> float:
+        """Seconds until n requests could all have gone out at the refill rate."""
+        self._refill(now)
+        return max(0.0, (n - self.tokens) * self.window / self.capacity)
+
+    def take(self, n: int = 1) -> None:
+        self.tokens -= n
+
+    def sync(self, used: int) -> None:
+        """Never believe we have more left than Riot says we do."""
+        self.tokens = min(self.tokens, float(self.capacity - used))
+
+    def drain(self, now: float) -> None:
+        self._refill(now)
+        self.tokens = min(self.tokens, 0.0)
+
+
+class _LimitSet:
+    """All windows (e.g. per-second and per-2-minutes) for one scope."""
+
+    def __init__(self, limits: List[Tuple[int, int]]):
+        self.buckets: Dict[int, TokenBucket] = {}
+        self.pause_until = 0.0
+        self.set_limits(limits)
+
+    def set_limits(self, limits: List[Tuple[int, int]]) -> None:
+        if not limits or sorted(limits, key=lambda x: x[1]) == self.limits():
+            return
+        old = self.buckets
+        self.buckets = {}
+        for count, window in limits:
+            bucket = TokenBucket(count, window)
+            if window in old:
+                bucket.tokens = min(bucket.tokens, old[window].tokens)
+            self.buckets[window] = bucket
+
+    def limits(self) -> List[Tuple[int, int]]:
+        return sorted(((b.capacity, w) for w, b in self.buckets.items()), key=lambda x: x[1])
+
+    def sync_counts(self, counts: List[Tuple[int, int]]) -> None:
+        for used, window in counts:
+            bucket = self.buckets.get(window)
+            if bucket:
+                bucket.sync(used)
+
+    def time_until(self, now: float, n: int = 1) -> float:
+        wait = max(0.0, self.pause_until - now)
+        for bucket in self.buckets.values():
+            wait = max(wait, bucket.time_until(now, n))
+        return wait
+
+    def time_to_serve(self, now: float, n: int) -> float:
+        wait = max(0.0, self.pause_until - now)
+        for bucket in self.buckets.values():
+            wait = max(wait, bucket.time_to_serve(now, n))
+        return wait
+
+    def take(self, n: int = 1) -> None:
+        for bucket in self.buckets.values():
+            bucket.take(n)
+
+    def pause(self, now: float, seconds: float) -> None:
+        self.pause_until = max(self.pause_until, now + seconds)
+        for bucket in self.buckets.values():
+            bucket.drain(now)
+
+
+class RateLimiter:
+    """Per-host application buckets + per-endpoint method buckets, learnt from headers."""
+
+    def __init__(
+        self,
+        default_app_limits: str = DEFAULT_APP_LIMITS,
+        max_wait: float = MAX_RATE_LIMIT_WAIT,
+        shared: Optional[BudgetStore] = None,
+        fallback_share: float = SHARED_BUDGET_FALLBACK_SHARE,
+        retry_interval: float = SHARED_BUDGET_RETRY,
+    ):
+        self.default_app_limits = parse_limits(default_app_limits)
+        self.max_wait = max_wait
+        self.shared = shared
+        self.fallback_share = fallback_share
+        self.retry_interval = retry_interval
+        self._app: Dict[str, _LimitSet] = {}
+        self._method: Dict[Tuple[str, str], _LimitSet] = {}
+        self._fallback: Dict[str, _LimitSet] = {}
+        self._waits: Dict[str, Dict[str, float]] = {}
+        self._shared_down_until = 0.0
+        self._shared_stats = {"reserved": 0, "throttled": 0, "failures": 0}
+        self._pending: Set[asyncio.Task] = set()
+        self.rate_limited = 0
+
+    def _app_scope(self, host: str) -> _LimitSet:
+        app = self._app.get(host)
+        if app is None:
+            app = self._app[host] = _LimitSet(self.default_app_limits)
+        return app
+
+    def _scopes(self, host: str, method: str) -> Tuple[_LimitSet, _LimitSet]:
+        app = self._app_scope(host)
+        meth = self._method.get((host, method))
+        if meth is None:
+            meth = self._method[(host, method)] = _LimitSet([])
+        return app, meth
+
+    def app_limits(self, host: str) -> List[Tuple[int, int]]:
+        """Current (count, seconds) application windows for host, shortest first."""
+        app = self._app.get(host)
+        if app is None:
+            return sorted(self.default_app_limits, key=lambda x: x[1])
+        return app.limits()
+
+    def time_until(self, host: str, method: str, n: int = 1) -> float:
+        """Seconds until n requests to host/method would be admitted (locally)."""
+        now = time.monotonic()
+        app, meth = self._scopes(host, method)
+        wait = max(app.time_until(now, n), meth.time_until(now, n))
+        if self._degraded(now):
+            wait = max(wait, self._fallback_scope(host).time_until(now, n))
+        return wait
+
+    def time_to_serve(self, host: str, n: int) -> float:
+        """
+        Seconds until the application budget could have admitted n more
+        requests to host, counting refills while they go out; what a lookup
+        costing n calls would spend waiting for budget.
+        """
+        app = self._app_scope(host)
+        now = time.monotonic()
+        wait = app.time_to_serve(now, n)
+        if self._degraded(now):
+            wait = max(wait, self._fallback_scope(host).time_to_serve(now, n))
+        return wait
+
+    # ── Shared budget ───────────────────────────────────────────────────
+
+    def _degraded(self, now: float) -> bool:
+        """Whether the shared store is configured but currently unreachable."""
+        return self.shared is not None and now < self._shared_down_until
+
+    def _fallback_scope(self, host: str) -> _LimitSet:
+        """fallback_share of host's application limits, for while the store is down."""
+        limits = [(max(1, int(count * self.fallback_share)), window) for count, window in self.app_limits(host)]
+        scope = self._fallback.get(host)
+        if scope is None:
+            scope = self._fallback[host] = _LimitSet(limits)
+        else:
+            scope.set_limits(limits)
+        return scope
+
+    def _shared_scopes(self, host: str, method: str) -> List[Scope]:
+        app, meth = self._scopes(host, method)
+        scopes: List[Scope] = [(f"app:{host}", app.limits())]
+        if meth.buckets:
+            scopes.append((f"method:{host}:{method}", meth.limits()))
+        return scopes
+
+    def _shared_failed(self, exc: BaseException) -> None:
+        if not self._degraded(time.monotonic()):
+            logger.warning("Shared rate-limit store unreachable, using local limits: %s", exc)
+        self._shared_stats["failures"] += 1
+        self._shared_down_until = time.monotonic() + self.retry_interval
+
+    def _share_pause(self, scope: str, seconds: float) -> None:
+        """Tell the other instances about a 429 pause (in the background)."""
+        if self.shared is None or self._degraded(time.monotonic()):
+            return
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return
+        task = loop.create_task(self.shared.pause(scope, seconds))
+        self._pending.add(task)
+
+        def _done(task: asyncio.Task) -> None:
+            self._pending.discard(task)
+            if not task.cancelled() and task.exception() is not None:
+                self._shared_failed(task.exception())
+
+        task.add_done_callback(_done)
+
+    def _take(self, host: str, method: str) -> List[_LimitSet]:
+        """Take one token from every local scope host + method draws on; returns them."""
+        taken = list(self._scopes(host, method))
+        if self._degraded(time.monotonic()):
+            taken.append(self._fallback_scope(host))
+        for scope in taken:
+            scope.take()
+        return taken
+
+    async def _reserve_shared(self, host: str, method: str, taken: List[_LimitSet]) -> Optional[float]:
+        """
+        The shared store's wait for a request whose local tokens are already
+        taken, giving them back unless a slot is booked. None if the store
+        failed.
+
+        A caller cancelled mid-reservation doesn't cancel the reservation:
+        if it books a slot, that slot and the local tokens stay spent (the
+        budget errs on the safe side), otherwise the tokens go back.
+        """
+        def refund() -> None:
+            for scope in taken:
+                scope.take(-1)
+
+        def settle(task: asyncio.Task) -> None:
+            self._pending.discard(task)
+            if task.cancelled():
+                refund()
+            elif task.exception() is not None:
+                refund()
+                self._shared_failed(task.exception())
+            elif task.result() > 0:
+                refund()
+
+        reservation = asyncio.ensure_future(self.shared.reserve(self._shared_scopes(host, method)))
+        self._pending.add(reservation)
+        try:
+            wait = await asyncio.shield(reservation)
+        except asyncio.CancelledError:
+            if reservation.done():
+                settle(reservation)
+            else:
+                reservation.add_done_callback(settle)
+            raise
+        except Exception:
+            settle(reservation)
+            return None
+        settle(reservation)
+        self._shared_stats["reserved" if wait <= 0 else "throttled"] += 1
+        return wait
+
+    async def acquire(self, host: str, method: str) -> float:
+        """Wait for budget on host + method and consume it. Returns seconds waited."""
+        started = time.monotonic()
+        slept = False
+        while True:
+            wait = self.time_until(host, method)
+            if wait <= 0:
+                taken = self._take(host, method)
+                if self.shared is not None and not self._degraded(time.monotonic()):
+                    wait = await self._reserve_shared(host, method, taken)
+                    if wait is None:
+                        continue  # re-check against the fallback limits
+            if wait <= 0:
+                waited = time.monotonic() - started if slept else 0.0
+                self._record_wait(host, waited)
+                return waited
+            if time.monotonic() - started + wait > self.max_wait:
+                self._record_wait(host, time.monotonic() - started if slept else 0.0)
+                raise RateLimitError("Rate limit exceeded.", 429)
+            slept = True
+            await asyncio.sleep(wait)
+
+    def update(self, host: str, method: str, headers: Mapping[str, str]) -> None:
+        """Learn limits and resync usage from a response's rate-limit headers."""
+        app, meth = self._scopes(host, method)
+        app.set_limits(parse_limits(headers.get("X-App-Rate-Limit")))
+        app.sync_counts(parse_limits(headers.get("X-App-Rate-Limit-Count")))
+        meth.set_limits(parse_limits(headers.get("X-Method-Rate-Limit")))
+        meth.sync_counts(parse_limits(headers.get("X-Method-Rate-Limit-Count")))
 
-# Cap concurrent outbound Riot API requests per invocation.
-# A new Semaphore is created per get_summoner_data_async call so it
-# is safely scoped to a single asyncio event loop.
-CONCURRENCY_LIMIT = 5
+    def on_rate_limited(self, host: str, method: str, headers: Mapping[str, str], fallback: float = 1.0) -> float:
+        """Pause the scope a 429 applies to; returns the pause length in seconds."""
+        self.update(host, method, headers)
+        self.rate_limited += 1
+        try:
+            retry_after = float(headers.get("Retry-After", fallback))
+        except (TypeError, ValueError):
+            retry_after = fallback
+        app, meth = self._scopes(host, method)
+        application = headers.get("X-Rate-Limit-Type", "").lower() == "application"
+        scope = app if application else meth
+        scope.pause(time.monotonic(), retry_after)
+        self._share_pause(f"app:{host}" if application else f"method:{host}:{method}", retry_after)
+        return retry_after
 
+    def _record_wait(self, host: str, waited: float) -> None:
+        w = self._waits.setdefault(host, {"requests": 0, "waited": 0, "total_wait": 0.0, "max_wait": 0.0})
+        w["requests"] += 1
+        if waited > 0:
+            w["waited"] += 1
+            w["total_wait"] += waited
+            w["max_wait"] = max(w["max_wait"], waited)
 
-def make_semaphore() -> asyncio.Semaphore:
-    return asyncio.Semaphore(CONCURRENCY_LIMIT)
+    def stats(self) -> Dict[str, Dict]:
+        """Learnt limits and queueing time per host, for monitoring."""
+        out = {}
+        for host, app in self._app.items():
+            w = self._waits.get(host, {"requests": 0, "waited": 0, "total_wait": 0.0, "max_wait": 0.0})
+            out[host] = {
+                "app_limits": [f"{c}:{s}" for c, s in app.limits()],
+                "method_limits": {
+                    m: [f"{c}:{s}" for c, s in ls.limits()]
+                    for (h, m), ls in self._method.items() if h == host and ls.buckets
+                },
+                "requests": w["requests"],
+                "waited": w["waited"],
+                "avg_wait": round(w["total_wait"] / w["requests"], 4) if w["requests"] else 0.0,
+                "max_wait": round(w["max_wait"], 4),
+            }
+        stats = {"hosts": out, "rate_limited": self.rate_limited}
+        if self.shared is not None:
+            stats["shared"] = {
+                "store": self.shared.name,
+                "degraded": self._degraded(time.monotonic()),
+                **self._shared_stats,
+            }
+        return stats
@@ -0,0 +1,236 @@
+"""
+Priority scheduling of Riot calls in front of the rate limiter.
+
+Background work (refreshes, prefetch, enrichment) draws from the same Riot
+budget as interactive /api/summoner lookups. Every _get attempt therefore
+passes through PriorityScheduler.acquire() with one of three classes:
+
+    INTERACTIVE  a user is waiting on the response
+    PREFETCH     likely to be needed soon (timeline prefetch, ...)
+    BATCH        everything else (refresh workers, enrichment, ...)
+
+The class is carried by a context variable, so a whole lookup — including
+the tasks it fans out — runs at the priority it was started with:
+
+    with request_priority(Priority.BATCH):
+        await get_summoner_data_async(name, region)
+
+Rules, per routing host:
+
+- A ticket waits while any queued ticket on the host has a strictly better
+  class. Interactive tickets stay queued until the RateLimiter admits them,
+  so a backlog of user-facing requests holds every lower class back.
+- Lower classes only take leftover budget: they go out only while the host
+  and endpoint have RESERVE[cls] tokens to spare beyond their own.
+- Aging: a ticket's effective class improves by one step every
+  AGING_INTERVAL seconds it has waited, so batch work can't starve forever.
+- When a higher-priority caller joins a coalesced request that is still
+  waiting here, promote() lifts the shared ticket to the joiner's class.
+- The same for a whole coalesced lookup: its calls run inside
+  request_flight(key), and when a better caller joins it lift() moves the
+  flight's queued tickets, and every call it makes from then on, up to
+  the joiner's class (see effective_priority()).
+"""
+import asyncio
+import contextvars
+import itertools
+import time
+from contextlib import contextmanager
+from enum import IntEnum
+from typing import Dict, Hashable, Iterator, List, Optional
+
+from .rate_limiter import RateLimiter
+
+
+class Priority(IntEnum):
+    INTERACTIVE = 0
+    PREFETCH = 1
+    BATCH = 2
+
+
+# Tokens a class must leave untouched for the classes above it.
+RESERVE = {Priority.INTERACTIVE: 0, Priority.PREFETCH: 2, Priority.BATCH: 5}
+
+# Seconds of waiting that promote a ticket by one class.
+AGING_INTERVAL = 5.0
+
+# Upper bound on how long a blocked ticket sleeps before re-checking.
+MAX_POLL = 0.5
+
+_priority: contextvars.ContextVar = contextvars.ContextVar("riot_priority", default=Priority.INTERACTIVE)
+_flight: contextvars.ContextVar = contextvars.ContextVar("riot_flight", default=None)
+
+
+def current_priority() -> Priority:
+    return _priority.get()
+
+
+@contextmanager
+def request_priority(priority: Priority) -> Iterator[None]:
+    """Run the enclosed Riot calls (and tasks they spawn) at priority."""
+    token = _priority.set(Priority(priority))
+    try:
+        yield
+    finally:
+        _priority.reset(token)
+
+
+@contextmanager
+def request_flight(key: Hashable) -> Iterator[None]:
+    """Tag the enclosed Riot calls (and tasks they spawn) as part of the coalesced lookup key."""
+    token = _flight.set(key)
+    try:
+        yield
+    finally:
+        _flight.reset(token)
+
+
+class _Ticket:
+    __slots__ = ("priority", "enqueued", "seq", "key", "flight")
+
+    def __init__(
+        self, priority: Priority, enqueued: float, seq: int, key: Optional[Hashable],
+        flight: Optional[Hashable] = None,
+    ):
+        self.priority = priority
+        self.enqueued = enqueued
+        self.seq = seq
+        self.key = key
+        self.flight = flight
+
+    def effective(self, now: float) -> int:
+        return max(Priority.INTERACTIVE, self.priority - int((now - self.enqueued) / AGING_INTERVAL))
+
+
+class PriorityScheduler:
+    """Per-host priority queue of tickets gating RateLimiter.acquire()."""
+
+    def __init__(self, limiter: RateLimiter):
+        self.limiter = limiter
+        self._queues: Dict[str, List[_Ticket]] = {}
+        self._changed: Dict[str, asyncio.Event] = {}
+        self._lifts: Dict[Hashable, Priority] = {}
+        self._seq = itertools.count()
+        self._stats = {
+            p.name.lower(): {"admitted": 0, "aged": 0, "promoted": 0, "total_wait": 0.0, "max_wait": 0.0}
+            for p in Priority
+        }
+
+    async def acquire(
+        self,
+        host: str,
+        method: str,
+        priority: Optional[Priority] = None,
+        key: Optional[Hashable] = None,
+    ) -> float:
+        """Wait for this class's turn and then for rate-limit budget. Returns seconds waited."""
+        priority = self.effective_priority(priority)
+        started = time.monotonic()
+        ticket = _Ticket(priority, started, next(self._seq), key, _flight.get())
+        queue = self._queues.setdefault(host, [])
+        queue.append(ticket)
+        try:
+            while True:
+                now = time.monotonic()
+                wait = self._blocked_for(host, method, ticket, now)
+                if wait <= 0:
+                    break
+                await self._wait_change(host, min(wait, MAX_POLL))
+            await self.limiter.acquire(host, method)
+        finally:
+            queue.remove(ticket)
+            self._notify(host)
+        waited = time.monotonic() - started
+        self._record(ticket, waited)
+        return waited
+
+    def effective_priority(self, priority: Optional[Priority] = None) -> Priority:
+        """priority (default: the current class), or better if the current flight was lifted."""
+        priority = current_priority() if priority is None else Priority(priority)
+        flight = _flight.get()
+        if flight is not None and flight in self._lifts:
+            priority = min(priority, self._lifts[flight])
+        return priority
+
+    def promote(self, key: Hashable, priority: Optional[Priority] = None) -> None:
+        """Lift queued tickets for key to priority if that is better than theirs."""
+        self._promote("key", key, priority)
+
+    def lift(self, flight: Hashable, priority: Optional[Priority] = None) -> None:
+        """
+        Run flight's calls at priority from now on, if that is better than
+        what it was lifted to before, and promote those already queued.
+        """
+        priority = current_priority() if priority is None else Priority(priority)
+        if flight in self._lifts and self._lifts[flight] <= priority:
+            return
+        self._lifts[flight] = priority
+        self._promote("flight", flight, priority)
+
+    def land(self, flight: Hashable) -> None:
+        """Forget flight's lift once it has finished."""
+        self._lifts.pop(flight, None)
+
+    def _promote(self, attr: str, value: Hashable, priority: Optional[Priority]) -> None:
+        priority = current_priority() if priority is None else Priority(priority)
+        for host, queue in self._queues.items():
+            for ticket in queue:
+                if getattr(ticket, attr) == value and priority < ticket.priority:
+                    ticket.priority = priority
+                    self._stats[priority.name.lower()]["promoted"] += 1
+                    self._notify(host)
+
+    def queued(self, host: str) -> int:
+        """Requests to host waiting for their turn or for budget right now."""
+        return len(self._queues.get(host, ()))
+
+    def _blocked_for(self, host: str, method: str, ticket: _Ticket, now: float) -> float:
+        """0 if ticket may proceed now, else seconds until it is worth re-checking."""
+        mine = ticket.effective(now)
+        if any(other.effective(now) < mine for other in self._queues[host] if other is not ticket):
+            return MAX_POLL
+        if mine == Priority.INTERACTIVE:
+            return 0.0
+        headroom = self.limiter.time_until(host, method, RESERVE[Priority(mine)] + 1)
+        if headroom <= 0:
+            return 0.0
+        next_step = AGING_INTERVAL - (now - ticket.enqueued) % AGING_INTERVAL
+        return min(headroom, next_step)
+
+    async def _wait_change(self, host: str, timeout: float) -> None:
+        event = self._changed.setdefault(host, asyncio.Event())
+        try:
+            await asyncio.wait_for(event.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+
+    def _notify(self, host: str) -> None:
+        event = self._changed.pop(host, None)
+        if event is not None:
+            event.set()
+
+    def _record(self, ticket: _Ticket, waited: float) -> None:
+        s = self._stats[ticket.priority.name.lower()]
+        s["admitted"] += 1
+        s["total_wait"] += waited
+        s["max_wait"] = max(s["max_wait"], waited)
+        if ticket.effective(ticket.enqueued + waited) < ticket.priority:
+            s["aged"] += 1
+
+    def stats(self) -> Dict[str, Dict]:
+        """Admissions and queueing time per class, plus what is queued per host now."""
+        classes = {
+            name: {
+                "admitted": s["admitted"],
+                "aged": s["aged"],
+                "promoted": s["promoted"],
+                "avg_wait": round(s["total_wait"] / s["admitted"], 4) if s["admitted"] else 0.0,
+                "max_wait": round(s["max_wait"], 4),
+            }
+            for name, s in self._stats.items()
+        }
+        queued = {
+            host: {p.name.lower(): sum(1 for t in queue if t.priority == p) for p in Priority}
+            for host, queue in self._queues.items() if queue
+        }
+        return {"classes": classes, "queued": queued}
@@ -0,0 +1,236 @@
+"""
+Rate-limit budget shared between instances.
+
+Riot's application and method limits apply to the API key, not to one
+process, but every warm serverless instance runs its own RateLimiter. Under
+load several of them each spend "their" full budget and all get 429s. With
+RATE_LIMIT_STORE set, RateLimiter.acquire() also reserves each request in a
+shared sliding-window log, so every instance draws from one budget:
+
+    RATE_LIMIT_STORE=redis://host:6379/0          # any Redis-compatible server
+    RATE_LIMIT_STORE=sqlite:////tmp/budget.db     # processes on one machine
+
+A reservation is all-or-nothing across the scopes it names (the host's
+application limits and the endpoint's method limits): either a slot is
+recorded in every window of every scope, or none is and the wait until one
+frees up is returned. A 429's Retry-After pause is shared the same way.
+
+Limits themselves are still learnt from response headers by each instance
+and passed in with every reservation. Store failures are the caller's to
+handle; RateLimiter falls back to a conservative share of the limits.
+"""
+import asyncio
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from typing import List, Optional, Sequence, Tuple
+
+# (scope, [(count, seconds), ...]) — e.g. ("app:americas", [(20, 1), (100, 120)])
+Scope = Tuple[str, Sequence[Tuple[int, int]]]
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS budget_hits (scope TEXT NOT NULL, ts REAL NOT NULL);
+CREATE INDEX IF NOT EXISTS budget_hits_scope_ts ON budget_hits (scope, ts);
+CREATE TABLE IF NOT EXISTS budget_pauses (scope TEXT PRIMARY KEY, until REAL NOT NULL);
+"""
+
+
+class BudgetStore:
+    """Shared sliding-window request log. Times are wall-clock (time.time())."""
+
+    name = "none"
+
+    async def reserve(self, scopes: Sequence[Scope], now: Optional[float] = None) -> float:
+        """Record one request in every scope if all have room; else the seconds to wait."""
+        raise NotImplementedError
+
+    async def pause(self, scope: str, seconds: float, now: Optional[float] = None) -> None:
+        """Hold every reservation on scope for seconds (a 429's Retry-After)."""
+        raise NotImplementedError
+
+    def close(self) -> None:
+        pass
+
+
+class SQLiteBudgetStore(BudgetStore):
+    """
+    Local stand-in: one SQLite file shared by the processes on a machine
+    (e.g. several dev servers or benchmark workers). Transactions may block
+    on the file lock, so they run in a worker thread, off the event loop.
+    """
+
+    name = "sqlite"
+
+    def __init__(self, path: str):
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, timeout=1.0, check_same_thread=False, isolation_level=None)
+        self._conn.executescript(_SCHEMA)
+
+    async def reserve(self, scopes: Sequence[Scope], now: Optional[float] = None) -> float:
+        now = time.time() if now is None else now
+        return await asyncio.to_thread(self._reserve, scopes, now)
+
+    def _reserve(self, scopes: Sequence[Scope], now: float) -> float:
+        with self._lock:
+            # IMMEDIATE takes the write lock up front, so check + record is
+            # atomic across processes.
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                wait = 0.0
+                for scope, limits in scopes:
+                    row = self._conn.execute(
+                        "SELECT until FROM budget_pauses WHERE scope = ?", (scope,)
+                    ).fetchone()
+                    if row and row[0] > now:
+                        wait = max(wait, row[0] - now)
+                    for count, window in limits:
+                        # The count-th newest hit in the window; once it ages
+                        # out there is room again.
+                        row = self._conn.execute(
+                            "SELECT ts FROM budget_hits WHERE scope = ? AND ts > ?"
+                            " ORDER BY ts DESC LIMIT 1 OFFSET ?",
+                            (scope, now - window, count - 1),
+                        ).fetchone()
+                        if row:
+                            wait = max(wait, row[0] + window - now)
+                if wait <= 0:
+                    self._conn.executemany(
+                        "INSERT INTO budget_hits (scope, ts) VALUES (?, ?)",
+                        [(scope, now) for scope, _ in scopes],
+                    )
+                    for scope, limits in scopes:
+                        longest = max((window for _, window in limits), default=0)
+                        self._conn.execute(
+                            "DELETE FROM budget_hits WHERE scope = ? AND ts <= ?", (scope, now - longest),
+                        )
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+        return wait
+
+    async def pause(self, scope: str, seconds: float, now: Optional[float] = None) -> None:
+        until = (time.time() if now is None else now) + seconds
+        await asyncio.to_thread(self._pause, scope, until)
+
+    def _pause(self, scope: str, until: float) -> None:
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO budget_pauses (scope, until) VALUES (?, ?)"
+                " ON CONFLICT (scope) DO UPDATE SET until = MAX(until, excluded.until)",
+                (scope, until),
+            )
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+# KEYS: one sorted set per scope, then one pause key per scope.
+# ARGV: now, member, then per scope: number of windows, count, seconds, ...
+_RESERVE_LUA = """
+local now = tonumber(ARGV[1])
+local member = ARGV[2]
+local n = #KEYS / 2
+local pos = 3
+local wait = 0
+local longest = {}
+for i = 1, n do
+  local paused = tonumber(redis.call('GET', KEYS[n + i]) or '0')
+  if paused > now then wait = math.max(wait, paused - now) end
+  local windows = tonumber(ARGV[pos]); pos = pos + 1
+  longest[i] = 0
+  for _ = 1, windows do
+    local count = tonumber(ARGV[pos]); local window = tonumber(ARGV[pos + 1]); pos = pos + 2
+    longest[i] = math.max(longest[i], window)
+    local hit = redis.call('ZREVRANGEBYSCORE', KEYS[i], '+inf', '(' .. (now - window),
+                           'WITHSCORES', 'LIMIT', count - 1, 1)
+    if hit[2] then wait = math.max(wait, tonumber(hit[2]) + window - now) end
+  end
+end
+if wait <= 0 then
+  for i = 1, n do
+    redis.call('ZADD', KEYS[i], now, member)
+    redis.call('ZREMRANGEBYSCORE', KEYS[i], '-inf', now - longest[i])
+    redis.call('EXPIRE', KEYS[i], math.ceil(longest[i]) + 1)
+  end
+end
+return tostring(wait)
+"""
+
+# KEYS: the pause key. ARGV: until, expiry (s). Only ever extends a pause.
+_PAUSE_LUA = """
+local until_ = tonumber(ARGV[1])
+local current = tonumber(redis.call('GET', KEYS[1]) or '0')
+if until_ > current then
+  redis.call('SET', KEYS[1], ARGV[1], 'EX', ARGV[2])
+end
+return 0
+"""
+
+
+class RedisBudgetStore(BudgetStore):
+    """
+    Any Redis-compatible server (Redis, Valkey, Upstash, ...), one sorted
+    set per scope, checked and updated atomically by a Lua script. Needs the
+    optional redis package; without it every call fails and RateLimiter
+    stays on its local fallback.
+    """
+
+    name = "redis"
+
+    def __init__(self, url: str, prefix: str = "riot-budget:"):
+        self.url = url
+        self.prefix = prefix
+        self._redis = None
+        self._script = None
+        self._pause_script = None
+
+    def _client(self):
+        if self._redis is None:
+            import redis.asyncio as redis  # optional dependency
+
+            self._redis = redis.from_url(self.url, socket_timeout=1.0, socket_connect_timeout=1.0)
+            self._script = self._redis.register_script(_RESERVE_LUA)
+            self._pause_script = self._redis.register_script(_PAUSE_LUA)
+        return self._redis
+
+    async def reserve(self, scopes: Sequence[Scope], now: Optional[float] = None) -> float:
+        now = time.time() if now is None else now
+        self._client()
+        keys = [f"{self.prefix}{scope}" for scope, _ in scopes]
+        keys += [f"{self.prefix}pause:{scope}" for scope, _ in scopes]
+        args: List = [now, f"{now}:{uuid.uuid4().hex}"]
+        for _, limits in scopes:
+            args.append(len(limits))
+            for count, window in limits:
+                args += [count, window]
+        return float(await self._script(keys=keys, args=args))
+
+    async def pause(self, scope: str, seconds: float, now: Optional[float] = None) -> None:
+        until = (time.time() if now is None else now) + seconds
+        self._client()
+        await self._pause_script(keys=[f"{self.prefix}pause:{scope}"], args=[until, max(1, int(seconds) + 1)])
+
+    def close(self) -> None:
+        if self._redis is not None:
+            try:
+                asyncio.get_running_loop().create_task(self._redis.aclose())
+            except RuntimeError:
+                pass
+
+
+def budget_store_from_url(url: Optional[str]) -> Optional[BudgetStore]:
+    """RATE_LIMIT_STORE → a BudgetStore: redis://, rediss://, sqlite:///path; None/"" → None."""
+    if not url:
+        return None
+    if url.startswith(("redis://", "rediss://", "unix://")):
+        return RedisBudgetStore(url)
+    if url.startswith("sqlite:///"):
+        return SQLiteBudgetStore(url[len("sqlite:///"):] or ":memory:")
+    raise ValueError(f"Unsupported RATE_LIMIT_STORE: {url!r} (use redis://... or sqlite:///path)")
@@ -0,0 +1,122 @@
+"""
+Single-flight request coalescing.
+
+When several callers ask for the same key while a fetch for it is already in
+progress, they all await that one fetch instead of starting their own. The
+work runs as its own task, so a caller that gives up (cancellation, timeout)
+doesn't cancel it for everyone else; only once every caller has given up is
+the work itself cancelled. Keys are forgotten as soon as the fetch finishes
+— this is deduplication of in-flight work, not a cache.
+
+stream() does the same for async generators: one producer runs, and every
+subscriber (including late joiners) gets the full event sequence replayed
+from the start, then live events as they are produced.
+"""
+import asyncio
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, Hashable, List
+
+
+class _Feed:
+    """Buffered broadcast of one async generator's events to any number of readers."""
+
+    def __init__(self):
+        self.events: List[Any] = []
+        self.done = False
+        self.error: BaseException = None
+        self._changed = asyncio.Event()
+
+    def _wake(self) -> None:
+        self._changed.set()
+        self._changed = asyncio.Event()
+
+    async def pump(self, source: AsyncIterator[Any]) -> None:
+        try:
+            async for event in source:
+                self.events.append(event)
+                self._wake()
+        except BaseException as exc:
+            self.error = exc
+            if not isinstance(exc, Exception):
+                raise
+        finally:
+            self.done = True
+            self._wake()
+
+    async def subscribe(self) -> AsyncIterator[Any]:
+        i = 0
+        while True:
+            changed = self._changed
+            while i < len(self.events):
+                yield self.events[i]
+                i += 1
+            if self.done:
+                if self.error is not None:
+                    raise self.error
+                return
+            await changed.wait()
+
+
+class SingleFlight:
+    """Share one in-flight coroutine per key between concurrent callers."""
+
+    def __init__(self):
+        self._inflight: Dict[Hashable, asyncio.Task] = {}
+        self._waiters: Dict[asyncio.Task, int] = {}
+        self._feeds: Dict[Hashable, _Feed] = {}
+        self.leaders = 0
+        self.coalesced = 0
+
+    async def do(self, key: Hashable, factory: Callable[[], Awaitable[Any]]) -> Any:
+        task = self._inflight.get(key)
+        if task is None:
+            self.leaders += 1
+            task = asyncio.ensure_future(factory())
+            self._inflight[key] = task
+            task.add_done_callback(lambda t: self._done(key, t))
+        else:
+            self.coalesced += 1
+        self._waiters[task] = self._waiters.get(task, 0) + 1
+        try:
+            return await asyncio.shield(task)
+        except asyncio.CancelledError:
+            if self._waiters[task] == 1 and not task.done():
+                task.cancel()  # nobody is left waiting for it
+            raise
+        finally:
+            self._waiters[task] -= 1
+            if not self._waiters[task]:
+                del self._waiters[task]
+
+    def stream(self, key: Hashable, factory: Callable[[], AsyncIterator[Any]]) -> AsyncIterator[Any]:
+        """Subscribe to the in-flight stream for key, starting factory() if there is none."""
+        feed = self._feeds.get(key)
+        if feed is None:
+            self.leaders += 1
+            feed = self._feeds[key] = _Feed()
+            task = asyncio.ensure_future(feed.pump(factory()))
+            task.add_done_callback(lambda t: self._feed_done(key, feed, t))
+        else:
+            self.coalesced += 1
+        return feed.subscribe()
+
+    def _feed_done(self, key: Hashable, feed: _Feed, task: asyncio.Task) -> None:
+        if self._feeds.get(key) is feed:
+            del self._feeds[key]
+        if not task.cancelled():
+            task.exception()
+
+    def _done(self, key: Hashable, task: asyncio.Task) -> None:
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+        if not task.cancelled():
+            task.exception()  # mark retrieved even if every caller went away
+
+    def __contains__(self, key: Hashable) -> bool:
+        """Whether work for key is in flight, i.e. a new caller would join it."""
+        return key in self._inflight or key in self._feeds
+
+    def __len__(self) -> int:
+        return len(self._inflight) + len(self._feeds)
+
+    def stats(self) -> Dict[str, int]:
+        return {"in_flight": len(self), "leaders": self.leaders, "coalesced": self.coalesced}
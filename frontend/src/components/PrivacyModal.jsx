@@ -27,7 +27,7 @@ export default function PrivacyModal({ onClose }) {
           </button>
         </div>
 
-        <p className="text-[11px] text-zar-text-tertiary uppercase tracking-widest font-semibold">Last updated: April 22, 2026</p>
+        <p className="text-[11px] text-zar-text-tertiary uppercase tracking-widest font-semibold">Last updated: October 17, 2026</p>
 
         <div className="text-sm text-zar-text-secondary space-y-4">
           <section>
@@ -35,17 +35,20 @@ export default function PrivacyModal({ onClose }) {
             <p className="leading-relaxed">
               CleverPachonc collects only the Riot ID (summoner name and tag) and region
               you enter into the search field. This information is used exclusively to query
-              the Riot Games API on your behalf and is never stored, logged, or shared.
+              the Riot Games API on your behalf; the Riot ID you type is not stored, logged, or shared.
             </p>
           </section>
 
           <section>
-            <h3 className="font-bold text-white mb-1 text-xs uppercase tracking-widest">What we do not store</h3>
+            <h3 className="font-bold text-white mb-1 text-xs uppercase tracking-widest">What we cache</h3>
             <p className="leading-relaxed">
-              This application has no database. All summoner statistics are fetched
-              in real-time from the Riot Games API and exist only in your browser for
-              the duration of your session. We do not retain, sell, or share any
-              personal data.
+              To avoid downloading the same games twice, the server keeps a temporary
+              cache of public match data from the Riot Games API. Match details (which
+              list every participant&apos;s Riot ID) are kept for a limited number of games,
+              oldest-read first out. A searched player&apos;s account ID and match list are
+              deleted 24 hours after their last search, unless that summoner has been
+              added to background tracking, in which case they are kept until it is
+              removed. We do not sell or share any of this data.
             </p>
           </section>
 
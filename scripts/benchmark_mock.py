@@ -0,0 +1,81 @@
+"""
+Offline benchmark of get_summoner_data_async against the mock Riot server.
+
+Starts tests/mock_riot.py on a local port, points the Riot base URLs at it and
+times cold lookups (new players) and warm ones (the same players again, match
+details already in the store). Nothing leaves the machine.
+
+    python scripts/benchmark_mock.py --players 20 --median-ms 60 --error-rate 0.02
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+os.environ.setdefault("RIOT_API_KEY", "mock-key")
+os.environ.setdefault("MATCH_STORE_PATH", ":memory:")
+
+from backend.riot_api import get_summoner_data_async  # noqa: E402
+from backend.riot_client import get_client  # noqa: E402
+from backend.utils.constants import set_riot_api_base  # noqa: E402
+from tests.mock_riot import MockConfig, MockRiotServer, lognormal  # noqa: E402
+
+
+def _percentile(samples: list[float], pct: float) -> float:
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct))]
+
+
+def _run(names: list[str]) -> tuple[list[float], int]:
+    timings, failures = [], 0
+    for name in names:
+        started = time.perf_counter()
+        try:
+            get_client().run(get_summoner_data_async(name, "NA"))
+        except Exception as exc:
+            failures += 1
+            print(f"  {name}: {type(exc).__name__}: {exc}")
+        timings.append(time.perf_counter() - started)
+    return timings, failures
+
+
+def _report(label: str, timings: list[float], failures: int) -> None:
+    print(
+        f"{label:5} n={len(timings)} failures={failures}"
+        f" p50={statistics.median(timings) * 1000:.0f}ms"
+        f" p95={_percentile(timings, 0.95) * 1000:.0f}ms"
+        f" max={max(timings) * 1000:.0f}ms"
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--players", type=int, default=10)
+    parser.add_argument("--median-ms", type=float, default=50)
+    parser.add_argument("--sigma", type=float, default=0.5)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0)
+    parser.add_argument("--app-limits", default="500:10,30000:600")
+    args = parser.parse_args()
+
+    config = MockConfig(
+        latency=lognormal(args.median_ms, args.sigma),
+        error_rate=args.error_rate,
+        rate_limit_rate=args.rate_limit_rate,
+        app_limits=args.app_limits,
+    )
+    names = [f"Bench{i}#NA1" for i in range(args.players)]
+    with MockRiotServer(config) as server:
+        set_riot_api_base(server.base)
+        _report("cold", *_run(names))
+        _report("warm", *_run(names))
+        print("upstream requests:", dict(server.requests))
+        print("injected:", dict(server.injected), "rate limited:", dict(server.limited))
+        print("hedging:", get_client().hedger.stats())
+    get_client().close()
+
+
+if __name__ == "__main__":
+    main()
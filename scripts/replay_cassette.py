@@ -0,0 +1,91 @@
+"""
+Record a summoner lookup to a cassette, or time lookups replayed from one.
+
+Record against the live API (needs RIOT_API_KEY), or against the mock server
+with --mock:
+
+    python scripts/replay_cassette.py record lookup.jsonl "Name#TAG" --region EUW
+
+Replay it offline, at the recorded timings (--speed 1) or as fast as possible
+(--speed 0), to measure the fetch + analysis pipeline deterministically:
+
+    python scripts/replay_cassette.py replay lookup.jsonl "Name#TAG" --region EUW --runs 10 --speed 0
+
+Every run starts cold: a fresh RiotClient (rate limiter, concurrency and
+hedging state), empty caches and an in-memory match store.
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+os.environ.setdefault("MATCH_STORE_PATH", ":memory:")
+
+import backend.match_store as match_store  # noqa: E402
+import backend.riot_api as riot_api  # noqa: E402
+import backend.riot_client as riot_client  # noqa: E402
+from backend.match_store import MatchStore  # noqa: E402
+from backend.riot_api import get_summoner_data_async  # noqa: E402
+from backend.riot_client import RiotClient  # noqa: E402
+from backend.utils.cassette import RECORD, REPLAY, Cassette  # noqa: E402
+from backend.utils.constants import set_riot_api_base  # noqa: E402
+from backend.utils.ttl_cache import TTLCache  # noqa: E402
+
+
+def _cold_lookup(name: str, region: str, cassette: Cassette) -> float:
+    if riot_client._client is not None:
+        riot_client._client.close()
+    cassette.rewind()
+    client = riot_client._client = RiotClient(cassette=cassette)
+    for cache in ("_account_cache", "_summoner_cache", "_warm_cache", "_platform_cache", "_rank_cache"):
+        setattr(riot_api, cache, TTLCache(getattr(riot_api, cache).ttl))
+    match_store._store = MatchStore(":memory:")
+    started = time.perf_counter()
+    client.run(get_summoner_data_async(name, region))
+    return time.perf_counter() - started
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("mode", choices=(RECORD, REPLAY))
+    parser.add_argument("cassette")
+    parser.add_argument("name", help="Riot ID, Name#TAG")
+    parser.add_argument("--region", default="NA")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--speed", type=float, default=1.0)
+    parser.add_argument("--mock", action="store_true", help="record against tests/mock_riot.py")
+    args = parser.parse_args()
+
+    if args.mode == RECORD:
+        if os.path.exists(args.cassette):
+            os.remove(args.cassette)
+        cassette = Cassette(args.cassette, RECORD)
+        if args.mock:
+            from tests.mock_riot import MockConfig, MockRiotServer, lognormal
+
+            os.environ.setdefault("RIOT_API_KEY", "mock-key")
+            with MockRiotServer(MockConfig(latency=lognormal(50, 0.5))) as server:
+                set_riot_api_base(server.base)
+                elapsed = _cold_lookup(args.name, args.region, cassette)
+        else:
+            elapsed = _cold_lookup(args.name, args.region, cassette)
+        print(f"recorded {cassette.recorded} requests in {elapsed * 1000:.0f}ms to {args.cassette}")
+    else:
+        os.environ.setdefault("RIOT_API_KEY", "replay")
+        # Anything missing from the cassette fails instead of going out.
+        set_riot_api_base("http://127.0.0.1:9/{host}")
+        cassette = Cassette(args.cassette, REPLAY, args.speed)
+        timings = [_cold_lookup(args.name, args.region, cassette) for _ in range(args.runs)]
+        print(
+            f"replay speed={args.speed} n={len(timings)}"
+            f" p50={statistics.median(timings) * 1000:.1f}ms"
+            f" min={min(timings) * 1000:.1f}ms max={max(timings) * 1000:.1f}ms"
+        )
+        print("cassette:", cassette.stats())
+    riot_client._client.close()
+
+
+if __name__ == "__main__":
+    main()
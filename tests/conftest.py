@@ -3,7 +3,10 @@ Shared fixtures for CleverPachonc tests.
 
 All match/participant dicts use the minimal fields that the analysis
 functions actually access, so tests stay readable and self-contained.
+FakeSession stands in for the aiohttp session in tests of the fetch path.
 """
+import asyncio
+
 import pytest
 
 
@@ -69,6 +72,50 @@ def make_match(
     }
 
 
+class FakeResponse:
+    """aiohttp-style response: an async context manager with status, headers and json()."""
+
+    def __init__(self, payload=None, status=200, headers=None, delay=0.0):
+        self.status = status
+        self.headers = headers or {}
+        self.payload = payload
+        self.delay = delay
+
+    async def json(self):
+        if self.delay:
+            await asyncio.sleep(self.delay)
+        return self.payload
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+
+class FakeSession:
+    """
+    Stand-in for aiohttp.ClientSession. Every GET is answered with
+    respond(url, params), a payload or a FakeResponse, and the URLs and
+    params asked for are recorded.
+    """
+
+    def __init__(self, respond):
+        self.respond = respond
+        self.urls = []
+        self.params = []
+
+    @property
+    def calls(self) -> int:
+        return len(self.urls)
+
+    def get(self, url, params=None, **kwargs):
+        self.urls.append(url)
+        self.params.append(params)
+        answer = self.respond(url, params)
+        return answer if isinstance(answer, FakeResponse) else FakeResponse(answer)
+
+
 @pytest.fixture
 def puuid() -> str:
     return "test-puuid"
@@ -0,0 +1,414 @@
+"""
+Local stand-in for the Riot API, for offline end-to-end tests and benchmarks.
+
+MockRiotServer serves generated — but deterministic, given a seed — data for
+the endpoints the app uses:
+
+    account-v1         /riot/account/v1/accounts/by-riot-id/{gameName}/{tagLine}
+                       /riot/account/v1/region/by-game/lol/by-puuid/{puuid}
+    summoner-v4        /lol/summoner/v4/summoners/by-puuid/{puuid}
+    league-v4          /lol/league/v4/entries/by-puuid/{puuid}
+    champion-mastery   /lol/champion-mastery/v4/champion-masteries/by-puuid/{puuid}
+    match-v5           /lol/match/v5/matches/by-puuid/{puuid}/ids
+                       /lol/match/v5/matches/{matchId}
+                       /lol/match/v5/matches/{matchId}/timeline
+
+Every host (na1, americas, ...) is served from one port, with the host as
+the first path segment, so pointing the app at it is one call:
+
+    with MockRiotServer(MockConfig(latency=lognormal(40, 0.5))) as server:
+        set_riot_api_base(server.base)      # "http://127.0.0.1:<port>/{host}"
+        get_client().run(get_summoner_data_async("Someone#NA1", "NA"))
+
+Each response waits for a delay drawn from config.latency, and carries
+X-App-Rate-Limit / X-Method-Rate-Limit headers with live counts. Requests
+over those limits get a real 429 with Retry-After; on top of that,
+rate_limit_rate and error_rate inject random 429s and 5xx responses.
+Unknown Riot IDs listed in config.missing get a 404. Players listed in
+config.homes only exist on their home platform; everyone else is found on
+every platform. Players in the same config.premades group share their whole
+match history, as a duo or premade team would.
+"""
+import asyncio
+import hashlib
+import math
+import random
+import threading
+import time
+from collections import Counter, defaultdict, deque
+from dataclasses import dataclass, field
+from typing import Callable, Deque, Dict, List, Optional, Set, Tuple
+
+from aiohttp import web
+
+# ── Latency distributions (each returns a delay in seconds) ────────────────
+
+
+def fixed(ms: float) -> Callable[[random.Random], float]:
+    return lambda rng: ms / 1000
+
+
+def uniform(low_ms: float, high_ms: float) -> Callable[[random.Random], float]:
+    return lambda rng: rng.uniform(low_ms, high_ms) / 1000
+
+
+def lognormal(median_ms: float, sigma: float = 0.5) -> Callable[[random.Random], float]:
+    """Long-tailed, like real upstream latency: median_ms with a spread of sigma."""
+    mu = math.log(median_ms)
+    return lambda rng: rng.lognormvariate(mu, sigma) / 1000
+
+
+@dataclass
+class MockConfig:
+    latency: Callable[[random.Random], float] = fixed(0)
+    # Per-endpoint overrides, keyed by endpoint name from _route() (e.g. "match").
+    endpoint_latency: Dict[str, Callable[[random.Random], float]] = field(default_factory=dict)
+    app_limits: str = "500:10,30000:600"
+    method_limits: str = "2000:10"
+    rate_limit_rate: float = 0.0
+    retry_after: int = 1
+    error_rate: float = 0.0
+    error_statuses: Tuple[int, ...] = (500, 502, 503, 504)
+    # Endpoint names (see _route()) the random 429 / 5xx apply to; None = all.
+    fault_endpoints: Optional[Set[str]] = None
+    matches_per_player: int = 100
+    missing: Set[str] = field(default_factory=set)
+    # Riot ID → platform host ("euw1", ...) the player plays on.
+    homes: Dict[str, str] = field(default_factory=dict)
+    # Groups of Riot IDs that play together, sharing one match history.
+    premades: List[Set[str]] = field(default_factory=list)
+    seed: int = 0
+
+
+def _parse(limits: str) -> List[Tuple[int, int]]:
+    return [tuple(int(x) for x in part.split(":")) for part in limits.split(",") if part]
+
+
+def _digest(*parts) -> int:
+    return int(hashlib.sha1("|".join(map(str, parts)).encode()).hexdigest()[:12], 16)
+
+
+_CHAMPIONS = [
+    (222, "Jinx"), (51, "Caitlyn"), (99, "Lux"), (103, "Ahri"), (64, "LeeSin"),
+    (11, "MasterYi"), (86, "Garen"), (412, "Thresh"), (117, "Lulu"), (157, "Yasuo"),
+    (238, "Zed"), (81, "Ezreal"), (145, "Kaisa"), (89, "Leona"), (122, "Darius"),
+]
+_POSITIONS = ["TOP", "JUNGLE", "MIDDLE", "BOTTOM", "UTILITY"]
+_TIERS = ["IRON", "BRONZE", "SILVER", "GOLD", "PLATINUM", "EMERALD", "DIAMOND"]
+_RANKS = ["IV", "III", "II", "I"]
+
+
+class _Window:
+    """Sliding-window request counter for one limit."""
+
+    def __init__(self, count: int, seconds: int):
+        self.count = count
+        self.seconds = seconds
+        self.hits: Deque[float] = deque()
+
+    def used(self, now: float) -> int:
+        while self.hits and now - self.hits[0] >= self.seconds:
+            self.hits.popleft()
+        return len(self.hits)
+
+    def retry_after(self, now: float) -> int:
+        return max(1, int(self.seconds - (now - self.hits[0])) + 1) if self.hits else 1
+
+
+class MockRiotServer:
+    """aiohttp.web app on 127.0.0.1 serving generated Riot data, run in its own thread."""
+
+    def __init__(self, config: Optional[MockConfig] = None, port: int = 0):
+        self.config = config or MockConfig()
+        self.port = port
+        self.requests: Counter = Counter()
+        self.injected: Counter = Counter()   # random 429 / 5xx by status
+        self.limited: Counter = Counter()    # real 429s from exceeding the limits, by scope
+        self._rng = random.Random(self.config.seed)
+        self._owners: Dict[str, List[str]] = defaultdict(list)  # matchId → PUUIDs whose history listed it
+        self._ended: Dict[str, int] = {}  # matchId → gameEndTimestamp, from the history that listed it
+        self._played: Counter = Counter()  # PUUID → games added since start (see play())
+        self._app_windows: Dict[str, List[_Window]] = defaultdict(
+            lambda: [_Window(c, s) for c, s in _parse(self.config.app_limits)])
+        self._method_windows: Dict[Tuple[str, str], List[_Window]] = defaultdict(
+            lambda: [_Window(c, s) for c, s in _parse(self.config.method_limits)])
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+        self._runner: Optional[web.AppRunner] = None
+
+    # ── Lifecycle ───────────────────────────────────────────────────────
+
+    @property
+    def base(self) -> str:
+        """Template for constants.set_riot_api_base()."""
+        return f"http://127.0.0.1:{self.port}/{{host}}"
+
+    def start(self) -> "MockRiotServer":
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._loop.run_forever, name="mock-riot", daemon=True)
+        self._thread.start()
+        asyncio.run_coroutine_threadsafe(self._start(), self._loop).result(10)
+        return self
+
+    async def _start(self) -> None:
+        app = web.Application()
+        app.router.add_get("/{host}/{path:.*}", self._handle)
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, "127.0.0.1", self.port)
+        await site.start()
+        self.port = self._runner.addresses[0][1]
+
+    def stop(self) -> None:
+        if self._loop is None:
+            return
+        asyncio.run_coroutine_threadsafe(self._runner.cleanup(), self._loop).result(10)
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join(5)
+        self._loop.close()
+        self._loop = None
+
+    def __enter__(self) -> "MockRiotServer":
+        return self.start()
+
+    def __exit__(self, *exc) -> None:
+        self.stop()
+
+    # ── Request handling ────────────────────────────────────────────────
+
+    async def _handle(self, request: web.Request) -> web.Response:
+        host = request.match_info["host"]
+        path = "/" + request.match_info["path"]
+        name, handler, args = self._route(path)
+        if handler is None:
+            return web.json_response({"status": {"status_code": 404, "message": "Not found"}}, status=404)
+        self.requests[name] += 1
+
+        cfg = self.config
+        await asyncio.sleep(cfg.endpoint_latency.get(name, cfg.latency)(self._rng))
+
+        now = time.monotonic()
+        app_windows = self._app_windows[host]
+        method_windows = self._method_windows[(host, name)]
+        headers = {
+            "X-App-Rate-Limit": cfg.app_limits,
+            "X-Method-Rate-Limit": cfg.method_limits,
+        }
+        for scope, windows in (("application", app_windows), ("method", method_windows)):
+            full = next((w for w in windows if w.used(now) >= w.count), None)
+            if full is not None:
+                self.limited[scope] += 1
+                headers.update(self._counts(app_windows, method_windows, now))
+                headers.update({"Retry-After": str(full.retry_after(now)), "X-Rate-Limit-Type": scope})
+                return web.json_response({"status": {"status_code": 429}}, status=429, headers=headers)
+
+        for window in app_windows + method_windows:
+            window.hits.append(now)
+        headers.update(self._counts(app_windows, method_windows, now))
+
+        faulty = cfg.fault_endpoints is None or name in cfg.fault_endpoints
+        if faulty and self._rng.random() < cfg.rate_limit_rate:
+            self.injected["429"] += 1
+            headers.update({"Retry-After": str(cfg.retry_after), "X-Rate-Limit-Type": "method"})
+            return web.json_response({"status": {"status_code": 429}}, status=429, headers=headers)
+        if faulty and self._rng.random() < cfg.error_rate:
+            status = self._rng.choice(cfg.error_statuses)
+            self.injected[str(status)] += 1
+            return web.json_response({"status": {"status_code": status}}, status=status, headers=headers)
+
+        payload = handler(host, request.query, *args)
+        if payload is None:
+            return web.json_response({"status": {"status_code": 404}}, status=404, headers=headers)
+        return web.json_response(payload, headers=headers)
+
+    @staticmethod
+    def _counts(app_windows, method_windows, now) -> Dict[str, str]:
+        return {
+            "X-App-Rate-Limit-Count": ",".join(f"{w.used(now)}:{w.seconds}" for w in app_windows),
+            "X-Method-Rate-Limit-Count": ",".join(f"{w.used(now)}:{w.seconds}" for w in method_windows),
+        }
+
+    def _route(self, path: str):
+        parts = path.strip("/").split("/")
+        if parts[:5] == ["riot", "account", "v1", "accounts", "by-riot-id"] and len(parts) == 7:
+            return "account", self._account, parts[5:7]
+        if parts[:7] == ["riot", "account", "v1", "region", "by-game", "lol", "by-puuid"] and len(parts) == 8:
+            return "region", self._region, parts[7:8]
+        if parts[:5] == ["lol", "summoner", "v4", "summoners", "by-puuid"] and len(parts) == 6:
+            return "summoner", self._summoner, parts[5:6]
+        if parts[:5] == ["lol", "league", "v4", "entries", "by-puuid"] and len(parts) == 6:
+            return "league", self._league, parts[5:6]
+        if parts[:5] == ["lol", "champion-mastery", "v4", "champion-masteries", "by-puuid"] and len(parts) == 6:
+            return "mastery", self._mastery, parts[5:6]
+        if parts[:4] == ["lol", "match", "v5", "matches"]:
+            rest = parts[4:]
+            if len(rest) == 3 and rest[0] == "by-puuid" and rest[2] == "ids":
+                return "match_ids", self._match_ids, rest[1:2]
+            if len(rest) == 1:
+                return "match", self._match, rest
+            if len(rest) == 2 and rest[1] == "timeline":
+                return "timeline", self._timeline, rest[:1]
+        return None, None, ()
+
+    # ── Generated data ──────────────────────────────────────────────────
+
+    def play(self, riot_id: str, games: int = 1) -> None:
+        """Add games newer than any in riot_id's (or its premade group's) history."""
+        self._played[self._history_owner(self.puuid_for(*riot_id.split("#", 1)))] += games
+
+    def puuid_for(self, game_name: str, tag_line: str) -> str:
+        return f"mock-{_digest(self.config.seed, game_name.lower(), tag_line.lower()):012x}"
+
+    def _account(self, host, query, game_name, tag_line):
+        if f"{game_name}#{tag_line}".lower() in {m.lower() for m in self.config.missing}:
+            return None
+        return {"puuid": self.puuid_for(game_name, tag_line), "gameName": game_name, "tagLine": tag_line}
+
+    def _home(self, puuid: str) -> Optional[str]:
+        for riot_id, home in self.config.homes.items():
+            if self.puuid_for(*riot_id.split("#", 1)) == puuid:
+                return home
+        return None
+
+    def _region(self, host, query, puuid):
+        return {"puuid": puuid, "game": "lol", "region": self._home(puuid) or "na1"}
+
+    def _summoner(self, host, query, puuid):
+        if self._home(puuid) not in (None, host):
+            return None
+        rng = random.Random(_digest(self.config.seed, "summoner", puuid))
+        return {
+            "puuid": puuid,
+            "profileIconId": rng.randint(1, 5000),
+            "revisionDate": 1750000000000,
+            "summonerLevel": rng.randint(30, 900),
+        }
+
+    def _league(self, host, query, puuid):
+        rng = random.Random(_digest(self.config.seed, "league", puuid))
+        return [
+            {
+                "queueType": queue,
+                "tier": rng.choice(_TIERS),
+                "rank": rng.choice(_RANKS),
+                "leaguePoints": rng.randint(0, 99),
+                "wins": rng.randint(10, 300),
+                "losses": rng.randint(10, 300),
+                "puuid": puuid,
+            }
+            for queue in ("RANKED_SOLO_5x5", "RANKED_FLEX_SR")
+        ]
+
+    def _mastery(self, host, query, puuid):
+        rng = random.Random(_digest(self.config.seed, "mastery", puuid))
+        return sorted(
+            (
+                {
+                    "puuid": puuid,
+                    "championId": champ_id,
+                    "championLevel": rng.randint(1, 50),
+                    "championPoints": rng.randint(1000, 900000),
+                    "lastPlayTime": 1750000000000 - rng.randint(0, 10 ** 9),
+                }
+                for champ_id, _ in _CHAMPIONS
+            ),
+            key=lambda m: m["championPoints"],
+            reverse=True,
+        )
+
+    def _history_owner(self, puuid: str) -> str:
+        for group in self.config.premades:
+            members = sorted(self.puuid_for(*riot_id.split("#", 1)) for riot_id in group)
+            if puuid in members:
+                return members[0]  # the whole group shares one history
+        return puuid
+
+    def _history(self, puuid: str) -> List[Tuple[str, int]]:
+        """
+        The player's (matchId, gameEndTimestamp) list, newest first, one game
+        an hour back from 1750000000000; games added by play() come before.
+        """
+        puuid = self._history_owner(puuid)
+        base = _digest(self.config.seed, "history", puuid) % 10 ** 9
+        return [
+            (f"NA1_{base + n}", 1750000000000 - n * 3_600_000)
+            for n in range(-self._played[puuid], self.config.matches_per_player)
+        ]
+
+    def _match_ids(self, host, query, puuid):
+        start_time = int(query.get("startTime", 0)) * 1000
+        end_time = int(query.get("endTime", 0)) * 1000 or float("inf")
+        start = int(query.get("start", 0))
+        count = int(query.get("count", 20))
+        listed = [(mid, end) for mid, end in self._history(puuid) if start_time < end <= end_time]
+        ids = []
+        for mid, end in listed[start:start + count]:
+            ids.append(mid)
+            self._ended[mid] = end
+            if puuid not in self._owners[mid]:
+                self._owners[mid].append(puuid)
+        return ids
+
+    def _match(self, host, query, match_id):
+        rng = random.Random(_digest(self.config.seed, "match", match_id))
+        ended = self._ended.get(match_id, 1750000000000)
+        owner_slot = _digest(match_id) % 10
+        owners = self._owners.get(match_id, [])
+        duration = rng.randint(900, 2400)
+        participants = []
+        for slot in range(10):
+            champ_id, champ_name = rng.choice(_CHAMPIONS)
+            team_id = 100 if slot < 5 else 200
+            participants.append({
+                "puuid": owners[(slot - owner_slot) % 10] if (slot - owner_slot) % 10 < len(owners)
+                         else f"mock-{_digest(match_id, slot):012x}",
+                "riotIdGameName": f"Player{slot}",
+                "riotIdTagline": "MOCK",
+                "championId": champ_id,
+                "championName": champ_name,
+                "teamId": team_id,
+                "teamPosition": _POSITIONS[slot % 5],
+                "win": (team_id == 100) == (rng.random() < 0.5),
+                "kills": rng.randint(0, 15),
+                "deaths": rng.randint(0, 12),
+                "assists": rng.randint(0, 20),
+                "totalMinionsKilled": rng.randint(0, 300),
+                "neutralMinionsKilled": rng.randint(0, 150),
+                "goldEarned": rng.randint(5000, 20000),
+                "totalDamageDealtToChampions": rng.randint(3000, 50000),
+                "visionScore": rng.randint(5, 80),
+                **{f"item{i}": rng.choice([0, 3031, 3006, 6672, 3094, 3036, 3072]) for i in range(7)},
+                "perks": {"styles": []},
+            })
+        # Fix the winner per team
+        winner = 100 if rng.random() < 0.5 else 200
+        for p in participants:
+            p["win"] = p["teamId"] == winner
+        return {
+            "metadata": {"matchId": match_id, "participants": [p["puuid"] for p in participants]},
+            "info": {
+                "queueId": 420 if rng.random() < 0.8 else 440,
+                "gameDuration": duration,
+                "gameCreation": ended - duration * 1000,
+                "gameEndTimestamp": ended,
+                "participants": participants,
+            },
+        }
+
+    def _timeline(self, host, query, match_id):
+        match = self._match(host, query, match_id)
+        rng = random.Random(_digest(self.config.seed, "timeline", match_id))
+        frames = []
+        for minute in range(match["info"]["gameDuration"] // 60):
+            events = [
+                {
+                    "type": "WARD_PLACED",
+                    "timestamp": minute * 60000 + rng.randint(0, 59999),
+                    "creatorId": rng.randint(1, 10),
+                    "wardType": rng.choice(["YELLOW_TRINKET", "CONTROL_WARD", "SIGHT_WARD"]),
+                    "position": {"x": rng.randint(0, 14870), "y": rng.randint(0, 14980)},
+                }
+                for _ in range(rng.randint(0, 3))
+            ]
+            frames.append({"timestamp": minute * 60000, "events": events})
+        return {"metadata": match["metadata"], "info": {"frames": frames}}
@@ -0,0 +1,120 @@
+"""
+Tests for admission control: lookup cost estimates and up-front refusal.
+"""
+import asyncio
+
+import backend.match_store as match_store
+import backend.riot_api as riot_api
+from backend.match_store import MatchStore
+from backend.utils.admission import AdmissionControl
+from backend.utils.constants import MATCH_HISTORY_COUNT, REGION_ROUTING
+from backend.utils.rate_limiter import RateLimiter
+from backend.utils.scheduler import Priority, PriorityScheduler
+from backend.utils.ttl_cache import TTLCache
+
+HOST = "americas"
+METHOD = "/lol/match/v5/matches/{matchId}"
+PUUID = "test-puuid"
+
+
+def _fresh_caches(monkeypatch):
+    monkeypatch.setattr(match_store, "_store", MatchStore(":memory:"))
+    for cache in ("_account_cache", "_summoner_cache", "_warm_cache", "_platform_cache"):
+        monkeypatch.setattr(riot_api, cache, TTLCache(60))
+
+
+def test_admits_what_fits_and_refuses_with_retry_after():
+    limiter = RateLimiter(default_app_limits="10:1,100:120")
+    admission = AdmissionControl(PriorityScheduler(limiter), max_wait=2)
+    assert admission.admit({HOST: 20}) is None  # 1s of refill
+    limiter.on_rate_limited(HOST, METHOD, {"X-Rate-Limit-Type": "application", "Retry-After": "5"})
+    assert admission.admit({HOST: 1}) == 3  # paused 5s, may wait 2
+    assert admission.admit({"na1": 1}) is None  # other hosts are unaffected
+    assert admission.admit({}) is None
+    assert admission.stats() == {"max_wait": 2, "admitted": 3, "free": 1, "rejected": 1}
+
+
+def test_queued_requests_and_reserve_count_against_the_budget():
+    limiter = RateLimiter(default_app_limits="10:1")
+    scheduler = PriorityScheduler(limiter)
+    admission = AdmissionControl(scheduler, max_wait=0.5)
+    assert admission.admit({HOST: 12}) is None
+    assert admission.admit({HOST: 14}, Priority.PREFETCH) is not None
+
+    async def _run():
+        for _ in range(10):
+            await limiter.acquire(HOST, METHOD)
+        waiters = [asyncio.ensure_future(scheduler.acquire(HOST, METHOD)) for _ in range(4)]
+        await asyncio.sleep(0)
+        assert scheduler.queued(HOST) == 4
+        refused = admission.admit({HOST: 2})
+        for waiter in waiters:
+            waiter.cancel()
+        await asyncio.gather(*waiters, return_exceptions=True)
+        return refused
+
+    assert asyncio.run(_run()) == 1
+
+
+def test_cost_estimate_drops_as_caches_warm(monkeypatch):
+    _fresh_caches(monkeypatch)
+    cold = riot_api.estimate_lookup_cost("Player#NA1", "NA")
+    assert cold == {"americas": 2 + MATCH_HISTORY_COUNT, "na1": 3}
+
+    riot_api._account_cache.set(("player", "na1"), {"puuid": PUUID})
+    riot_api._summoner_cache.set((REGION_ROUTING["NA"], PUUID), {"puuid": PUUID})
+    match_ids = [f"NA1_{i}" for i in range(MATCH_HISTORY_COUNT)]
+    store = match_store.get_match_store()
+    store.put_history(PUUID, "americas", match_ids, 1750000000000)
+    for mid in match_ids[2:]:
+        store.put(mid, "americas", {"metadata": {"matchId": mid}})
+    # Match IDs are re-listed, then only the two unstored details fetched.
+    assert riot_api.estimate_lookup_cost("Player#NA1", "NA") == {"americas": 3, "na1": 2}
+
+    riot_api._warm_cache.set(("ranked", REGION_ROUTING["NA"], PUUID), [])
+    riot_api._warm_cache.set(("mastery", REGION_ROUTING["NA"], PUUID), [])
+    riot_api._warm_cache.set(("match_ids", "americas", PUUID), match_ids[2:])
+    assert riot_api.estimate_lookup_cost("", "NA", puuid=PUUID) == {}
+
+
+def test_cost_estimate_for_auto_region(monkeypatch):
+    _fresh_caches(monkeypatch)
+    # Platform unknown: only the account and active-shard calls are known.
+    assert riot_api.estimate_lookup_cost("Player#EUW", "AUTO") == {"americas": 2}
+    riot_api._account_cache.set(("player", "euw"), {"puuid": PUUID})
+    riot_api._platform_cache.set(PUUID, "EUW")
+    assert riot_api.estimate_lookup_cost("Player#EUW", "AUTO") == {
+        "euw1": 3, "europe": 1 + MATCH_HISTORY_COUNT,
+    }
+
+
+def test_missing_cost_counts_only_retryable_matches(monkeypatch):
+    _fresh_caches(monkeypatch)
+    match_ids = [f"NA1_{i}" for i in range(5)]
+    store = match_store.get_match_store()
+    store.put_history(PUUID, "americas", match_ids, 1750000000000)
+    store.put("NA1_0", "americas", {"metadata": {"matchId": "NA1_0"}})
+    costs = riot_api.estimate_missing_cost(PUUID, "NA", ["mastery"], ["NA1_0", "NA1_1", "NA1_1", "EUW1_9"])
+    assert costs == {"na1": 1, "americas": 1}
+
+
+def test_page_cost_counts_unstored_details_of_known_ids(monkeypatch):
+    _fresh_caches(monkeypatch)
+    # Nothing known: the listing plus a full page of details.
+    assert riot_api.estimate_page_cost(PUUID, "NA", count=10) == {"americas": 11}
+
+    store = match_store.get_match_store()
+    page_ids = [f"NA1_{i}" for i in range(20)]
+    store.put_pages(PUUID, "americas", page_ids, 1750000000)
+    for mid in page_ids[:15]:
+        store.put(mid, "americas", {"metadata": {"matchId": mid}})
+    cursor = riot_api._encode_cursor(10, 1750000000)
+    assert riot_api.estimate_page_cost(PUUID, "NA", cursor, count=10) == {"americas": 6}
+    # A page past what has been paged in: every detail counts.
+    cursor = riot_api._encode_cursor(20, 1750000000)
+    assert riot_api.estimate_page_cost(PUUID, "NA", cursor, count=10) == {"americas": 11}
+    # A first page reuses the stored stats history.
+    store.put_history(PUUID, "americas", page_ids[:5], 1750000000000)
+    assert riot_api.estimate_page_cost(PUUID, "NA", count=10) == {"americas": 6}
+
+    assert riot_api.estimate_page_cost(PUUID, "AUTO") == {"americas": 1}
@@ -0,0 +1,82 @@
+"""
+Incremental aggregators must give the same answer as the batch analyzers,
+whatever order the matches arrive in.
+"""
+import asyncio
+
+import backend.match_store as match_store
+from backend.match_store import MatchStore
+from backend.analysis.champion_stats import ChampionStatsAggregator, analyze_champion_stats
+from backend.analysis.match_analysis import MatchHistoryAggregator, analyze_match_history
+from backend.riot_api import _QueueStatsAggregator, _compute_streak, stream_match_details
+from .conftest import FakeResponse, FakeSession, make_match, make_participant
+
+
+def _history(puuid):
+    results = [True, True, False, True, False]
+    roles = ["BOTTOM", "MIDDLE", "BOTTOM", "MIDDLE", "TOP"]
+    champs = ["Jinx", "Lux", "Jinx", "Caitlyn", "Lux"]
+    return [
+        make_match(participants=[make_participant(
+            puuid=puuid, win=w, team_position=r, champion_name=c, kills=i,
+        )])
+        for i, (w, r, c) in enumerate(zip(results, roles, champs))
+    ]
+
+
+def _feed_reversed(aggregator, matches):
+    for index in reversed(range(len(matches))):
+        aggregator.add(matches[index], index)
+    return aggregator.result()
+
+
+def test_match_history_out_of_order_matches_batch(puuid):
+    matches = _history(puuid)
+    assert _feed_reversed(MatchHistoryAggregator(puuid), matches) == analyze_match_history(matches, puuid)
+
+
+def test_champion_stats_out_of_order_matches_batch(puuid):
+    matches = _history(puuid)
+    assert _feed_reversed(ChampionStatsAggregator(puuid), matches) == analyze_champion_stats(matches, puuid)
+
+
+def test_queue_filter_skips_other_queues(puuid):
+    matches = _history(puuid)
+    matches[0]["info"]["queueId"] = 450
+    for m in matches[1:]:
+        m["info"]["queueId"] = 420
+    result = _feed_reversed(MatchHistoryAggregator(puuid, {420}), matches)
+    assert result["total_games"] == 4
+
+
+def test_gaps_from_failed_downloads_still_fold_in_order(puuid):
+    matches = _history(puuid)
+    aggregator = _QueueStatsAggregator(puuid)
+    for index in (4, 2, 0, 1):  # index 3 never arrives
+        aggregator.add(matches[index], index)
+    assert aggregator.result()["streak"] == 2
+    assert aggregator.result()["recentGames"] == 4
+
+
+def test_compute_streak_current_run(puuid):
+    assert _compute_streak(_history(puuid), puuid) == 2
+
+
+def _delayed_match(url, params):
+    match_id = url.rsplit("/", 1)[1]
+    delay = {"NA1_1": 0.03, "NA1_2": 0.0, "NA1_3": 0.01}[match_id]
+    return FakeResponse({"metadata": {"matchId": match_id}, "info": {}}, delay=delay)
+
+
+def test_stream_yields_in_completion_order(monkeypatch):
+    monkeypatch.setattr(match_store, "_store", MatchStore(":memory:"))
+
+    session = FakeSession(_delayed_match)
+
+    async def _run():
+        return [
+            (index, m.match_id)
+            async for index, m in stream_match_details(session, "americas", ["NA1_1", "NA1_2", "NA1_3"], {})
+        ]
+
+    assert asyncio.run(_run()) == [(1, "NA1_2"), (2, "NA1_3"), (0, "NA1_1")]
@@ -8,6 +8,8 @@ stats, ranked-only analytics, and the fields the frontend depends on
 import pytest
 
 import api.index as api_index
+import backend.match_store as match_store
+from backend.match_store import MatchStore
 from tests.conftest import make_match, make_participant
 
 PUUID = "test-puuid"
@@ -31,6 +33,8 @@ def _full_match(queue_id=420, win=True, champion="Jinx", champion_id=222, end_ts
 
 @pytest.fixture
 def client(monkeypatch):
+    # Admission's cost estimate and the tracked check read the match store.
+    monkeypatch.setattr(match_store, "_store", MatchStore(":memory:"))
     summoner = {
         "puuid": PUUID,
         "gameName": "TestPlayer",
@@ -57,8 +61,8 @@ def client(monkeypatch):
         _full_match(queue_id=450, win=True, champion="Sona", champion_id=37),  # ARAM — excluded
     ]
 
-    async def fake_fetch(name, region):
-        return summoner, ranked, mastery, matches
+    async def fake_fetch(name, region, **kwargs):
+        return summoner, ranked, mastery, matches, {}
 
     monkeypatch.setattr(api_index, "get_summoner_data_async", fake_fetch)
     monkeypatch.setattr(api_index, "get_latest_version", lambda: "16.14.1")
@@ -104,3 +108,236 @@ def test_summoner_requires_riot_id_format(client):
 def test_summoner_requires_name(client):
     res = client.get("/api/summoner?region=NA")
     assert res.status_code == 400
+
+
+def _stream_fake(summoner, ranked, mastery, matches):
+    async def fake_stream(name, region, deadline=None, puuid=None):
+        yield "summoner", summoner
+        yield "ranked", ranked
+        yield "mastery", mastery
+        for index in reversed(range(len(matches))):
+            yield "match", (index, matches[index])
+        yield "ranked", ranked
+        yield "matches", matches
+    return fake_stream
+
+
+def test_summoner_stream_sections(client, monkeypatch):
+    import json
+
+    summoner = {"puuid": PUUID, "gameName": "TestPlayer", "tagLine": "NA1"}
+    matches = [_full_match(queue_id=420), _full_match(queue_id=450, champion="Sona", champion_id=37)]
+    monkeypatch.setattr(
+        api_index, "stream_summoner_data_async", _stream_fake(summoner, [], [], matches),
+    )
+
+    res = client.get("/api/summoner/stream?name=TestPlayer%23NA1&region=NA")
+    assert res.status_code == 200
+    assert res.mimetype == "application/x-ndjson"
+    lines = [json.loads(line) for line in res.get_data(as_text=True).splitlines()]
+    sections = [line["section"] for line in lines]
+
+    assert sections[0] == "profile"
+    assert lines[0]["data"]["summoner"]["puuid"] == PUUID
+    # Only the ranked game is streamed as a match row
+    assert sections.count("match") == 1
+    assert sections[-1] == "done"
+    stats = next(line["data"] for line in lines if line["section"] == "champion_stats")
+    assert set(stats) == {"Jinx"}
+
+
+def test_summoner_stream_lookup_error_keeps_status(client, monkeypatch):
+    async def fake_stream(name, region, deadline=None, puuid=None):
+        raise api_index.NotFoundError("Riot ID not found")
+        yield
+
+    monkeypatch.setattr(api_index, "stream_summoner_data_async", fake_stream)
+    res = client.get("/api/summoner/stream?name=Ghost%23NA1&region=NA")
+    assert res.status_code == 404
+
+
+def test_summoner_response_carries_status(client):
+    data = client.get("/api/summoner?name=TestPlayer%23NA1&region=NA").get_json()
+    assert "status" in data
+
+
+def test_missing_refetches_only_requested_sections(client, monkeypatch):
+    calls = []
+    matches = [_full_match(queue_id=420), _full_match(queue_id=440, champion="Lux", champion_id=99)]
+
+    async def fake_missing(puuid, region, sections, match_ids, deadline=None):
+        calls.append((puuid, region, sections, match_ids))
+        mastery = [{"championId": 99, "championLevel": 5, "championPoints": 5000}]
+        status = {"complete": True, "sections": {"mastery": "ok"}, "failed_sections": [], "missing_matches": []}
+        return {"mastery": mastery, "matches": matches}, status
+
+    monkeypatch.setattr(api_index, "fetch_missing_async", fake_missing)
+    res = client.get(f"/api/summoner/missing?puuid={PUUID}&region=NA&sections=mastery&matches=NA1_1")
+    assert res.status_code == 200
+    data = res.get_json()
+    assert calls == [(PUUID, "NA", ["mastery"], ["NA1_1"])]
+    assert data["status"]["complete"]
+    assert data["mastery"][0]["championName"] == "Lux"
+    assert "ranked" not in data
+    assert len(data["matches"]) == 2
+    assert set(data["champion_stats"]) == {"Jinx", "Lux"}
+
+
+def test_missing_rejects_unknown_sections(client):
+    res = client.get(f"/api/summoner/missing?puuid={PUUID}&sections=profile")
+    assert res.status_code == 400
+
+
+def test_missing_caps_match_ids(client):
+    too_many = ",".join(f"NA1_{i}" for i in range(api_index.MATCH_HISTORY_COUNT + 1))
+    res = client.get(f"/api/summoner/missing?puuid={PUUID}&matches={too_many}")
+    assert res.status_code == 400
+
+
+def test_batch_returns_each_player_and_dedup_stats(client, monkeypatch):
+    from backend.analysis.records import MatchRecord
+    from backend.utils.exceptions import NotFoundError
+
+    matches = [MatchRecord(_full_match(queue_id=420)), MatchRecord(_full_match(queue_id=440, win=False))]
+
+    async def fake_batch(names, region, analyzers=None, deadline=None):
+        aggregators = analyzers(PUUID)
+        for index, match in enumerate(matches):
+            for aggregator in aggregators:
+                aggregator.add(match, index)
+        player = {
+            "name": names[0], "summoner": {"puuid": PUUID, "gameName": "TestPlayer"},
+            "ranked": [], "mastery": [], "matches": matches, "status": {"complete": True},
+        }
+        missing = {"name": names[1], "error": NotFoundError("Summoner not found.")}
+        return [player, missing], {"listed_matches": 4, "unique_matches": 2}
+
+    monkeypatch.setattr(api_index, "get_summoners_data_async", fake_batch)
+    res = client.post("/api/summoner/batch", json={"names": ["TestPlayer#NA1", "Ghost#NA1"], "region": "NA"})
+    assert res.status_code == 200
+    data = res.get_json()
+    player, ghost = data["players"]
+    assert player["summoner"]["puuid"] == PUUID
+    assert len(player["matches"]) == 2
+    assert set(player["champion_stats"]) == {"Jinx"}
+    assert (ghost["name"], ghost["code"]) == ("Ghost#NA1", 404)
+    assert data["dedup"] == {"listed_matches": 4, "unique_matches": 2, "shared": 2}
+
+
+def test_batch_validates_names(client):
+    assert client.post("/api/summoner/batch", json={}).status_code == 400
+    assert client.post("/api/summoner/batch", json={"names": ["NoTag"]}).status_code == 400
+    too_many = [f"P{i}#NA1" for i in range(api_index.MAX_BATCH_SUMMONERS + 1)]
+    assert client.post("/api/summoner/batch", json={"names": too_many}).status_code == 400
+
+
+def test_ranks_formats_badges_and_reports_pending(client, monkeypatch):
+    calls = []
+
+    async def fake_ranks(puuids, region, deadline=None):
+        calls.append((puuids, region))
+        solo = {"queueType": "RANKED_SOLO_5x5", "tier": "GOLD", "rank": "II", "leaguePoints": 42}
+        flex = {"queueType": "RANKED_FLEX_SR", "tier": "SILVER", "rank": "I", "leaguePoints": 10}
+        return {"a": [flex, solo], "b": [flex], "c": []}, ["d"]
+
+    monkeypatch.setattr(api_index, "get_ranks_async", fake_ranks)
+    res = client.post("/api/ranks", json={"puuids": ["a", "b", "c", "d"], "region": "EUW"})
+    assert res.status_code == 200
+    data = res.get_json()
+    assert calls == [(["a", "b", "c", "d"], "EUW")]
+    assert data["ranks"]["a"]["tier"] == "GOLD"
+    assert data["ranks"]["b"]["queueType"] == "RANKED_FLEX_SR"
+    assert data["ranks"]["c"] is None
+    assert (data["pending"], data["complete"]) == (["d"], False)
+
+
+def test_ranks_validates_puuids(client):
+    assert client.post("/api/ranks", json={"puuids": "a"}).status_code == 400
+    too_many = [f"p{i}" for i in range(api_index.MAX_RANK_PUUIDS + 1)]
+    assert client.post("/api/ranks", json={"puuids": too_many}).status_code == 400
+
+
+def test_summoner_by_puuid_for_scoreboard_click(client, monkeypatch):
+    from backend.utils.scheduler import Priority, current_priority
+
+    calls = []
+
+    async def fake_fetch(name, region, **kwargs):
+        calls.append((name, kwargs["puuid"], current_priority()))
+        return {"puuid": PUUID, "summonerLevel": 30}, [], [], [], {}
+
+    monkeypatch.setattr(api_index, "get_summoner_data_async", fake_fetch)
+    res = client.get(f"/api/summoner?puuid={PUUID}&name=Clicked%23EUW&region=NA&prefetch=1")
+    assert res.status_code == 200
+    profile = res.get_json()["summoner"]
+    assert (profile["gameName"], profile["tagLine"], profile["puuid"]) == ("Clicked", "EUW", PUUID)
+    assert calls == [("Clicked#EUW", PUUID, Priority.PREFETCH)]
+
+    client.get(f"/api/summoner?puuid={PUUID}")
+    assert calls[-1] == ("", PUUID, Priority.INTERACTIVE)
+
+
+def test_lookups_over_budget_are_shed_with_retry_after(client, monkeypatch):
+    from backend.utils.scheduler import Priority
+
+    asked = []
+
+    async def fake_admit(lookups, priority=Priority.INTERACTIVE):
+        asked.append((list(lookups), priority))
+        return 7
+
+    async def fail_fetch(*args, **kwargs):
+        raise AssertionError("lookup should not start")
+
+    monkeypatch.setattr(api_index, "admit_lookups", fake_admit)
+    monkeypatch.setattr(api_index, "get_summoner_data_async", fail_fetch)
+    monkeypatch.setattr(api_index, "get_summoners_data_async", fail_fetch)
+    monkeypatch.setattr(api_index, "stream_summoner_data_async", fail_fetch)
+
+    res = client.get("/api/summoner?name=TestPlayer%23NA1&region=NA&prefetch=1")
+    assert res.status_code == 503
+    assert res.headers["Retry-After"] == "7"
+    assert res.get_json()["retry_after"] == 7
+    assert asked[-1] == ([("TestPlayer#NA1", "NA", None)], Priority.PREFETCH)
+
+    assert client.get("/api/summoner/stream?name=TestPlayer%23NA1").status_code == 503
+    res = client.post("/api/summoner/batch", json={"names": ["A#NA1", "B#NA1"], "region": "NA"})
+    assert res.status_code == 503
+    assert asked[-1][0] == [("A#NA1", "NA", None), ("B#NA1", "NA", None)]
+
+    async def fake_admit_missing(puuid, region, sections, match_ids, priority=None):
+        return 4
+
+    monkeypatch.setattr(api_index, "admit_missing", fake_admit_missing)
+    monkeypatch.setattr(api_index, "fetch_missing_async", fail_fetch)
+    res = client.get(f"/api/summoner/missing?puuid={PUUID}&sections=mastery")
+    assert res.status_code == 503
+    assert res.headers["Retry-After"] == "4"
+
+    async def fake_admit_match_page(puuid, region, cursor, count, priority=None):
+        return 9
+
+    monkeypatch.setattr(api_index, "admit_match_page", fake_admit_match_page)
+    monkeypatch.setattr(api_index, "fetch_match_page_async", fail_fetch)
+    res = client.get(f"/api/matches?puuid={PUUID}&region=NA")
+    assert res.status_code == 503
+    assert res.headers["Retry-After"] == "9"
+
+
+def test_tracking_needs_the_admin_token(client, monkeypatch):
+    async def fail_resolve(*args, **kwargs):
+        raise AssertionError("an unauthorised request should not reach Riot")
+
+    monkeypatch.setattr(api_index, "resolve_summoner", fail_resolve)
+    body = {"name": "TestPlayer#NA1", "region": "NA"}
+    monkeypatch.setattr(api_index, "ADMIN_TOKEN", None)
+    assert client.post("/api/tracked", json=body, headers={"Authorization": "Bearer x"}).status_code == 403
+
+    monkeypatch.setattr(api_index, "ADMIN_TOKEN", "secret")
+    assert client.post("/api/tracked", json=body).status_code == 403
+    assert client.post("/api/tracked", json=body, headers={"Authorization": "Bearer wrong"}).status_code == 403
+    match_store.get_match_store().track(PUUID, "TestPlayer#NA1", "NA")
+    assert client.delete(f"/api/tracked/{PUUID}").status_code == 403
+    assert match_store.get_match_store().is_tracked(PUUID)
+    res = client.delete(f"/api/tracked/{PUUID}", headers={"Authorization": "Bearer secret"})
+    assert res.status_code == 204
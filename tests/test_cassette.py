@@ -0,0 +1,58 @@
+"""
+Tests for the record / replay cassette.
+"""
+import asyncio
+import time
+
+import pytest
+
+from backend.utils.cassette import Cassette
+from backend.utils.constants import riot_url
+from backend.utils.exceptions import NetworkError
+
+URL = riot_url("na1") + "/lol/league/v4/entries/by-puuid/p1"
+
+
+def _recorded(tmp_path, *answers):
+    path = str(tmp_path / "riot.jsonl")
+    recorder = Cassette(path, "record")
+    for status, body, elapsed in answers:
+        headers = {"X-App-Rate-Limit": "20:1", "Authorization": "secret"}
+        recorder.record(URL, {"count": 20}, status, headers, body, elapsed)
+    return path
+
+
+def test_replays_in_recorded_order_then_repeats_last(tmp_path):
+    path = _recorded(tmp_path, (500, None, 0.0), (200, [{"tier": "GOLD"}], 0.0))
+    cassette = Cassette(path, "replay", speed=0)
+    answers = [asyncio.run(cassette.replay(URL, {"count": "20"})) for _ in range(3)]
+    assert [status for status, _, _ in answers] == [500, 200, 200]
+    status, headers, body = answers[1]
+    assert body == [{"tier": "GOLD"}]
+    assert headers["x-app-rate-limit"] == "20:1"
+    assert "Authorization" not in headers
+    assert cassette.stats()["replayed"] == 3
+    cassette.rewind()
+    assert asyncio.run(cassette.replay(URL, {"count": 20}))[0] == 500
+
+
+def test_replay_at_recorded_speed(tmp_path):
+    path = _recorded(tmp_path, (200, [], 0.2))
+    started = time.monotonic()
+    asyncio.run(Cassette(path, "replay", speed=1).replay(URL, {"count": 20}))
+    assert time.monotonic() - started >= 0.2
+    started = time.monotonic()
+    asyncio.run(Cassette(path, "replay", speed=0).replay(URL, {"count": 20}))
+    assert time.monotonic() - started < 0.1
+
+
+def test_unrecorded_request_is_a_miss(tmp_path):
+    cassette = Cassette(_recorded(tmp_path, (200, [], 0.0)), "replay", speed=0)
+    with pytest.raises(NetworkError):
+        asyncio.run(cassette.replay(URL, {"count": 5}))
+    assert cassette.stats()["misses"] == 1
+
+
+def test_rejects_unknown_mode(tmp_path):
+    with pytest.raises(ValueError):
+        Cassette(str(tmp_path / "x.jsonl"), "rewind")
@@ -0,0 +1,79 @@
+"""
+Tests for the per-host circuit breakers.
+"""
+import aiohttp
+import pytest
+
+from backend.utils.circuit_breaker import CLOSED, HALF_OPEN, OPEN, CircuitBreaker, CircuitBreakers
+from backend.utils.exceptions import NetworkError
+
+
+def _breaker(**kwargs):
+    settings = {"error_rate": 0.5, "min_requests": 4, "window": 30, "open_seconds": 10, "trials": 2}
+    settings.update(kwargs)
+    return CircuitBreaker(**settings)
+
+
+def _expire(breaker):
+    breaker._open_until = 0.0
+
+
+def test_opens_at_error_rate_after_min_requests():
+    breaker = _breaker()
+    for ok in (True, False, False):
+        breaker.record(ok)
+    assert breaker.state == CLOSED  # only 3 requests so far
+    breaker.record(True)
+    assert breaker.state == OPEN  # 2/4 failed
+    assert not breaker.allow()
+    assert breaker.stats()["rejected"] == 1
+
+
+def test_neutral_outcomes_do_not_count():
+    breaker = _breaker()
+    for _ in range(10):
+        breaker.record(None)
+    assert breaker.stats()["requests"] == 0
+    assert breaker.state == CLOSED
+
+
+def test_half_open_trials_close_on_success():
+    breaker = _breaker()
+    for _ in range(4):
+        breaker.record(False)
+    _expire(breaker)
+    assert breaker.allow() and breaker.state == HALF_OPEN
+    assert breaker.allow()
+    assert not breaker.allow()  # both trial slots taken
+    breaker.record(True, trial=True)
+    breaker.record(True, trial=True)
+    assert breaker.state == CLOSED
+
+
+def test_failed_trial_reopens_for_longer():
+    breaker = _breaker()
+    for _ in range(4):
+        breaker.record(False)
+    _expire(breaker)
+    assert breaker.allow()
+    breaker.record(False, trial=True)
+    assert breaker.state == OPEN
+    assert breaker._reopen_delay == 20
+    assert breaker.stats()["opened"] == 2
+
+
+def test_call_fails_fast_while_open():
+    breakers = CircuitBreakers(error_rate=0.5, min_requests=2, window=30, open_seconds=10, trials=1)
+    for _ in range(2):
+        with pytest.raises(aiohttp.ClientError):
+            with breakers.call("europe"):
+                raise aiohttp.ClientConnectionError("refused")
+    with pytest.raises(NetworkError, match="circuit open"):
+        with breakers.call("europe"):
+            pytest.fail("should not run")
+    # Other hosts are unaffected
+    with breakers.call("americas") as call:
+        call.success()
+    stats = breakers.stats()
+    assert stats["europe"]["state"] == OPEN
+    assert stats["americas"]["state"] == CLOSED
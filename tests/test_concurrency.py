@@ -0,0 +1,127 @@
+"""
+Tests for the per-host AIMD concurrency limits.
+"""
+import asyncio
+
+import aiohttp
+import pytest
+
+from backend.utils.concurrency import AdaptiveConcurrency, AdaptiveLimit
+
+
+def _fill(limit: AdaptiveLimit, n: int) -> None:
+    limit.in_flight = n
+
+
+def test_grows_while_healthy_and_utilised():
+    limit = AdaptiveLimit(initial=4, max_limit=10)
+    for _ in range(20):
+        _fill(limit, 4)
+        limit.release(0.05)
+    assert 6 < limit.limit <= 10
+    assert limit.decreases == 0
+
+
+def test_idle_host_does_not_grow():
+    limit = AdaptiveLimit(initial=4)
+    for _ in range(20):
+        _fill(limit, 1)
+        limit.release(0.05)
+    assert limit.limit == 4
+
+
+def test_drop_halves_once_per_round_trip():
+    limit = AdaptiveLimit(initial=8)
+    _fill(limit, 3)
+    limit.release(0.5)
+    limit.release(dropped=True)
+    limit.release(dropped=True)  # same burst: ignored
+    assert limit.limit == pytest.approx(4, abs=0.2)
+    assert limit.decreases == 1
+
+
+def test_rising_latency_backs_off():
+    limit = AdaptiveLimit(initial=8)
+    _fill(limit, 1)
+    limit.release(0.0001)
+    limit._last_decrease = -1e9
+    for _ in range(10):
+        _fill(limit, 8)
+        limit.release(0.5)
+        limit._last_decrease = -1e9
+    assert limit.limit < 8
+    assert limit.decreases > 0
+
+
+def test_never_below_floor():
+    limit = AdaptiveLimit(initial=2)
+    for _ in range(10):
+        _fill(limit, 1)
+        limit._last_decrease = -1e9
+        limit.release(dropped=True)
+    assert limit.limit == 1
+    assert limit.capacity == 1
+
+
+def test_slot_caps_in_flight_per_host():
+    concurrency = AdaptiveConcurrency(initial=2, max_limit=2)
+    peak = {"americas": 0, "na1": 0}
+    running = {"americas": 0, "na1": 0}
+
+    async def _call(host):
+        async with concurrency.slot(host):
+            running[host] += 1
+            peak[host] = max(peak[host], running[host])
+            await asyncio.sleep(0.01)
+            running[host] -= 1
+
+    async def _run():
+        await asyncio.gather(*[_call(h) for h in ("americas", "na1") for _ in range(6)])
+
+    asyncio.run(_run())
+    assert peak == {"americas": 2, "na1": 2}
+    stats = concurrency.stats()
+    assert set(stats) == {"americas", "na1"}
+    assert stats["americas"]["in_flight"] == 0
+    assert stats["americas"]["queued"] == 0
+
+
+def test_slot_records_outcomes():
+    concurrency = AdaptiveConcurrency(initial=8)
+
+    async def _run():
+        async with concurrency.slot("americas") as slot:
+            slot.overloaded()
+        with pytest.raises(aiohttp.ClientError):
+            async with concurrency.slot("europe"):
+                raise aiohttp.ClientError("boom")
+        with pytest.raises(KeyError):
+            async with concurrency.slot("asia"):
+                raise KeyError("not load related")
+
+    asyncio.run(_run())
+    stats = concurrency.stats()
+    assert stats["americas"]["limit"] == 4
+    assert stats["europe"]["limit"] == 4
+    assert stats["asia"]["limit"] == 8
+
+
+def test_cancelled_waiter_frees_its_place():
+    concurrency = AdaptiveConcurrency(initial=1)
+
+    async def _run():
+        async def _hold():
+            async with concurrency.slot("americas"):
+                await asyncio.sleep(0.02)
+
+        holder = asyncio.ensure_future(_hold())
+        await asyncio.sleep(0)
+        waiter = asyncio.ensure_future(_hold())
+        await asyncio.sleep(0)
+        waiter.cancel()
+        await holder
+        async with concurrency.slot("americas"):
+            pass
+
+    asyncio.run(_run())
+    assert concurrency.stats()["americas"]["in_flight"] == 0
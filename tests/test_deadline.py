@@ -0,0 +1,47 @@
+"""
+Tests for per-request deadlines.
+"""
+import asyncio
+
+import pytest
+
+from backend.utils.deadline import Deadline, current_deadline, request_deadline, within
+from backend.utils.exceptions import DeadlineExceeded, NetworkError
+
+
+def test_deadline_propagates_to_tasks_and_nests_to_the_sooner():
+    async def _read():
+        return current_deadline()
+
+    async def _run():
+        with request_deadline(5) as outer:
+            inner = await asyncio.ensure_future(_read())
+            with request_deadline(60) as looser:
+                kept = current_deadline()
+            with request_deadline(1) as tighter:
+                pass
+        return outer, inner, looser, kept, tighter, current_deadline()
+
+    outer, inner, looser, kept, tighter, after = asyncio.run(_run())
+    assert inner is outer
+    assert looser is outer and kept is outer
+    assert tighter is not outer and tighter.expires < outer.expires
+    assert after is None
+
+
+def test_check_leaves_room_for_an_attempt():
+    assert Deadline(5).allows(1)
+    assert not Deadline(1).allows(0.8)
+    with pytest.raises(DeadlineExceeded):
+        Deadline(0.1).check()
+    # Callers that handle NetworkError also see deadline failures
+    assert issubclass(DeadlineExceeded, NetworkError)
+
+
+def test_within_gives_up_at_the_deadline():
+    async def _run():
+        with pytest.raises(DeadlineExceeded):
+            await within(asyncio.sleep(5), Deadline(0.05))
+        return await within(asyncio.sleep(0, "ok"), None)
+
+    assert asyncio.run(_run()) == "ok"
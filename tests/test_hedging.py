@@ -0,0 +1,80 @@
+"""
+Tests for hedged match-v5 requests.
+"""
+import asyncio
+
+import pytest
+
+from backend.utils.hedging import Hedger
+from backend.utils.rate_limiter import RateLimiter
+
+HOST = "americas"
+METHOD = "/lol/match/v5/matches/{matchId}"
+
+
+def _hedger(limits="100:1", **kwargs):
+    settings = {"percentile": 0.9, "min_samples": 5, "budget_reserve": 2}
+    settings.update(kwargs)
+    hedger = Hedger(RateLimiter(default_app_limits=limits), **settings)
+    for _ in range(10):
+        hedger.record(HOST, METHOD, 0.01)
+    return hedger
+
+
+def _sender(delays):
+    """send() whose n-th call takes delays[n] seconds and returns n."""
+    calls = []
+
+    async def send():
+        n = len(calls)
+        calls.append(n)
+        await asyncio.sleep(delays[n])
+        return n
+
+    return send, calls
+
+
+def test_no_hedge_without_enough_samples():
+    hedger = Hedger(RateLimiter(), percentile=0.9, min_samples=5)
+    send, calls = _sender([0.05])
+    assert asyncio.run(hedger.run(HOST, METHOD, send)) == 0
+    assert calls == [0]
+    assert hedger.stats()["hedged"] == 0
+
+
+def test_slow_primary_is_hedged_and_hedge_wins():
+    hedger = _hedger()
+    send, calls = _sender([1.0, 0.01])
+    assert asyncio.run(hedger.run(HOST, METHOD, send)) == 1
+    stats = hedger.stats()
+    assert (stats["hedged"], stats["hedge_wins"], stats["win_rate"]) == (1, 1, 1.0)
+
+
+def test_fast_primary_is_not_hedged():
+    hedger = _hedger()
+    send, calls = _sender([0.0])
+    assert asyncio.run(hedger.run(HOST, METHOD, send)) == 0
+    assert calls == [0]
+
+
+def test_low_budget_skips_the_hedge():
+    hedger = _hedger(limits="2:10")
+    send, calls = _sender([0.05, 0.0])
+    assert asyncio.run(hedger.run(HOST, METHOD, send)) == 0
+    assert calls == [0]
+    assert hedger.stats()["skipped_budget"] == 1
+
+
+def test_both_failing_raises_primary_error():
+    hedger = _hedger()
+    calls = []
+
+    async def send():
+        n = len(calls) + 1
+        calls.append(n)
+        await asyncio.sleep(0.05 if n == 1 else 0)
+        raise ValueError(f"attempt {n}")
+
+    with pytest.raises(ValueError, match="attempt 1"):
+        asyncio.run(hedger.run(HOST, METHOD, send))
+    assert len(calls) == 2
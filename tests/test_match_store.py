@@ -0,0 +1,163 @@
+"""
+Tests for the persistent match-detail store and its use inside _get.
+"""
+import asyncio
+import sqlite3
+import time
+
+import pytest
+
+import backend.match_store as match_store
+from backend.match_store import MatchStore
+from backend.riot_api import _get, _match_id_from_url, _sync_match_ids
+from tests.conftest import FakeSession
+
+MATCH_URL = "https://americas.api.riotgames.com/lol/match/v5/matches/NA1_123"
+
+
+@pytest.fixture
+def store(monkeypatch):
+    s = MatchStore(":memory:", max_entries=3)
+    monkeypatch.setattr(match_store, "_store", s)
+    return s
+
+
+def test_put_get_roundtrip(store):
+    payload = {"metadata": {"matchId": "NA1_1"}, "info": {"gameDuration": 1800}}
+    store.put("NA1_1", "americas", payload)
+    assert store.get("NA1_1") == payload
+    assert "NA1_1" in store
+    assert len(store) == 1
+
+
+def test_hit_miss_counters(store):
+    store.put("NA1_1", "americas", {"a": 1})
+    store.get("NA1_1")
+    store.get("NA1_2")
+    stats = store.stats()
+    assert stats["hits"] == 1
+    assert stats["misses"] == 1
+    assert stats["hit_rate"] == 0.5
+
+
+def test_eviction_drops_least_recently_read(store):
+    for i in range(3):
+        store.put(f"NA1_{i}", "americas", {"i": i})
+    store.get("NA1_0")  # refresh NA1_0 so NA1_1 becomes the oldest
+    store.put("NA1_3", "americas", {"i": 3})
+    assert len(store) == 3
+    assert "NA1_1" not in store
+    assert "NA1_0" in store
+    assert store.stats()["evictions"] == 1
+
+
+def test_duplicate_put_does_not_grow(store):
+    store.put("NA1_1", "americas", {"a": 1})
+    store.put("NA1_1", "americas", {"a": 1})
+    assert len(store) == 1
+
+
+def test_locked_store_misses_without_blocking_the_loop(tmp_path):
+    path = str(tmp_path / "matches.db")
+    locked = MatchStore(path, timeout=0.2)
+    locked.put("NA1_1", "americas", {"a": 1})
+    other = sqlite3.connect(path, isolation_level=None)
+    other.execute("BEGIN EXCLUSIVE")
+
+    async def run():
+        ticks = 0
+
+        async def tick():
+            nonlocal ticks
+            while True:
+                await asyncio.sleep(0.01)
+                ticks += 1
+
+        ticker = asyncio.create_task(tick())
+        got = await locked.get_async("NA1_1")
+        await locked.put_async("NA1_2", "americas", {"b": 2})
+        ticker.cancel()
+        return got, ticks
+
+    try:
+        got, ticks = asyncio.run(run())
+    finally:
+        other.execute("ROLLBACK")
+        other.close()
+    assert got is None
+    assert ticks >= 10  # the loop kept running through both 0.2s lock waits
+    assert "NA1_2" not in locked
+
+
+def test_match_id_from_url():
+    assert _match_id_from_url(MATCH_URL) == "NA1_123"
+    assert _match_id_from_url(MATCH_URL + "/timeline") is None
+    assert _match_id_from_url(
+        "https://americas.api.riotgames.com/lol/match/v5/matches/by-puuid/x/ids"
+    ) is None
+
+
+def test_get_serves_repeat_match_from_store(store):
+    payload = {"metadata": {"matchId": "NA1_123"}, "info": {}}
+    session = FakeSession(lambda url, params: payload)
+
+    async def _run():
+        first = await _get(session, MATCH_URL, {})
+        second = await _get(session, MATCH_URL, {})
+        return first, second
+
+    first, second = asyncio.run(_run())
+    assert first == second == payload
+    assert session.calls == 1
+    assert store.stats()["hits"] == 1
+
+
+def _recording_session(*payloads):
+    """Answers every GET with the next queued payload."""
+    queued = list(payloads)
+    return FakeSession(lambda url, params: queued.pop(0))
+
+
+def test_history_roundtrip(store):
+    store.put_history("p1", "americas", ["NA1_2", "NA1_1"], 1750000000000)
+    history = store.get_history("p1")
+    assert history["match_ids"] == ["NA1_2", "NA1_1"]
+    assert history["newest_match_id"] == "NA1_2"
+    assert history["newest_ts"] == 1750000000000
+    assert store.get_history("unknown") is None
+
+
+def test_pages_roundtrip(store):
+    store.put_pages("p1", "americas", ["NA1_9", "NA1_8"], 1750000000)
+    pages = store.get_pages("p1")
+    assert (pages["match_ids"], pages["end_time"]) == (["NA1_9", "NA1_8"], 1750000000)
+    assert store.get_pages("unknown") is None
+
+
+def test_untracked_history_expires_but_tracked_is_kept(store, monkeypatch):
+    store.put_history("p1", "americas", ["NA1_2"], 1750000000000)
+    store.put_pages("p1", "americas", ["NA1_1"], 1750000000)
+    store.put_history("p2", "americas", ["NA1_4"], 1750000000000)
+    store.track("p2", "Kept#NA1", "americas")
+    later = time.time() + store.history_ttl + 1
+    monkeypatch.setattr(match_store.time, "time", lambda: later)
+
+    assert store.get_history("p1") is None
+    assert store.get_pages("p1") is None
+    assert store.get_history("p2")["match_ids"] == ["NA1_4"]
+
+
+def test_sync_match_ids_only_asks_for_new_games(store):
+    store.put_history("p1", "americas", ["NA1_2", "NA1_1"], 1750000000000)
+    session = _recording_session(["NA1_4", "NA1_3"])
+
+    ids = asyncio.run(_sync_match_ids(session, "americas", "p1", {}))
+    assert ids == ["NA1_4", "NA1_3", "NA1_2", "NA1_1"]
+    assert session.params[0]["startTime"] == 1750000000
+
+
+def test_sync_match_ids_first_time_lists_full_history(store):
+    session = _recording_session(["NA1_2", "NA1_1"])
+    ids = asyncio.run(_sync_match_ids(session, "americas", "p1", {}))
+    assert ids == ["NA1_2", "NA1_1"]
+    assert "startTime" not in session.params[0]
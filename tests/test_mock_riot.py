@@ -0,0 +1,394 @@
+"""
+End-to-end tests of the real async fetch path against the local mock Riot
+server (tests/mock_riot.py) — no network needed.
+"""
+import asyncio
+import time
+
+import pytest
+
+import backend.match_store as match_store
+import backend.riot_api as riot_api
+import backend.utils.constants as constants
+from backend.match_store import MatchStore
+from backend.riot_client import get_client
+from backend.utils.exceptions import NotFoundError
+from backend.utils.hedging import Hedger
+from backend.utils.ttl_cache import TTLCache
+from tests.mock_riot import MockConfig, MockRiotServer, fixed, uniform
+
+
+@pytest.fixture
+def mock_riot(monkeypatch):
+    """Start a mock server with the given config and point the app at it."""
+    servers = []
+    original_base = constants.RIOT_API_BASE
+
+    def _start(config=None):
+        server = MockRiotServer(config).start()
+        servers.append(server)
+        constants.set_riot_api_base(server.base)
+        return server
+
+    monkeypatch.setenv("RIOT_API_KEY", "mock-key")
+    monkeypatch.setattr(match_store, "_store", MatchStore(":memory:"))
+    monkeypatch.setattr(riot_api, "_account_cache", TTLCache(60))
+    monkeypatch.setattr(riot_api, "_summoner_cache", TTLCache(60))
+    monkeypatch.setattr(riot_api, "_warm_cache", TTLCache(60))
+    monkeypatch.setattr(riot_api, "_platform_cache", TTLCache(60))
+    monkeypatch.setattr(riot_api, "_rank_cache", TTLCache(60))
+    monkeypatch.setattr(riot_api, "RETRY_BACKOFF", 0.01)
+    # Hedges would make upstream request counts nondeterministic; the
+    # hedging test turns it back on.
+    monkeypatch.setattr(get_client(), "hedger", Hedger(get_client().limiter, percentile=0))
+    yield _start
+    constants.set_riot_api_base(original_base)
+    for server in servers:
+        server.stop()
+
+
+def _lookup(name="Mock#NA1", region="NA"):
+    return get_client().run(riot_api.get_summoner_data_async(name, region))
+
+
+def test_full_lookup_end_to_end(mock_riot):
+    server = mock_riot(MockConfig(latency=uniform(1, 5)))
+    summoner, ranked, mastery, matches, status = _lookup()
+
+    assert summoner["puuid"] == server.puuid_for("Mock", "NA1")
+    assert summoner["gameName"] == "Mock"
+    assert {q["queueType"] for q in ranked} == {"RANKED_SOLO_5x5", "RANKED_FLEX_SR"}
+    assert all("streak" in q for q in ranked)
+    assert mastery
+    assert len(matches) == constants.MATCH_HISTORY_COUNT
+    assert all(
+        m.participant(summoner["puuid"]) is not None for m in matches
+    )
+    assert server.requests["match"] == constants.MATCH_HISTORY_COUNT
+    assert status["complete"]
+    assert set(status["sections"].values()) == {"ok"}
+
+
+def test_repeat_lookup_only_syncs_new_games(mock_riot):
+    server = mock_riot()
+    _lookup()
+    _lookup()
+    # Second pass: match details come from the MatchStore
+    assert server.requests["match"] == constants.MATCH_HISTORY_COUNT
+    assert server.requests["match_ids"] == 2
+
+
+def test_second_sync_lists_only_newer_games(mock_riot, monkeypatch):
+    server = mock_riot()
+    _, _, _, matches, _ = _lookup()
+    assert [m.ended for m in matches] == sorted((m.ended for m in matches), reverse=True)
+
+    listed = []
+    match_ids = server._match_ids
+
+    def _spy(host, query, puuid):
+        ids = match_ids(host, query, puuid)
+        listed.append((dict(query), ids))
+        return ids
+
+    monkeypatch.setattr(server, "_match_ids", _spy)
+    server.play("Mock#NA1", 2)
+    _, _, _, matches, _ = _lookup()
+    [(query, ids)] = listed
+    assert int(query["startTime"]) * 1000 == 1750000000000
+    assert ids == [m.match_id for m in matches[:2]]
+    assert server.requests["match"] == constants.MATCH_HISTORY_COUNT + 2
+
+
+def test_injected_errors_are_retried(mock_riot):
+    server = mock_riot(MockConfig(
+        error_rate=0.2, rate_limit_rate=0.2, retry_after=0, fault_endpoints={"match"}, seed=7,
+    ))
+    _, _, _, matches, _ = _lookup()
+    assert server.injected["429"] > 0
+    assert sum(n for status, n in server.injected.items() if status != "429") > 0
+    # RETRY_ATTEMPTS=3 rides out most injected failures; a few may still drop
+    assert len(matches) >= constants.MATCH_HISTORY_COUNT - 3
+
+
+def test_unknown_riot_id_is_not_found(mock_riot):
+    mock_riot(MockConfig(missing={"Ghost#NA1"}))
+    with pytest.raises(NotFoundError):
+        _lookup("Ghost#NA1")
+
+
+def test_timeline_route_against_mock(mock_riot):
+    import api.index as api_index
+
+    server = mock_riot()
+    res = api_index.app.test_client().get(
+        "/api/match/timeline?id=NA1_1&region=NA&puuid=nobody"
+    )
+    assert res.status_code == 200
+    assert res.get_json()["ward_events"]
+    assert server.requests["timeline"] == 1
+
+
+def test_breaker_fails_fast_when_host_is_down(mock_riot, monkeypatch):
+    from backend.utils.circuit_breaker import OPEN, CircuitBreakers
+
+    breakers = CircuitBreakers(error_rate=0.5, min_requests=5, window=30, open_seconds=60, trials=1)
+    monkeypatch.setattr(get_client(), "breakers", breakers)
+    server = mock_riot(MockConfig(error_rate=1.0, fault_endpoints={"match"}))
+
+    _, _, _, matches, _ = _lookup()
+    assert matches == []
+    assert breakers.stats()["americas"]["state"] == OPEN
+    # Without the breaker every match would be tried RETRY_ATTEMPTS times
+    assert server.requests["match"] < constants.MATCH_HISTORY_COUNT * constants.RETRY_ATTEMPTS
+
+
+def test_deadline_returns_partial_lookup(mock_riot):
+    # Match details take 1.5s each; a 0.8s budget still gets everything else.
+    mock_riot(MockConfig(latency=fixed(1), endpoint_latency={"match": fixed(1500)}))
+    started = time.monotonic()
+    summoner, ranked, mastery, matches, status = get_client().run(
+        riot_api.get_summoner_data_async("Mock#NA1", "NA", deadline=0.8)
+    )
+    assert time.monotonic() - started < 1.4
+    assert summoner["gameName"] == "Mock"
+    assert ranked and mastery
+    assert matches == []
+    assert status["failed_sections"] == []
+    assert status["sections"]["matches"] == "partial"
+    assert len(status["missing_matches"]) == constants.MATCH_HISTORY_COUNT
+
+
+def test_failed_sections_are_reported_and_refetched(mock_riot, monkeypatch):
+    from backend.utils.circuit_breaker import CircuitBreakers
+
+    monkeypatch.setattr(get_client(), "breakers", CircuitBreakers(min_requests=1000))
+    server = mock_riot(MockConfig(error_rate=1.0, fault_endpoints={"mastery", "match"}))
+    summoner, ranked, mastery, matches, status = _lookup()
+    assert ranked and mastery == [] and matches == []
+    assert not status["complete"]
+    assert status["sections"]["mastery"] == "failed"
+    assert status["failed_sections"] == ["mastery"]
+    assert len(status["missing_matches"]) == constants.MATCH_HISTORY_COUNT
+
+    server.config.error_rate = 0.0
+    before = dict(server.requests)
+    data, retry_status = get_client().run(riot_api.fetch_missing_async(
+        summoner["puuid"], "NA", status["failed_sections"], status["missing_matches"][:5],
+    ))
+    assert retry_status["complete"]
+    assert data["mastery"]
+    # Only the requested pieces went upstream: no account / summoner / league
+    assert server.requests["mastery"] == before["mastery"] + 1
+    assert server.requests["league"] == before["league"]
+    assert server.requests["match"] == before["match"] + 5
+    assert [m.match_id for m in data["matches"]] == status["missing_matches"][:5]
+
+    # IDs outside the player's history, or already stored, don't go upstream
+    # and never end up in the history.
+    before = dict(server.requests)
+    data, _ = get_client().run(riot_api.fetch_missing_async(
+        summoner["puuid"], "NA", (), ["NA1_999999", status["missing_matches"][0]],
+    ))
+    assert server.requests["match"] == before["match"]
+    assert "NA1_999999" not in match_store.get_match_store().get_history(summoner["puuid"])["match_ids"]
+
+
+def test_auto_region_uses_active_shard_and_caches_it(mock_riot):
+    server = mock_riot(MockConfig(homes={"Euro#EUW": "euw1"}))
+    summoner, _, _, matches, _ = _lookup("Euro#EUW", "AUTO")
+    assert summoner["region"] == "EUW1"
+    assert matches
+    assert server.requests["region"] == 1
+    assert server.requests["summoner"] == 1
+
+    _lookup("Euro#EUW", "AUTO")
+    assert server.requests["region"] == 1
+    assert server.requests["account"] == 1
+
+
+def test_tracking_with_auto_region_stores_the_platform(mock_riot, monkeypatch):
+    import api.index as api_index
+
+    class _Worker:
+        def ensure_started(self):
+            pass
+
+    monkeypatch.setattr(api_index, "get_refresh_worker", lambda: _Worker())
+    monkeypatch.setattr(api_index, "ADMIN_TOKEN", "secret")
+    mock_riot(MockConfig(homes={"Euro#EUW": "euw1"}))
+    res = api_index.app.test_client().post(
+        "/api/tracked", json={"name": "Euro#EUW", "region": "auto"}, headers={"Authorization": "Bearer secret"},
+    )
+    assert res.status_code == 201
+    assert res.get_json()["region"] == "EUW1"
+    assert [t["region"] for t in match_store.get_match_store().tracked()] == ["EUW1"]
+
+
+def test_auto_region_races_platforms_without_shard(mock_riot):
+    server = mock_riot(MockConfig(
+        homes={"Korean#KR1": "kr"}, error_rate=1.0, fault_endpoints={"region"},
+    ))
+    summoner, *_ = _lookup("Korean#KR1", "AUTO")
+    assert summoner["region"] == "KR"
+    assert server.requests["summoner"] > 1  # raced across platforms
+    assert riot_api._platform_cache.get(summoner["puuid"]) == "KR"
+
+
+def test_batch_lookup_fetches_shared_matches_once(mock_riot):
+    server = mock_riot(MockConfig(premades=[{"Duo#NA1", "Mate#NA1"}], missing={"Ghost#NA1"}))
+    players, totals = get_client().run(riot_api.get_summoners_data_async(
+        ["Duo#NA1", "Mate#NA1", "Solo#NA1", "Ghost#NA1"], "NA",
+    ))
+    duo, mate, solo, ghost = players
+    assert isinstance(ghost["error"], NotFoundError)
+    count = constants.MATCH_HISTORY_COUNT
+    assert totals == {"listed_matches": 3 * count, "unique_matches": 2 * count}
+    assert server.requests["match"] == 2 * count
+    assert [m.match_id for m in duo["matches"]] == [m.match_id for m in mate["matches"]]
+    for player in (duo, mate, solo):
+        assert player["status"]["complete"]
+        assert len(player["matches"]) == count
+        puuid = player["summoner"]["puuid"]
+        assert all(m.participant(puuid) is not None for m in player["matches"])
+        assert all("streak" in q for q in player["ranked"])
+
+
+def test_batch_lookup_isolates_a_cancelled_player(mock_riot, monkeypatch):
+    mock_riot()
+    resolve_account = riot_api._resolve_account
+
+    async def _cancel_gone(game_name, *args):
+        if game_name == "Gone":
+            raise asyncio.CancelledError
+        return await resolve_account(game_name, *args)
+
+    monkeypatch.setattr(riot_api, "_resolve_account", _cancel_gone)
+    (here, gone), _ = get_client().run(riot_api.get_summoners_data_async(["Here#NA1", "Gone#NA1"], "NA"))
+    assert isinstance(gone["error"], asyncio.CancelledError)
+    assert here["status"]["complete"]
+
+
+def test_scoreboard_ranks_are_budgeted_and_cached(mock_riot):
+    server = mock_riot()
+    puuids = ["mock-a", "mock-b", "mock-a", "mock-c", "mock-b"]
+    ranks, pending = get_client().run(riot_api.get_ranks_async(puuids, "NA", budget=2))
+    assert list(ranks) == ["mock-a", "mock-b"] and pending == ["mock-c"]
+    assert server.requests["league"] == 2
+
+    ranks, pending = get_client().run(riot_api.get_ranks_async(puuids, "NA", budget=2))
+    assert set(ranks) == {"mock-a", "mock-b", "mock-c"} and pending == []
+    assert server.requests["league"] == 3  # only the pending one went upstream
+
+
+def test_scoreboard_ranks_with_auto_region(mock_riot):
+    import api.index as api_index
+
+    server = mock_riot(MockConfig(homes={"Euro#EUW": "euw1"}))
+    puuid = server.puuid_for("Euro", "EUW")
+    client = api_index.app.test_client()
+    res = client.post("/api/ranks", json={"puuids": [puuid, "mock-b"], "region": "AUTO"})
+    assert res.status_code == 200
+    assert res.get_json()["complete"]
+    assert server.requests["region"] == 1
+    assert riot_api._rank_cache.peek((constants.REGION_ROUTING["EUW1"], puuid)) is not None
+
+    # Once the platform is known, AUTO costs no extra lookup.
+    client.post("/api/ranks", json={"puuids": ["mock-c", puuid], "region": "AUTO"})
+    assert server.requests["region"] == 1
+    assert server.requests["league"] == 3
+
+
+def test_puuid_lookup_skips_account_v1(mock_riot):
+    server = mock_riot()
+    puuid = server.puuid_for("Clicked", "NA1")
+    summoner, ranked, mastery, matches, status = get_client().run(
+        riot_api.get_summoner_data_async("", "NA", puuid=puuid)
+    )
+    assert summoner["puuid"] == puuid
+    assert "gameName" not in summoner
+    assert ranked and mastery and status["complete"]
+    assert all(m.participant(puuid) is not None for m in matches)
+    assert server.requests["account"] == 0
+    assert server.requests["summoner"] == 1
+
+
+def test_match_pages_fill_store_and_analyse_loaded_window(mock_riot):
+    import api.index as api_index
+
+    server = mock_riot(MockConfig(matches_per_player=45))
+    puuid = server.puuid_for("Deep", "NA1")
+    _lookup("Deep#NA1")  # owns the generated matches in the mock
+    client = api_index.app.test_client()
+    before = server.requests["match"]
+
+    seen, cursor = [], None
+    for _ in range(3):
+        query = f"/api/matches?puuid={puuid}&region=NA" + (f"&cursor={cursor}" if cursor else "")
+        data = client.get(query).get_json()
+        seen += [m["matchId"] for m in data["matches"]]
+        cursor = data["next_cursor"]
+    assert cursor is None
+    assert len(seen) == len(set(seen)) == 45 and data["loaded"] == 45
+    # The first page overlaps the stats page's 20 games, already stored
+    assert server.requests["match"] == before + 45 - constants.MATCH_HISTORY_COUNT
+
+    requests_before = dict(server.requests)
+    window = client.get(f"/api/matches/analysis?puuid={puuid}&start=20&stop=40").get_json()
+    assert window["window"]["matches"] == 20
+    assert window["champion_stats"]
+    assert dict(server.requests) == requests_before
+
+    assert client.get(f"/api/matches?puuid={puuid}&cursor=not-a-cursor").status_code == 400
+
+
+def test_cassette_records_then_replays_offline(mock_riot, monkeypatch, tmp_path):
+    from backend.utils.cassette import Cassette
+
+    path = str(tmp_path / "lookup.jsonl")
+    server = mock_riot(MockConfig(latency=fixed(5)))
+    monkeypatch.setattr(get_client(), "cassette", Cassette(path, "record"))
+    recorded = _lookup()
+    upstream = sum(server.requests.values())
+    assert get_client().cassette.stats()["recorded"] == upstream
+
+    # Fresh caches and store, Riot pointed nowhere: only the cassette answers.
+    server.stop()
+    constants.set_riot_api_base("http://127.0.0.1:9/{host}")
+    for name in ("_account_cache", "_summoner_cache", "_platform_cache"):
+        monkeypatch.setattr(riot_api, name, TTLCache(60))
+    monkeypatch.setattr(match_store, "_store", MatchStore(":memory:"))
+    monkeypatch.setattr(get_client(), "cassette", Cassette(path, "replay", speed=0))
+    replayed = _lookup()
+    assert replayed[0] == recorded[0]
+    assert [m.match_id for m in replayed[3]] == [m.match_id for m in recorded[3]]
+    assert replayed[4]["complete"]
+    assert get_client().cassette.stats()["replayed"] == upstream
+
+
+def test_request_timeout_fails_only_its_section(mock_riot, monkeypatch):
+    from backend.utils.circuit_breaker import CircuitBreakers
+
+    monkeypatch.setattr(get_client(), "breakers", CircuitBreakers(min_requests=1000))
+    monkeypatch.setattr(riot_api, "REQUEST_TIMEOUT", 0.2)
+    server = mock_riot(MockConfig(latency=fixed(1), endpoint_latency={"mastery": fixed(600)}))
+    summoner, ranked, mastery, matches, status = get_client().run(
+        riot_api.get_summoner_data_async("Mock#NA1", "NA", deadline=25)
+    )
+    assert summoner["gameName"] == "Mock"
+    assert ranked and matches and mastery == []
+    assert status["sections"]["mastery"] == "failed"
+    assert status["failed_sections"] == ["mastery"]
+    assert server.requests["mastery"] == constants.RETRY_ATTEMPTS
+
+
+def test_slow_match_details_are_hedged(mock_riot, monkeypatch):
+    hedger = Hedger(get_client().limiter, percentile=0.5, min_samples=5, budget_reserve=0)
+    monkeypatch.setattr(get_client(), "hedger", hedger)
+    mock_riot(MockConfig(latency=fixed(1), endpoint_latency={"match": uniform(5, 150)}))
+    _lookup()  # latency samples; its details all start before any threshold exists
+    _lookup("Other#NA1")
+    stats = hedger.stats()
+    # The mock carries the host in the path; endpoints are still keyed without it.
+    assert list(stats["thresholds"]) == ["americas /lol/match/v5/matches/{matchId}"]
+    assert stats["hedged"] > 0
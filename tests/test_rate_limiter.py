@@ -0,0 +1,95 @@
+"""
+Tests for the header-driven Riot rate limiter.
+"""
+import asyncio
+import time
+
+import pytest
+
+from backend.utils.exceptions import RateLimitError
+from backend.utils.rate_limiter import RateLimiter, method_key, parse_limits
+
+HOST = "americas"
+METHOD = "/lol/match/v5/matches/{matchId}"
+
+
+def test_parse_limits():
+    assert parse_limits("20:1,100:120") == [(20, 1), (100, 120)]
+    assert parse_limits(None) == []
+    assert parse_limits("garbage,5:10") == [(5, 10)]
+
+
+def test_method_key_collapses_ids():
+    assert method_key("/lol/match/v5/matches/NA1_123") == METHOD
+    assert method_key("/lol/match/v5/matches/NA1_123/timeline") == METHOD + "/timeline"
+    assert method_key("/lol/match/v5/matches/by-puuid/abc/ids") == "/lol/match/v5/matches/by-puuid/{puuid}/ids"
+    assert method_key("/riot/account/v1/accounts/by-riot-id/Name/TAG") == (
+        "/riot/account/v1/accounts/by-riot-id/{gameName}/{tagLine}"
+    )
+
+
+def test_learns_limits_from_headers():
+    limiter = RateLimiter()
+    limiter.update(HOST, METHOD, {
+        "X-App-Rate-Limit": "500:10,30000:600",
+        "X-Method-Rate-Limit": "2000:10",
+    })
+    host = limiter.stats()["hosts"][HOST]
+    assert host["app_limits"] == ["500:10", "30000:600"]
+    assert host["method_limits"][METHOD] == ["2000:10"]
+
+
+def test_count_headers_resync_usage():
+    limiter = RateLimiter(default_app_limits="10:10")
+    limiter.update(HOST, METHOD, {"X-App-Rate-Limit": "10:10", "X-App-Rate-Limit-Count": "10:10"})
+    assert limiter.time_until(HOST, METHOD) > 0
+
+
+def test_acquire_waits_for_refill():
+    limiter = RateLimiter(default_app_limits="2:1")
+
+    async def _run():
+        for _ in range(3):
+            await limiter.acquire(HOST, METHOD)
+
+    started = time.monotonic()
+    asyncio.run(_run())
+    assert time.monotonic() - started >= 0.4
+    stats = limiter.stats()["hosts"][HOST]
+    assert stats["requests"] == 3
+    assert stats["waited"] == 1
+
+
+def test_429_pauses_all_waiters_together():
+    limiter = RateLimiter(default_app_limits="100:1")
+    limiter.on_rate_limited(HOST, METHOD, {"Retry-After": "0.3", "X-Rate-Limit-Type": "application"})
+
+    async def _run():
+        return await asyncio.gather(*[limiter.acquire(HOST, METHOD) for _ in range(3)])
+
+    waits = asyncio.run(_run())
+    assert all(w >= 0.25 for w in waits)
+    assert limiter.stats()["rate_limited"] == 1
+
+
+def test_method_429_leaves_other_methods_alone():
+    limiter = RateLimiter()
+    limiter.on_rate_limited(HOST, METHOD, {"Retry-After": "5", "X-Rate-Limit-Type": "method"})
+    assert limiter.time_until(HOST, "/lol/match/v5/matches/by-puuid/{puuid}/ids") == 0
+    assert limiter.time_until(HOST, METHOD) > 4
+
+
+def test_acquire_gives_up_past_max_wait():
+    limiter = RateLimiter(max_wait=0.1)
+    limiter.on_rate_limited(HOST, METHOD, {"Retry-After": "30", "X-Rate-Limit-Type": "application"})
+    with pytest.raises(RateLimitError):
+        asyncio.run(limiter.acquire(HOST, METHOD))
+
+
+def test_time_to_serve_counts_refills_past_a_full_bucket():
+    limiter = RateLimiter(default_app_limits="10:1,100:120")
+    assert limiter.time_to_serve(HOST, 10) == 0.0
+    # 5 more than the per-second bucket holds: half a second of refill.
+    assert limiter.time_to_serve(HOST, 15) == pytest.approx(0.5, abs=0.01)
+    limiter.on_rate_limited(HOST, METHOD, {"X-Rate-Limit-Type": "application", "Retry-After": "3"})
+    assert limiter.time_to_serve(HOST, 1) >= 2.9
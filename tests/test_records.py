@@ -0,0 +1,49 @@
+"""
+Tests for the compact MatchRecord / ParticipantRecord types.
+"""
+import pytest
+
+from backend.analysis.records import MatchRecord, ParticipantRecord, as_match_record
+from tests.conftest import make_match, make_participant
+
+
+def _match(**info):
+    payload = make_match(participants=[
+        make_participant(puuid="a", champion_id=222, kills=7),
+        make_participant(puuid="b", champion_id=103, win=False),
+    ])
+    payload["metadata"] = {"matchId": "NA1_1"}
+    payload["info"].update(info)
+    return payload
+
+
+def test_fields_from_payload():
+    record = MatchRecord(_match(queueId=420, gameEndTimestamp=2000))
+    assert (record.match_id, record.queue_id, record.duration, record.ended) == ("NA1_1", 420, 1800, 2000)
+    player = record.participant("a")
+    assert (player.champion_id, player.kills, player.win) == (222, 7, True)
+    assert player.cs == 160
+    assert player.items == (3031, 3094, 3085, 3006, 3033, 0, 3364)
+    assert player.perks["styles"][0]["style"] == 8000
+    assert record.participant("missing") is None
+
+
+def test_timestamp_falls_back_to_creation():
+    assert MatchRecord(_match(gameEndTimestamp=2000, gameCreation=1000)).timestamp == 2000
+    assert MatchRecord(_match(gameCreation=1000)).timestamp == 1000
+    assert MatchRecord(_match()).timestamp == 0
+
+
+def test_slots_have_no_instance_dict():
+    record = MatchRecord(_match())
+    for obj in (record, record.participants[0]):
+        assert not hasattr(obj, "__dict__")
+        with pytest.raises(AttributeError):
+            obj.extra = 1
+    assert isinstance(record.participants[0], ParticipantRecord)
+
+
+def test_as_match_record_passes_records_through():
+    record = MatchRecord(_match())
+    assert as_match_record(record) is record
+    assert as_match_record(_match()).match_id == "NA1_1"
@@ -0,0 +1,145 @@
+"""
+Tests for the tracked-summoner registry and background refresh worker.
+"""
+import asyncio
+import threading
+import time
+
+import pytest
+
+import backend.match_store as match_store
+import backend.refresh_worker as refresh_worker
+import backend.riot_api as riot_api
+from backend.match_store import MatchStore
+from backend.refresh_worker import RefreshWorker
+from backend.riot_client import RiotClient, get_client
+from backend.utils.ttl_cache import TTLCache
+from tests.conftest import FakeSession, make_match, make_participant
+
+PUUID = "tracked-puuid"
+
+
+def _riot_payload(url, params):
+    """Canned data for each Riot endpoint."""
+    if "/by-riot-id/" in url:
+        return {"puuid": PUUID, "gameName": "Tracked", "tagLine": "NA1"}
+    if "/summoner/v4/" in url:
+        return {"puuid": PUUID, "summonerLevel": 100, "profileIconId": 1}
+    if "/league/v4/" in url:
+        return [{"queueType": "RANKED_SOLO_5x5", "tier": "GOLD"}]
+    if "/champion-mastery/" in url:
+        return [{"championId": 222, "championLevel": 7, "championPoints": 1000}]
+    if url.endswith("/ids"):
+        return ["NA1_2", "NA1_1"]
+    payload = make_match(participants=[make_participant(puuid=PUUID)])
+    payload["metadata"] = {"matchId": url.rsplit("/", 1)[1]}
+    payload["info"]["queueId"] = 420
+    return payload
+
+
+@pytest.fixture
+def session(monkeypatch):
+    monkeypatch.setenv("RIOT_API_KEY", "test-key")
+    monkeypatch.setattr(match_store, "_store", MatchStore(":memory:"))
+    monkeypatch.setattr(riot_api, "_account_cache", TTLCache(60))
+    monkeypatch.setattr(riot_api, "_summoner_cache", TTLCache(60))
+    monkeypatch.setattr(riot_api, "_warm_cache", TTLCache(60))
+    fake = FakeSession(_riot_payload)
+    monkeypatch.setattr(get_client(), "session", lambda: fake)
+    return fake
+
+
+def test_registry_roundtrip():
+    store = MatchStore(":memory:")
+    store.track("p1", "One#NA1", "NA")
+    store.track("p2", "Two#NA1", "EUW")
+    store.mark_refreshed("p1", 100.0)
+    # Never-refreshed players come first
+    assert [t["puuid"] for t in store.tracked()] == ["p2", "p1"]
+    assert store.is_tracked("p1")
+    assert store.untrack("p1")
+    assert not store.untrack("p1")
+    assert [t["riot_id"] for t in store.tracked()] == ["Two#NA1"]
+
+
+def test_refresh_warms_interactive_lookup(session):
+    downloaded = get_client().run(riot_api.refresh_summoner(PUUID, "NA"))
+    assert downloaded == 2
+    assert len(match_store._store) == 2
+
+    session.urls.clear()
+    summoner, ranked, mastery, matches, _ = get_client().run(
+        riot_api.get_summoner_data_async("Tracked#NA1", "NA")
+    )
+    # Only the Riot ID → PUUID lookup goes upstream; the rest is warm.
+    assert len(session.urls) == 1 and "/by-riot-id/" in session.urls[0]
+    assert summoner["summonerLevel"] == 100
+    assert ranked[0]["tier"] == "GOLD"
+    assert mastery[0]["championId"] == 222
+    assert [m.match_id for m in matches] == ["NA1_2", "NA1_1"]
+
+
+def test_refresh_due_skips_fresh_and_counts_failures(monkeypatch):
+    store = MatchStore(":memory:")
+    monkeypatch.setattr(match_store, "_store", store)
+    store.track("ok", "Ok#NA1", "NA")
+    store.track("bad", "Bad#NA1", "NA")
+    store.track("fresh", "Fresh#NA1", "NA")
+    store.mark_refreshed("fresh")
+    calls = []
+
+    async def fake_refresh(puuid, region, spend=None):
+        calls.append(puuid)
+        if puuid == "bad":
+            raise riot_api.NetworkError("down")
+        return 3
+
+    monkeypatch.setattr(refresh_worker, "refresh_summoner", fake_refresh)
+    worker = RefreshWorker(interval=300)
+    assert asyncio.run(worker.refresh_due()) == 1
+    assert sorted(calls) == ["bad", "ok"]
+    stats = worker.stats()
+    assert stats["refreshes"] == 1
+    assert stats["failures"] == 1
+    assert stats["matches_downloaded"] == 3
+
+
+def test_budget_share_of_app_limit():
+    worker = RefreshWorker(budget_share=0.25, client=RiotClient())
+    bucket = worker._bucket("americas")
+    # Development-key default 100 requests / 120s → 25 for the worker
+    assert (bucket.capacity, bucket.window) == (25, 120)
+
+    async def _run():
+        await worker._spend("americas", 25)
+        return worker._bucket("americas").tokens
+
+    assert asyncio.run(_run()) == pytest.approx(0, abs=0.1)
+
+
+def test_concurrent_ensure_started_starts_one_worker(monkeypatch):
+    client = RiotClient()
+
+    class _SlowClient:
+        @property
+        def loop(self):
+            time.sleep(0.01)  # widen the check-then-start window
+            return client.loop
+
+    worker = RefreshWorker(client=_SlowClient())
+    runs = []
+
+    async def _run():
+        runs.append(1)
+        await asyncio.sleep(60)
+
+    monkeypatch.setattr(worker, "_run", _run)
+    threads = [threading.Thread(target=worker.ensure_started) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    client.run(asyncio.sleep(0.05))
+    worker.stop()
+    client.close()
+    assert runs == [1]
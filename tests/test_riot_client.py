@@ -0,0 +1,51 @@
+"""
+Tests for the process-wide RiotClient (shared loop + pooled session).
+"""
+import asyncio
+
+import pytest
+
+from backend.riot_client import RiotClient
+
+
+@pytest.fixture
+def client():
+    c = RiotClient(limit=10, limit_per_host=2)
+    yield c
+    c.close()
+
+
+def test_run_returns_coroutine_result(client):
+    async def _answer():
+        return 42
+
+    assert client.run(_answer()) == 42
+
+
+def test_session_is_reused_across_runs(client):
+    async def _session():
+        return client.session()
+
+    first = client.run(_session())
+    second = client.run(_session())
+    assert first is second
+    assert first.connector.limit == 10
+    assert first.connector.limit_per_host == 2
+
+
+def test_session_requires_client_loop(client):
+    async def _elsewhere():
+        return client.session()
+
+    with pytest.raises(RuntimeError):
+        asyncio.run(_elsewhere())
+
+
+def test_close_closes_session_and_is_idempotent(client):
+    async def _session():
+        return client.session()
+
+    session = client.run(_session())
+    client.close()
+    client.close()
+    assert session.closed
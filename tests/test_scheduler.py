@@ -0,0 +1,141 @@
+"""
+Tests for priority scheduling of Riot calls.
+"""
+import asyncio
+
+import backend.utils.scheduler as scheduler_mod
+from backend.utils.rate_limiter import RateLimiter
+from backend.utils.scheduler import Priority, PriorityScheduler, current_priority, request_priority
+
+HOST = "americas"
+METHOD = "/lol/match/v5/matches/{matchId}"
+
+
+def test_priority_context_propagates_to_tasks():
+    async def _run():
+        with request_priority(Priority.BATCH):
+            inner = await asyncio.ensure_future(_read())
+        return inner, current_priority()
+
+    async def _read():
+        return current_priority()
+
+    assert asyncio.run(_run()) == (Priority.BATCH, Priority.INTERACTIVE)
+
+
+def test_interactive_goes_first_when_budget_is_short():
+    limiter = RateLimiter(default_app_limits="10:1")
+    scheduler = PriorityScheduler(limiter)
+    order = []
+
+    async def _call(priority, label):
+        await scheduler.acquire(HOST, METHOD, priority)
+        order.append(label)
+
+    async def _run():
+        # Spend the budget so everyone queues, then let a batch and an
+        # interactive request race for the refill.
+        for _ in range(10):
+            await scheduler.acquire(HOST, METHOD, Priority.INTERACTIVE)
+        batch = asyncio.ensure_future(_call(Priority.BATCH, "batch"))
+        await asyncio.sleep(0)
+        interactive = asyncio.ensure_future(_call(Priority.INTERACTIVE, "interactive"))
+        await asyncio.gather(batch, interactive)
+
+    asyncio.run(_run())
+    assert order[0] == "interactive"
+
+
+def test_lower_class_keeps_headroom_in_reserve():
+    limiter = RateLimiter(default_app_limits="20:1")
+    scheduler = PriorityScheduler(limiter)
+    for _ in range(16):
+        limiter._scopes(HOST, METHOD)[0].take()
+
+    ticket = scheduler_mod._Ticket(Priority.BATCH, 0.0, 0, None)
+    scheduler._queues[HOST] = [ticket]
+    # 4 tokens left, batch must leave RESERVE[BATCH]=5 — wait for refill.
+    assert scheduler._blocked_for(HOST, METHOD, ticket, 0.0) > 0
+    ticket.priority = Priority.INTERACTIVE
+    assert scheduler._blocked_for(HOST, METHOD, ticket, 0.0) == 0
+
+
+def test_aging_prevents_starvation():
+    ticket = scheduler_mod._Ticket(Priority.BATCH, 0.0, 0, None)
+    assert ticket.effective(0.0) == Priority.BATCH
+    assert ticket.effective(scheduler_mod.AGING_INTERVAL) == Priority.PREFETCH
+    assert ticket.effective(3 * scheduler_mod.AGING_INTERVAL) == Priority.INTERACTIVE
+
+
+def test_promote_lifts_queued_ticket():
+    scheduler = PriorityScheduler(RateLimiter())
+    ticket = scheduler_mod._Ticket(Priority.BATCH, 0.0, 0, "key")
+    scheduler._queues[HOST] = [ticket]
+    scheduler.promote("key", Priority.INTERACTIVE)
+    assert ticket.priority == Priority.INTERACTIVE
+    assert scheduler.stats()["classes"]["interactive"]["promoted"] == 1
+
+
+def test_stats_report_per_class_admissions():
+    scheduler = PriorityScheduler(RateLimiter())
+
+    async def _run():
+        await scheduler.acquire(HOST, METHOD, Priority.INTERACTIVE)
+        await scheduler.acquire(HOST, METHOD, Priority.PREFETCH)
+
+    asyncio.run(_run())
+    classes = scheduler.stats()["classes"]
+    assert classes["interactive"]["admitted"] == 1
+    assert classes["prefetch"]["admitted"] == 1
+    assert classes["batch"]["admitted"] == 0
+    assert scheduler.stats()["queued"] == {}
+
+
+def test_lift_moves_a_flight_to_the_joiners_class():
+    scheduler = PriorityScheduler(RateLimiter())
+    mine = scheduler_mod._Ticket(Priority.PREFETCH, 0.0, 0, "a", flight="lookup")
+    other = scheduler_mod._Ticket(Priority.PREFETCH, 0.0, 1, "b", flight="other")
+    scheduler._queues[HOST] = [mine, other]
+
+    with request_priority(Priority.PREFETCH), scheduler_mod.request_flight("lookup"):
+        scheduler.lift("lookup")
+        assert scheduler.effective_priority() == Priority.PREFETCH
+        scheduler.lift("lookup", Priority.INTERACTIVE)
+        # Queued calls are promoted, and later ones start at the new class.
+        assert (mine.priority, other.priority) == (Priority.INTERACTIVE, Priority.PREFETCH)
+        assert scheduler.effective_priority() == Priority.INTERACTIVE
+        scheduler.lift("lookup", Priority.BATCH)  # never lowered
+        assert scheduler.effective_priority() == Priority.INTERACTIVE
+    scheduler.land("lookup")
+    with request_priority(Priority.PREFETCH), scheduler_mod.request_flight("lookup"):
+        assert scheduler.effective_priority() == Priority.PREFETCH
+
+
+def test_interactive_caller_lifts_a_prefetch_lookup(monkeypatch):
+    import backend.riot_api as riot_api
+    from backend.riot_client import get_client
+
+    seen = []
+    joined = asyncio.Event()
+
+    async def _fake_events(summoner_name, region, puuid=None):
+        await joined.wait()
+        seen.append(get_client().scheduler.effective_priority())
+        yield "summoner", {"puuid": "p1"}
+
+    async def _consume():
+        return [event async for event in riot_api.stream_summoner_data_async("Hover#NA1", "NA")]
+
+    async def _run():
+        with request_priority(Priority.PREFETCH):
+            prefetch = asyncio.ensure_future(_consume())
+        await asyncio.sleep(0)
+        click = asyncio.ensure_future(_consume())
+        await asyncio.sleep(0)
+        joined.set()
+        return await asyncio.gather(prefetch, click)
+
+    monkeypatch.setattr(riot_api, "_summoner_events", _fake_events)
+    prefetched, clicked = get_client().run(_run())
+    assert prefetched == clicked == [("summoner", {"puuid": "p1"})]
+    assert seen == [Priority.INTERACTIVE]
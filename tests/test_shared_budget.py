@@ -0,0 +1,154 @@
+"""
+Tests for the rate-limit budget shared between instances.
+"""
+import asyncio
+import sqlite3
+
+import pytest
+
+from backend.utils.exceptions import RateLimitError
+from backend.utils.rate_limiter import RateLimiter
+from backend.utils.shared_budget import (
+    BudgetStore, RedisBudgetStore, SQLiteBudgetStore, budget_store_from_url,
+)
+
+HOST = "americas"
+METHOD = "/lol/match/v5/matches/{matchId}"
+
+
+@pytest.fixture
+def db(tmp_path):
+    return str(tmp_path / "budget.db")
+
+
+def test_reserve_is_a_sliding_window(db):
+    store = SQLiteBudgetStore(db)
+    scopes = [("app:americas", [(2, 10)])]
+    reserve = lambda now: asyncio.run(store.reserve(scopes, now=now))  # noqa: E731
+    assert reserve(100.0) == 0 and reserve(101.0) == 0
+    assert reserve(102.0) == pytest.approx(8.0)  # until the 100.0 hit ages out
+    assert reserve(110.5) == 0
+
+
+def test_reserve_is_all_or_nothing_across_scopes(db):
+    store = SQLiteBudgetStore(db)
+    full = ("method:americas:/m", [(1, 10)])
+    asyncio.run(store.reserve([full], now=100.0))
+    assert asyncio.run(store.reserve([("app:americas", [(1, 10)]), full], now=101.0)) > 0
+    # The app scope wasn't charged for the refused request
+    assert asyncio.run(store.reserve([("app:americas", [(1, 10)])], now=101.0)) == 0
+
+
+def test_instances_share_one_budget(db):
+    """Two limiters (instances) on one store get the app limit between them."""
+    first = RateLimiter(default_app_limits="3:10", shared=SQLiteBudgetStore(db))
+    second = RateLimiter(default_app_limits="3:10", shared=SQLiteBudgetStore(db))
+    for limiter in (first, second, first):
+        asyncio.run(limiter.acquire(HOST, METHOD))
+    assert first.time_until(HOST, METHOD) == 0  # locally it still has budget...
+    second.max_wait = 0.1
+    with pytest.raises(RateLimitError):
+        asyncio.run(second.acquire(HOST, METHOD))  # ...but the shared window is full
+    assert second.stats()["shared"]["throttled"] >= 1
+
+
+def test_pauses_are_shared(db):
+    first = RateLimiter(shared=SQLiteBudgetStore(db))
+    second = RateLimiter(shared=SQLiteBudgetStore(db), max_wait=0.1)
+
+    async def _rate_limited():
+        first.on_rate_limited(HOST, METHOD, {"Retry-After": "5", "X-Rate-Limit-Type": "application"})
+        await asyncio.gather(*first._pending)
+
+    asyncio.run(_rate_limited())
+    with pytest.raises(RateLimitError):
+        asyncio.run(second.acquire(HOST, METHOD))
+
+
+def test_sqlite_lock_waits_do_not_block_the_event_loop(db):
+    store = SQLiteBudgetStore(db)
+    other = sqlite3.connect(db, isolation_level=None)
+    other.execute("BEGIN IMMEDIATE")  # another process holds the write lock
+    ticks = 0
+
+    async def _tick():
+        nonlocal ticks
+        while True:
+            ticks += 1
+            await asyncio.sleep(0.01)
+
+    async def _run():
+        ticker = asyncio.ensure_future(_tick())
+        asyncio.get_running_loop().call_later(0.2, other.execute, "COMMIT")
+        wait = await store.reserve([("app:" + HOST, [(5, 10)])])
+        ticker.cancel()
+        return wait
+
+    assert asyncio.run(_run()) == 0
+    assert ticks >= 10
+
+
+class _SlowStore(BudgetStore):
+    """Answers every reservation with wait after a short delay."""
+
+    def __init__(self, wait=0.0, delay=0.05):
+        self.wait = wait
+        self.delay = delay
+
+    async def reserve(self, scopes, now=None):
+        await asyncio.sleep(self.delay)
+        return self.wait
+
+
+def test_tokens_are_taken_before_the_shared_reservation_is_awaited():
+    limiter = RateLimiter(default_app_limits="1:10", shared=_SlowStore(), max_wait=0.1)
+
+    async def _run():
+        return await asyncio.gather(
+            limiter.acquire(HOST, METHOD), limiter.acquire(HOST, METHOD), return_exceptions=True,
+        )
+
+    outcomes = asyncio.run(_run())
+    assert outcomes.count(0) == 1  # the other saw the token gone, not a full bucket
+    assert sum(isinstance(o, RateLimitError) for o in outcomes) == 1
+    assert limiter._app[HOST].buckets[10].tokens >= 0
+
+
+def test_refused_or_cancelled_reservations_give_local_tokens_back():
+    limiter = RateLimiter(default_app_limits="1:10", shared=_SlowStore(wait=5), max_wait=0.1)
+    with pytest.raises(RateLimitError):
+        asyncio.run(limiter.acquire(HOST, METHOD))
+    assert limiter.time_until(HOST, METHOD) == 0
+
+    async def _cancel_mid_reservation():
+        task = asyncio.ensure_future(limiter.acquire(HOST, METHOD))
+        await asyncio.sleep(0.01)
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
+        assert limiter.time_until(HOST, METHOD) > 0  # still out until the store answers
+        await asyncio.gather(*limiter._pending)
+
+    asyncio.run(_cancel_mid_reservation())
+    assert limiter.time_until(HOST, METHOD) == 0
+
+
+def test_unreachable_store_falls_back_to_a_share_of_the_limits():
+    store = RedisBudgetStore("redis://127.0.0.1:1/0")  # nothing listens there (or no redis package)
+    limiter = RateLimiter(default_app_limits="8:10", shared=store, fallback_share=0.25, max_wait=0.1)
+
+    async def _run():
+        await limiter.acquire(HOST, METHOD)
+        await limiter.acquire(HOST, METHOD)
+
+    asyncio.run(_run())
+    stats = limiter.stats()["shared"]
+    assert stats["degraded"] and stats["failures"] == 1
+    assert limiter.time_until(HOST, METHOD) > 0  # 2 of 8, not 8
+
+
+def test_store_from_url(db):
+    assert budget_store_from_url(None) is None
+    assert isinstance(budget_store_from_url(f"sqlite:///{db}"), SQLiteBudgetStore)
+    assert isinstance(budget_store_from_url("redis://localhost:6379/0"), RedisBudgetStore)
+    with pytest.raises(ValueError):
+        budget_store_from_url("memcached://localhost")
@@ -0,0 +1,122 @@
+"""
+Tests for single-flight coalescing of concurrent identical fetches.
+"""
+import asyncio
+
+from backend.utils.single_flight import SingleFlight
+
+
+def test_concurrent_callers_share_one_fetch():
+    flights = SingleFlight()
+    calls = 0
+
+    async def _fetch():
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.01)
+        return {"puuid": "abc"}
+
+    async def _run():
+        return await asyncio.gather(*[flights.do("key", _fetch) for _ in range(5)])
+
+    results = asyncio.run(_run())
+    assert calls == 1
+    assert all(r is results[0] for r in results)
+    assert flights.stats() == {"in_flight": 0, "leaders": 1, "coalesced": 4}
+
+
+def test_different_keys_fetch_separately():
+    flights = SingleFlight()
+
+    async def _run():
+        return await asyncio.gather(
+            flights.do("a", lambda: asyncio.sleep(0, result="A")),
+            flights.do("b", lambda: asyncio.sleep(0, result="B")),
+        )
+
+    assert asyncio.run(_run()) == ["A", "B"]
+    assert flights.leaders == 2
+
+
+def test_errors_reach_every_caller_and_key_is_released():
+    flights = SingleFlight()
+
+    async def _fail():
+        await asyncio.sleep(0.01)
+        raise ValueError("boom")
+
+    async def _run():
+        return await asyncio.gather(
+            flights.do("k", _fail), flights.do("k", _fail), return_exceptions=True,
+        )
+
+    results = asyncio.run(_run())
+    assert all(isinstance(r, ValueError) for r in results)
+    assert len(flights) == 0
+
+
+def test_cancelled_caller_does_not_cancel_shared_fetch():
+    flights = SingleFlight()
+
+    async def _fetch():
+        await asyncio.sleep(0.02)
+        return "done"
+
+    async def _run():
+        leader = asyncio.ensure_future(flights.do("k", _fetch))
+        follower = asyncio.ensure_future(flights.do("k", _fetch))
+        await asyncio.sleep(0)
+        leader.cancel()
+        return await follower
+
+    assert asyncio.run(_run()) == "done"
+
+
+def test_stream_late_subscriber_gets_replay():
+    flights = SingleFlight()
+    starts = 0
+
+    async def _events():
+        nonlocal starts
+        starts += 1
+        for i in range(3):
+            await asyncio.sleep(0.01)
+            yield i
+
+    async def _collect(delay):
+        await asyncio.sleep(delay)
+        return [e async for e in flights.stream("key", _events)]
+
+    async def _run():
+        return await asyncio.gather(_collect(0), _collect(0.015))
+
+    first, late = asyncio.run(_run())
+    assert starts == 1
+    assert first == late == [0, 1, 2]
+    assert flights.stats() == {"in_flight": 0, "leaders": 1, "coalesced": 1}
+
+
+def test_fetch_is_cancelled_once_every_caller_gives_up():
+    flights = SingleFlight()
+    state = {"cancelled": False}
+
+    async def _fetch():
+        try:
+            await asyncio.sleep(5)
+        except asyncio.CancelledError:
+            state["cancelled"] = True
+            raise
+
+    async def _run():
+        callers = [asyncio.ensure_future(flights.do("k", _fetch)) for _ in range(2)]
+        await asyncio.sleep(0)
+        callers[0].cancel()
+        await asyncio.sleep(0)
+        assert not state["cancelled"]
+        callers[1].cancel()
+        await asyncio.gather(*callers, return_exceptions=True)
+        await asyncio.sleep(0)
+
+    asyncio.run(_run())
+    assert state["cancelled"]
+    assert len(flights) == 0
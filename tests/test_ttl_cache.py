@@ -0,0 +1,65 @@
+"""
+Tests for the TTL cache and the cached Riot ID → PUUID / summoner resolution.
+"""
+import asyncio
+import time
+
+import pytest
+
+import backend.riot_api as riot_api
+from backend.utils.ttl_cache import TTLCache
+from tests.conftest import FakeSession
+
+
+def test_get_set_and_expiry():
+    cache = TTLCache(ttl=0.05)
+    cache.set("k", 1)
+    assert cache.get("k") == 1
+    time.sleep(0.06)
+    assert cache.get("k") is None
+    assert cache.stats()["hits"] == 1
+    assert cache.stats()["misses"] == 1
+
+
+def test_per_entry_ttl_override():
+    cache = TTLCache(ttl=60)
+    cache.set("k", 1, ttl=0)
+    assert "k" not in cache
+
+
+def test_lru_eviction():
+    cache = TTLCache(ttl=60, max_entries=2)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")
+    cache.set("c", 3)
+    assert "b" not in cache
+    assert cache.get("a") == 1
+
+
+def _account_or_summoner(url, params):
+    if "/accounts/by-riot-id/" in url:
+        return {"puuid": "p1", "gameName": "Player", "tagLine": "NA1"}
+    return {"puuid": "p1", "summonerLevel": 100, "profileIconId": 7}
+
+
+@pytest.fixture
+def fresh_caches(monkeypatch):
+    monkeypatch.setattr(riot_api, "_account_cache", TTLCache(60))
+    monkeypatch.setattr(riot_api, "_summoner_cache", TTLCache(60))
+
+
+def test_warm_lookup_makes_no_calls(fresh_caches):
+    session = FakeSession(_account_or_summoner)
+
+    async def _run():
+        headers = {"X-Riot-Token": "key"}
+        first = await riot_api._fetch_summoner("player", "na1", "NA", session, headers)
+        second = await riot_api._fetch_summoner("PLAYER", "NA1", "NA", session, headers)
+        return first, second
+
+    first, second = asyncio.run(_run())
+    assert len(session.urls) == 2  # account + summoner, once
+    assert first == second
+    assert first["gameName"] == "Player"
+    assert first["summonerLevel"] == 100